@@ -17,8 +17,26 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import hashlib
+
+import six
+
+
+def _CbsdReferenceId(fcc_id, serial_number):
+  """Returns the record id of a CBSD, as defined in the SAS-SAS TS."""
+  return 'cbsd/%s/%s' % (fcc_id, hashlib.sha1(
+      six.ensure_binary(serial_number)).hexdigest())
+
 
 class FullActivityDump(object):
+  """Full Activity Dump records, with lookups by CBSD and grant ids.
+
+  The CBSD lookups (`getCbsdRecordById`, `getCbsdRecordsById`...) use indexes
+  built lazily on first use and invalidated by `setCbsdRecords`. Once an index
+  is built, grants can still be removed in place from the CBSD records (as
+  done by the pre-IAP purges), but any other in-place modification requires
+  to set back the records with `setCbsdRecords`.
+  """
 
   _valid_field_names = ['cbsd', 'esc_sensor', 'zone']
 
@@ -41,6 +59,8 @@ class FullActivityDump(object):
     for field_name in self._valid_field_names:
       if field_name not in self._dump_data:
         self._dump_data[field_name] = []
+    # Lazily built indexes of the CBSD records.
+    self._cbsd_indexes = {}
 
   def getData(self):
     """Returns all data in FAD.
@@ -92,6 +112,92 @@ class FullActivityDump(object):
       records: A list of CBSD records to store.
     """
     self._dump_data['cbsd'] = records
+    self._cbsd_indexes = {}
+
+  def _getCbsdIndex(self, index_name):
+    """Returns a CBSD index, building it if needed.
+
+    Indexes:
+      'id': cbsd id -> positions of the records (normally a single one).
+      'fcc_id': FCC id -> positions of the records.
+      'grant_id': grant id -> positions of the records having that grant.
+    """
+    index = self._cbsd_indexes.get(index_name)
+    if index is not None:
+      return index
+    index = {}
+    records = self._dump_data['cbsd']
+    if index_name == 'id':
+      for k, record in enumerate(records):
+        index.setdefault(record['id'], []).append(k)
+    elif index_name == 'fcc_id':
+      for k, record in enumerate(records):
+        index.setdefault(record['registration']['fccId'], []).append(k)
+    elif index_name == 'grant_id':
+      for k, record in enumerate(records):
+        for grant_id in set(grant['id'] for grant in record['grants']):
+          index.setdefault(grant_id, []).append(k)
+    else:
+      raise ValueError('Unknown CBSD index: %s' % index_name)
+    self._cbsd_indexes[index_name] = index
+    return index
+
+  def getCbsdRecordById(self, cbsd_id):
+    """Returns the CBSD record of given id, or None if not in the dump."""
+    positions = self._getCbsdIndex('id').get(cbsd_id)
+    return self._dump_data['cbsd'][positions[0]] if positions else None
+
+  def getCbsdRecordBySerialNumber(self, fcc_id, serial_number):
+    """Returns the CBSD record of given FCC id and serial number, or None.
+
+    The CBSD records do not hold the serial number, but their id is derived
+    from the FCC id and the hash of the serial number.
+    """
+    return self.getCbsdRecordById(_CbsdReferenceId(fcc_id, serial_number))
+
+  def getCbsdRecordsById(self, cbsd_ids, exclude=False):
+    """Returns the CBSD records of given ids.
+
+    Example usage:
+      # The CBSDs not part of the cluster list of a PPA.
+      fad.getCbsdRecordsById(ppa_record['ppaInfo']['cbsdReferenceId'],
+                             exclude=True)
+
+    Args:
+      cbsd_ids: An iterable of CBSD ids.
+      exclude: If True, returns instead the CBSD records whose id is not one
+        of the given ids.
+    Returns:
+      A list of the matching CBSD records, in the dump order.
+    """
+    index = self._getCbsdIndex('id')
+    positions = set()
+    for cbsd_id in cbsd_ids:
+      positions.update(index.get(cbsd_id, []))
+    records = self._dump_data['cbsd']
+    if exclude:
+      return [record for k, record in enumerate(records) if k not in positions]
+    return [records[k] for k in sorted(positions)]
+
+  def getCbsdRecordsByFccId(self, fcc_id):
+    """Returns the list of CBSD records of a given FCC id, in the dump order."""
+    records = self._dump_data['cbsd']
+    return [records[k] for k in self._getCbsdIndex('fcc_id').get(fcc_id, [])]
+
+  def getGrantsById(self, grant_id):
+    """Returns the grants of a given id, along with their CBSD record.
+
+    Grant ids are only unique within a CBSD, so several grants can match.
+
+    Returns:
+      A list of (cbsd_record, grant) tuples, in the dump order.
+    """
+    records = self._dump_data['cbsd']
+    # The grants are looked up in the current grants of the indexed records,
+    # in case some have been removed since the index was built.
+    return [(records[k], grant)
+            for k in self._getCbsdIndex('grant_id').get(grant_id, [])
+            for grant in records[k]['grants'] if grant['id'] == grant_id]
 
   def getEscSensorRecords(self, filters=[]):
     """Returns all ESC sensor records matching the given filters.
@@ -17,14 +17,22 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import codecs
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+import json
 import logging
+import re
 import time
 import traceback
 
 import full_activity_dump
+from reference_models.common import data
 import util
 
+# Maximum number of dump files downloaded concurrently.
+_MAX_DOWNLOAD_WORKERS = 8
+
 
 def getFullActivityDumpSasUut(sas, sas_admin, ssl_cert=None, ssl_key=None):
   """Returns a FullActivityDump object from the SAS UUT in its current state.
@@ -99,15 +107,20 @@ def _triggerFullActivityDumpAndWaitUntilComplete(sas, sas_admin, ssl_cert,
   return dump_message
 
 
-def _processDump(sas, dump, ssl_cert=None, ssl_key=None):
+def _processDump(sas, dump, ssl_cert=None, ssl_key=None,
+                 max_workers=_MAX_DOWNLOAD_WORKERS):
   """Clears any existing dump data and downloads current data.
 
+  The dump files are downloaded and checked concurrently, but their records
+  are kept in the order of the dump files.
+
   Args:
     sas: A SasInterface object to request
     dump: The https://base_url/version/dump message response, used to extract
       the files to be downloaded.
     ssl_cert: Optional. ssl certificate to use when making get requests.
     ssl_key: Optional. ssl key to use when making get requests.
+    max_workers: The maximum number of concurrent downloads.
   Returns:
     A Full Activity Dump with the FAD data from the given SAS as a dictionary
     with the fields: cbsd, esc_sensor, zone. Each field is a list of the
@@ -117,17 +130,232 @@ def _processDump(sas, dump, ssl_cert=None, ssl_key=None):
       request does not return 200.
   """
   util.assertContainsRequiredFields('FullActivityDump.schema.json', dump)
-  dump_data = {'cbsd': [], 'esc_sensor': [], 'zone': []}
+  dump_files = []
   for dump_file in dump['files']:
     if dump_file['recordType'] == 'coordination':
       logging.debug(
           'Coordination event record skipped in downloading Full Activity Dump')
       continue
+    dump_files.append(dump_file)
+
+  def _DownloadRecords(dump_file):
     util.assertContainsRequiredFields('ActivityDumpFile.schema.json', dump_file)
-    dump_data[dump_file['recordType']].extend(
-        sas.DownloadFile(dump_file['url'], ssl_cert=ssl_cert,
-                         ssl_key=ssl_key)['recordData'])
-    logging.debug('%s record added to Full Activity Dump',
-                  dump_file['recordType'])
+    return sas.DownloadFile(dump_file['url'], ssl_cert=ssl_cert,
+                            ssl_key=ssl_key)['recordData']
+
+  dump_data = {'cbsd': [], 'esc_sensor': [], 'zone': []}
+  num_workers = max(1, min(max_workers, len(dump_files)))
+  with ThreadPoolExecutor(max_workers=num_workers) as executor:
+    for dump_file, records in zip(dump_files,
+                                  executor.map(_DownloadRecords, dump_files)):
+      dump_data[dump_file['recordType']].extend(records)
+      logging.debug('%s record added to Full Activity Dump',
+                    dump_file['recordType'])
 
   return full_activity_dump.FullActivityDump(dump_data)
+
+
+def streamFullActivityDumpRecords(sas, dump, record_callback,
+                                  ssl_cert=None, ssl_key=None):
+  """Downloads the dump files and streams their records as they are received.
+
+  Contrary to `_processDump`, the dump files are parsed incrementally while
+  being downloaded, so that the records are never all held in memory at once
+  (unless the callback keeps them).
+
+  Args:
+    sas: A SasInterface object to request.
+    dump: The https://base_url/version/dump message response, used to extract
+      the files to be downloaded.
+    record_callback: A function called as record_callback(record_type, record)
+      for each record of the dump (except coordination records), where
+      record_type is one of 'cbsd', 'esc_sensor' or 'zone'.
+    ssl_cert: Optional. ssl certificate to use when making get requests.
+    ssl_key: Optional. ssl key to use when making get requests.
+  Raises:
+    AssertError: The FAD response does not match the expected schema or a
+      request does not return 200.
+    ValueError: A dump file is not a valid activity dump JSON file.
+  """
+  util.assertContainsRequiredFields('FullActivityDump.schema.json', dump)
+  for dump_file in dump['files']:
+    record_type = dump_file['recordType']
+    if record_type == 'coordination':
+      logging.debug(
+          'Coordination event record skipped in downloading Full Activity Dump')
+      continue
+    util.assertContainsRequiredFields('ActivityDumpFile.schema.json', dump_file)
+    parser = _RecordDataParser(
+        lambda record, record_type=record_type: record_callback(record_type, record))
+    sas.DownloadFileStream(dump_file['url'], parser.feed,
+                           ssl_cert=ssl_cert, ssl_key=ssl_key)
+    parser.close()
+    logging.debug('%d %s records streamed from Full Activity Dump',
+                  parser.num_records, record_type)
+
+
+def getGrantTableFromFullActivityDump(sas, dump, is_managing_sas=False,
+                                      ssl_cert=None, ssl_key=None,
+                                      batch_size=1000):
+  """Returns the grants of a Full Activity Dump, streaming the dump files.
+
+  The CBSD records are converted into grants by batches as they are received,
+  so that the memory use is bounded by a batch of records and the compact
+  grant table.
+
+  Args:
+    sas: A SasInterface object to request.
+    dump: The https://base_url/version/dump message response.
+    is_managing_sas: Flag indicating if the dump is from the managing SAS.
+    ssl_cert: Optional. ssl certificate to use when making get requests.
+    ssl_key: Optional. ssl key to use when making get requests.
+    batch_size: The number of CBSD records per conversion batch.
+  Returns:
+    A |data.GrantTable| of all the grants of the dump.
+  """
+  tables = []
+  batch = []
+
+  def _ProcessBatch():
+    tables.append(data.GrantTable.fromCbsdDataDump(batch, is_managing_sas))
+    del batch[:]
+
+  def _AddRecord(record_type, record):
+    if record_type != 'cbsd':
+      return
+    batch.append(record)
+    if len(batch) >= batch_size:
+      _ProcessBatch()
+
+  streamFullActivityDumpRecords(sas, dump, _AddRecord, ssl_cert, ssl_key)
+  _ProcessBatch()
+  return data.GrantTable.concatenate(tables)
+
+
+# Parsing states of the |_RecordDataParser|.
+_START, _KEY, _KEY_OR_END, _COLON, _VALUE, _SEPARATOR = range(6)
+_RECORD, _RECORD_OR_END, _RECORD_SEPARATOR, _END = range(6, 10)
+_NON_WHITESPACE = re.compile(r'\S')
+_VALUE_END_CHARS = ',:]} \t\n\r'
+
+
+class _RecordDataParser(object):
+  """Incremental parser of the records of an activity dump file.
+
+  An activity dump file is a JSON object holding all its records in its
+  'recordData' array. The parser is fed with successive chunks of the file,
+  and calls a callback on each record as soon as it is complete. Only the
+  current incomplete record is buffered.
+
+  Attributes:
+    num_records: The number of records parsed so far.
+  """
+
+  def __init__(self, record_callback):
+    self._record_callback = record_callback
+    self._json_decoder = json.JSONDecoder()
+    self._utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    self._buffer = ''
+    self._pos = 0
+    self._state = _START
+    self._key = None
+    self.num_records = 0
+
+  def feed(self, chunk):
+    """Parses a new chunk (bytes or text) of the file."""
+    if isinstance(chunk, bytes):
+      chunk = self._utf8_decoder.decode(chunk)
+    self._buffer = self._buffer[self._pos:] + chunk
+    self._pos = 0
+    self._Parse()
+
+  def close(self):
+    """Ends the parsing, checking the file is complete."""
+    self.feed(self._utf8_decoder.decode(b'', final=True))
+    if self._state != _END:
+      raise ValueError('Invalid or truncated activity dump file')
+
+  def _NextChar(self):
+    """Skips whitespaces and returns the next char, or None if none available."""
+    match = _NON_WHITESPACE.search(self._buffer, self._pos)
+    if not match:
+      self._pos = len(self._buffer)
+      return None
+    self._pos = match.start()
+    return self._buffer[self._pos]
+
+  def _DecodeValue(self):
+    """Decodes the next JSON value, returning (True, value) if complete."""
+    try:
+      value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+    except ValueError:
+      return False, None
+    # A value is only complete when followed by a separator (for example
+    # a number can be truncated at the end of the current buffer).
+    if end >= len(self._buffer) or self._buffer[end] not in _VALUE_END_CHARS:
+      return False, None
+    self._pos = end
+    return True, value
+
+  def _Check(self, char, expected_chars):
+    """Checks the next char is one of the expected ones."""
+    if char not in expected_chars:
+      raise ValueError('Invalid activity dump file: unexpected `%s` at: %s' %
+                       (char, self._buffer[self._pos:self._pos+40]))
+
+  def _Parse(self):
+    """Parses the buffer as far as possible."""
+    while True:
+      char = self._NextChar()
+      if char is None:
+        return
+      if self._state == _START:
+        self._Check(char, '{')
+        self._pos += 1
+        self._state = _KEY_OR_END
+      elif self._state in (_KEY, _KEY_OR_END):
+        if self._state == _KEY_OR_END and char == '}':
+          self._pos += 1
+          self._state = _END
+          continue
+        self._Check(char, '"')
+        is_complete, self._key = self._DecodeValue()
+        if not is_complete:
+          return
+        self._state = _COLON
+      elif self._state == _COLON:
+        self._Check(char, ':')
+        self._pos += 1
+        self._state = _VALUE
+      elif self._state == _VALUE:
+        if self._key == 'recordData':
+          self._Check(char, '[')
+          self._pos += 1
+          self._state = _RECORD_OR_END
+          continue
+        is_complete, _ = self._DecodeValue()
+        if not is_complete:
+          return
+        self._state = _SEPARATOR
+      elif self._state == _SEPARATOR:
+        self._Check(char, ',}')
+        self._pos += 1
+        self._state = _KEY if char == ',' else _END
+      elif self._state in (_RECORD, _RECORD_OR_END):
+        if self._state == _RECORD_OR_END and char == ']':
+          self._pos += 1
+          self._state = _SEPARATOR
+          continue
+        is_complete, record = self._DecodeValue()
+        if not is_complete:
+          return
+        self.num_records += 1
+        self._record_callback(record)
+        self._state = _RECORD_SEPARATOR
+      elif self._state == _RECORD_SEPARATOR:
+        self._Check(char, ',]')
+        self._pos += 1
+        self._state = _RECORD if char == ',' else _SEPARATOR
+      else:
+        # Only whitespaces allowed after the end of the dump file object.
+        self._Check(char, '')
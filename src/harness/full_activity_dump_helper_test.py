@@ -18,9 +18,12 @@ from __future__ import division
 from __future__ import print_function
 
 from datetime import datetime
+import json
+import threading
 import unittest
 import logging
 import copy
+from six.moves import BaseHTTPServer
 
 try:
   from unittest import mock
@@ -28,6 +31,8 @@ except ImportError:
   import mock
 
 import full_activity_dump_helper
+import request_handler
+from reference_models.common import data
 
 
 class FullActivityDumpHelperTest(unittest.TestCase):
@@ -84,11 +89,21 @@ class FullActivityDumpHelperTest(unittest.TestCase):
     else:
       raise ValueError('unsupported URL: %s' % url)
 
+  @staticmethod
+  def downloadFileStreamHelper(url, write_function, ssl_cert=None, ssl_key=None):
+    """Helper to stream test dump content in small chunks."""
+    content = json.dumps(
+        FullActivityDumpHelperTest.downloadFileHelper(url, ssl_cert, ssl_key),
+        indent=2).encode('utf-8')
+    for k in range(0, len(content), 3):
+      write_function(content[k:k+3])
+
   @staticmethod
   def getMockSasInterface():
     sas_interface = mock.MagicMock()
     sas_interface.GetFullActivityDump.side_effect = FullActivityDumpHelperTest.getFullActivityDumpHelper
     sas_interface.DownloadFile.side_effect = FullActivityDumpHelperTest.downloadFileHelper
+    sas_interface.DownloadFileStream.side_effect = FullActivityDumpHelperTest.downloadFileStreamHelper
     return sas_interface
 
   def test_create_fad_for_sas_uut(self):
@@ -120,6 +135,153 @@ class FullActivityDumpHelperTest(unittest.TestCase):
             'zone': [{'g': 1}]
         })
 
+  def test_concurrent_downloads(self):
+    """Tests that the dump files are downloaded concurrently, keeping order."""
+    mock_sas = FullActivityDumpHelperTest.getMockSasInterface()
+    other_download_started = threading.Event()
+
+    def _DownloadFile(url, ssl_cert=None, ssl_key=None):
+      # The first file completes only once another download is started.
+      if url == 'cbsd/cbsd_test_url.json':
+        self.assertTrue(other_download_started.wait(10))
+      else:
+        other_download_started.set()
+      return FullActivityDumpHelperTest.downloadFileHelper(url)
+
+    mock_sas.DownloadFile.side_effect = _DownloadFile
+    fad = full_activity_dump_helper._processDump(
+        mock_sas, mock_sas.GetFullActivityDump(), max_workers=2)
+    self.assertEqual(mock_sas.DownloadFile.call_count, 4)
+    self.assertDictEqual(
+        fad.getData(), {
+            'cbsd': [{'a': 1, 'b': 2}, {'c': 3}, {'j': 1}],
+            'esc_sensor': [{'d': 1}],
+            'zone': [{'g': 1}]
+        })
+
+  def test_stream_records(self):
+    """Tests that the FAD records can be streamed."""
+    mock_sas = FullActivityDumpHelperTest.getMockSasInterface()
+    records = []
+    full_activity_dump_helper.streamFullActivityDumpRecords(
+        mock_sas, mock_sas.GetFullActivityDump(),
+        lambda record_type, record: records.append((record_type, record)))
+    mock_sas.DownloadFile.assert_not_called()
+    self.assertListEqual(records, [('cbsd', {'a': 1, 'b': 2}), ('cbsd', {'c': 3}),
+                                   ('zone', {'g': 1}), ('esc_sensor', {'d': 1}),
+                                   ('cbsd', {'j': 1})])
+
+  def test_stream_records_invalid_file(self):
+    """Tests that a parsing error of a streamed file raises a ValueError."""
+    class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+      def do_GET(self):
+        content = b'{"recordData": [{"a": 1}, 2 3]}'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+      def log_message(self, *args):
+        pass
+
+    server = BaseHTTPServer.HTTPServer(('localhost', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    self.addCleanup(thread.join)
+    self.addCleanup(server.server_close)
+    self.addCleanup(server.shutdown)
+    url = 'http://localhost:%d/cbsd.json' % server.server_address[1]
+
+    # The TLS options are ignored by curl on a plain HTTP connection.
+    config = request_handler.TlsConfig().WithClientCertificate(
+        'certs/client.cert', 'certs/client.key')
+    pool = mock.MagicMock(wraps=request_handler.ConnectionPool())
+    mock_sas = mock.MagicMock()
+    mock_sas.DownloadFileStream.side_effect = (
+        lambda _, write_function, ssl_cert=None, ssl_key=None:
+        request_handler.RequestGetStream(
+            url, config, write_function, pool))
+    dump = FullActivityDumpHelperTest.getFullActivityDumpHelper()
+    dump['files'] = dump['files'][:1]
+    records = []
+    with self.assertRaises(ValueError):
+      full_activity_dump_helper.streamFullActivityDumpRecords(
+          mock_sas, dump,
+          lambda record_type, record: records.append((record_type, record)))
+    self.assertListEqual(records, [('cbsd', {'a': 1}), ('cbsd', 2)])
+    # The curl handle is released despite the error.
+    self.assertEqual(pool.Acquire.call_count, 1)
+    self.assertEqual(pool.Release.call_count, 1)
+
+  def test_record_parser(self):
+    """Tests the incremental parsing of records on tricky content."""
+    content = json.dumps({
+        'startTime': '2018-01-01T00:00:00Z',
+        'description': 'a "recordData": [{}] in a string',
+        'other': [1.5e3, {'x': [']', '}']}, None, True],
+        'recordData': [{'id': u'cbsd/\u00e9\u00e8\U0001F600', 'n': 123456789},
+                       {'id': '\\"', 'grants': [{'a': [], 'b': {}}]},
+                       12.25, [], 'last'],
+        'endTime': 1234}, ensure_ascii=False).encode('utf-8')
+    expected_records = json.loads(content.decode('utf-8'))['recordData']
+    for chunk_size in [1, 2, 5, 1000]:
+      records = []
+      parser = full_activity_dump_helper._RecordDataParser(records.append)
+      for k in range(0, len(content), chunk_size):
+        parser.feed(content[k:k+chunk_size])
+      parser.close()
+      self.assertListEqual(records, expected_records)
+      self.assertEqual(parser.num_records, 5)
+
+    # Empty records
+    records = []
+    parser = full_activity_dump_helper._RecordDataParser(records.append)
+    parser.feed(b' { "recordData" : [ ] } \n')
+    parser.close()
+    self.assertListEqual(records, [])
+
+    # Truncated or invalid content.
+    for content in [b'{"recordData": [{"a": 1}, {"b"', b'{"recordData": [1, 2]',
+                    b'{"recordData": [1 2]}', b'{"recordData": 3}',
+                    b'{"recordData": []} 1']:
+      parser = full_activity_dump_helper._RecordDataParser(records.append)
+      with self.assertRaises(ValueError):
+        parser.feed(content)
+        parser.close()
+
+  def test_grant_table(self):
+    """Tests the streaming of the FAD grants into a grant table."""
+    def MakeCbsdRecord(k):
+      return {
+          'id': 'cbsd_%d' % k,
+          'registration': {
+              'cbsdCategory': 'A' if k % 2 else 'B',
+              'installationParam': {
+                  'latitude': 37 + k / 100., 'longitude': -122 + k / 100.,
+                  'height': 5 + k, 'heightType': 'AGL',
+                  'indoorDeployment': bool(k % 2), 'antennaAzimuth': 10 * k,
+                  'antennaGain': 6, 'antennaBeamwidth': 90}},
+          'grants': [{
+              'id': 'grant_%d_%d' % (k, j),
+              'operationParam': {
+                  'maxEirp': 20 + j,
+                  'operationFrequencyRange': {
+                      'lowFrequency': 3550e6 + 10e6 * j,
+                      'highFrequency': 3560e6 + 10e6 * j}}}
+                     for j in range(k % 3)]}
+    cbsd_records = [MakeCbsdRecord(k) for k in range(25)]
+    mock_sas = mock.MagicMock()
+    mock_sas.DownloadFileStream.side_effect = (
+        lambda url, write_function, ssl_cert, ssl_key: write_function(
+            json.dumps({'recordData': cbsd_records}).encode('utf-8')))
+    dump = FullActivityDumpHelperTest.getFullActivityDumpHelper()
+    dump['files'] = dump['files'][:1]
+    table = full_activity_dump_helper.getGrantTableFromFullActivityDump(
+        mock_sas, dump, batch_size=4)
+    self.assertListEqual(
+        list(table),
+        data.getAllGrantInfoFromCbsdDataDump(cbsd_records, False))
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -17,6 +17,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import hashlib
 import unittest
 
 from full_activity_dump import FullActivityDump
@@ -130,6 +131,38 @@ class FullActivityDumpTest(unittest.TestCase):
         'zone': []
     })
 
+  def test_cbsd_lookups(self):
+    """Tests the lookups of CBSD records and grants by id."""
+    records = [
+        {'id': 'cbsd/fcc1/' + hashlib.sha1(b'sn1').hexdigest(),
+         'registration': {'fccId': 'fcc1'},
+         'grants': [{'id': 'g1'}, {'id': 'g2'}]},
+        {'id': 'cbsd/fcc2/abc', 'registration': {'fccId': 'fcc2'},
+         'grants': [{'id': 'g1'}]},
+        {'id': 'cbsd/fcc1/def', 'registration': {'fccId': 'fcc1'},
+         'grants': []}]
+    fad = FullActivityDump({'cbsd': records})
+    self.assertIs(fad.getCbsdRecordById('cbsd/fcc2/abc'), records[1])
+    self.assertIsNone(fad.getCbsdRecordById('cbsd/fcc3/abc'))
+    self.assertIs(fad.getCbsdRecordBySerialNumber('fcc1', 'sn1'), records[0])
+    self.assertEqual(
+        fad.getCbsdRecordsById(['cbsd/fcc1/def', 'unknown', records[0]['id']]),
+        [records[0], records[2]])
+    self.assertEqual(
+        fad.getCbsdRecordsById(set(['cbsd/fcc2/abc']), exclude=True),
+        [records[0], records[2]])
+    self.assertEqual(fad.getCbsdRecordsByFccId('fcc1'), [records[0], records[2]])
+    self.assertEqual(fad.getGrantsById('g1'),
+                     [(records[0], {'id': 'g1'}), (records[1], {'id': 'g1'})])
+    # Grants removed in place, as done by the pre-IAP purges.
+    records[0]['grants'] = [{'id': 'g2'}]
+    self.assertEqual(fad.getGrantsById('g1'), [(records[1], {'id': 'g1'})])
+    # Indexes invalidated when the records are set.
+    fad.setCbsdRecords(records[1:])
+    self.assertIsNone(fad.getCbsdRecordBySerialNumber('fcc1', 'sn1'))
+    self.assertEqual(fad.getCbsdRecordsByFccId('fcc1'), [records[2]])
+    self.assertEqual(fad.getGrantsById('g2'), [])
+
 
 if __name__ == '__main__':
   unittest.main()
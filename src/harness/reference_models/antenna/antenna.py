@@ -28,6 +28,12 @@ Typical usage:
   # Get FSS earth station antenna gains
   gains = GetFssAntennaGains(hor_dirs, ver_dirs,
                              fss_azimuth, fss_elevation, fss_ant_gain)
+
+  # Get the gains of many antennas at once, for example the CBSD antenna gains
+  # of all grants toward all protection points, using the broadcasting
+  # versions of the above routines.
+  gains = GetStandardAntennaGainsBatch(bearings[:, np.newaxis],
+                                       ant_azimuths, ant_beamwidths, ant_gains)
 """
 from __future__ import absolute_import
 from __future__ import division
@@ -117,6 +123,43 @@ def GetStandardAntennaGains(hor_dirs, ant_azimuth=None, ant_beamwidth=None, ant_
   return gains
 
 
+def GetStandardAntennaGainsBatch(hor_dirs, ant_azimuths, ant_beamwidths,
+                                 ant_gains=0):
+  """Computes the gains of many standard antennas defined by beamwidth.
+
+  Broadcasting version of `GetStandardAntennaGains`, giving identical results:
+  all the inputs are arrays broadcast together with the numpy rules, so that
+  for example the gains of all grants toward several directions can be
+  computed in a single call.
+
+  Inputs:
+    hor_dirs:       Ray directions in horizontal plane (degrees).
+    ant_azimuths:   Antenna azimuths (degrees).
+    ant_beamwidths: Antenna 3dB cutoff beamwidths (degrees).
+    ant_gains:      Antenna gains (dBi).
+    The antennas with an azimuth or beamwidth being None (or NaN), and the ones
+    with a beamwidth of 0 or 360 degrees, are isotropic.
+
+  Returns:
+    The CBSD antenna gains (in dB), as an ndarray of the broadcast shape.
+  """
+  hor_dirs = np.asarray(hor_dirs, dtype=float)
+  ant_azimuths = np.array(ant_azimuths, dtype=float)
+  ant_beamwidths = np.array(ant_beamwidths, dtype=float)
+  ant_gains = np.asarray(ant_gains, dtype=float)
+
+  is_isotropic = (np.isnan(ant_azimuths) | np.isnan(ant_beamwidths) |
+                  (ant_beamwidths == 0) | (ant_beamwidths == 360))
+  bore_angle = hor_dirs - ant_azimuths
+  bore_angle = np.where(bore_angle > 180, bore_angle - 360, bore_angle)
+  bore_angle = np.where(bore_angle < -180, bore_angle + 360, bore_angle)
+  with np.errstate(invalid='ignore', divide='ignore'):
+    gains = -12 * (bore_angle / ant_beamwidths)**2
+  gains = np.where(gains < -20, -20., gains)
+  gains = np.where(is_isotropic, 0., gains)
+  return gains + ant_gains
+
+
 def GetRadarNormalizedAntennaGains(hor_dirs,
                                    radar_azimuth,
                                    radar_beamwidth=3):
@@ -156,6 +199,38 @@ def GetRadarNormalizedAntennaGains(hor_dirs,
   return gains
 
 
+def GetRadarNormalizedAntennaGainsBatch(hor_dirs,
+                                        radar_azimuths,
+                                        radar_beamwidths=3):
+  """Computes the DPA radar normalized antenna gains of many radar antennas.
+
+  Broadcasting version of `GetRadarNormalizedAntennaGains`, giving identical
+  results: all the inputs are arrays broadcast together with the numpy rules.
+  For example the gains of all grants for all the radar azimuths are obtained
+  with `hor_dirs` of shape (num_grants, 1) and `radar_azimuths` of shape
+  (num_azimuths,).
+
+  Inputs:
+    hor_dirs:         Ray directions in horizontal plane (degrees).
+    radar_azimuths:   The radar antenna azimuths (degrees).
+    radar_beamwidths: The radar antenna beamwidths (degrees).
+
+  Returns:
+    The normalized antenna gains (in dB), as an ndarray of the broadcast shape.
+  """
+  hor_dirs = np.asarray(hor_dirs, dtype=float)
+  radar_azimuths = np.asarray(radar_azimuths, dtype=float)
+  radar_beamwidths = np.asarray(radar_beamwidths, dtype=float)
+
+  bore_angle = hor_dirs - radar_azimuths
+  bore_angle = np.where(bore_angle > 180, bore_angle - 360, bore_angle)
+  bore_angle = np.where(bore_angle < -180, bore_angle + 360, bore_angle)
+  bore_angle = np.abs(bore_angle)
+  gains = np.where(bore_angle < radar_beamwidths / 2., 0., -25.)
+  gains[np.broadcast_to(radar_beamwidths == 360, gains.shape)] = 0.
+  return gains
+
+
 def GetFssAntennaGains(hor_dirs, ver_dirs,
                        fss_pointing_azimuth, fss_pointing_elevation,
                        fss_antenna_gain,
@@ -202,6 +277,46 @@ def GetFssAntennaGains(hor_dirs, ver_dirs,
   return gains
 
 
+def GetFssAntennaGainsBatch(hor_dirs, ver_dirs,
+                            fss_pointing_azimuths, fss_pointing_elevations,
+                            fss_antenna_gains,
+                            w1=0, w2=1.0):
+  """Computes the antenna gains of many FSS earth stations.
+
+  Broadcasting version of `GetFssAntennaGains`, giving identical results: all
+  the inputs are arrays broadcast together with the numpy rules.
+
+  Inputs:
+    hor_dirs:                Ray directions in horizontal plane (degrees).
+    ver_dirs:                Ray directions in vertical plane (degrees).
+    fss_pointing_azimuths:   FSS earth stations azimuth angles (degrees).
+    fss_pointing_elevations: FSS earth stations vertical angles (degrees).
+    fss_antenna_gains:       FSS earth stations nominal antenna gains (dBi).
+    w1, w2:                  Weights on the tangent and perpendicular
+                             components (see `GetFssAntennaGains`).
+  Returns:
+    The FSS gains on the incoming rays (in dB), as an ndarray of the broadcast
+    shape.
+  """
+  hor_dirs = np.radians(np.asarray(hor_dirs, dtype=float))
+  ver_dirs = np.radians(np.asarray(ver_dirs, dtype=float))
+  fss_pointing_elevations = np.radians(
+      np.asarray(fss_pointing_elevations, dtype=float))
+  fss_pointing_azimuths = np.radians(
+      np.asarray(fss_pointing_azimuths, dtype=float))
+
+  # Compute the satellite antenna off-axis angle - see formula in R2-SGN-21, iii
+  theta = 180/np.pi * np.arccos(
+      np.cos(ver_dirs) * np.cos(fss_pointing_elevations)
+      * np.cos(fss_pointing_azimuths - hor_dirs) +
+      np.sin(ver_dirs) * np.sin(fss_pointing_elevations))
+
+  nominal_gains = np.broadcast_to(fss_antenna_gains, theta.shape)
+  gain_gso_t, gain_gso_p = _GetGsoGains(theta.ravel(), nominal_gains.ravel())
+  gains = w1 * gain_gso_t + w2 * gain_gso_p
+  return gains.reshape(theta.shape)
+
+
 def _GetGsoGains(theta, nominal_gain):
   """Returns FSS earth station gains from the off-axis angle.
 
@@ -209,7 +324,8 @@ def _GetGsoGains(theta, nominal_gain):
 
   Inputs:
     theta:        Off-axis angles (degrees), as a ndarray
-    nominal_gain: Nominal antenna gain (dBi)
+    nominal_gain: Nominal antenna gain (dBi), as a scalar or a ndarray of same
+                  size as theta
   Returns:
     a tuple of ndarray:
       gain_gso_t: Gains in the tangent plane of the GSO (dB).
@@ -219,11 +335,12 @@ def _GetGsoGains(theta, nominal_gain):
   gain_gso_t = -10 * np.ones(len(theta))
   gain_gso_p = gain_gso_t.copy()
 
-  gain_gso_p[theta <= 3] = nominal_gain
+  nominal_gain = np.broadcast_to(nominal_gain, theta.shape)
+  gain_gso_p[theta <= 3] = nominal_gain[theta <= 3]
   idx_3_to_48 = np.where((theta > 3) & (theta <= 48))[0]
   gain_gso_p[idx_3_to_48] = 32 - 25 * np.log10(theta[idx_3_to_48])
 
-  gain_gso_t[theta <= 1.5] = nominal_gain
+  gain_gso_t[theta <= 1.5] = nominal_gain[theta <= 1.5]
   idx_1_5_to_7 = np.where((theta > 1.5) & (theta <= 7))[0]
   gain_gso_t[idx_1_5_to_7] = 29 - 25 * np.log10(theta[idx_1_5_to_7])
   gain_gso_t[(theta > 7) & (theta <= 9.2)] = 8
@@ -154,6 +154,66 @@ class TestAntenna(unittest.TestCase):
                           32-25*np.log10(47),
                           -10]))), 0)
 
+  def test_standard_gain_batch(self):
+    np.random.seed(1234)
+    hor_dirs = np.random.uniform(0, 360, (6, 20))
+    azimuths = [0, 50.5, None, 270, 359.9, 120]
+    beamwidths = [120, 90, 60, 0, 30, 360]
+    ant_gains = [10, 5, 0, 3, 12, 7]
+    gains = antenna.GetStandardAntennaGainsBatch(
+        hor_dirs, np.array(azimuths, dtype=float)[:, np.newaxis],
+        np.array(beamwidths)[:, np.newaxis], np.array(ant_gains)[:, np.newaxis])
+    self.assertEqual(gains.shape, (6, 20))
+    for k in range(6):
+      self.assertListEqual(
+          list(gains[k]),
+          list(antenna.GetStandardAntennaGains(hor_dirs[k], azimuths[k],
+                                               beamwidths[k], ant_gains[k])))
+    # One direction per antenna.
+    gains = antenna.GetStandardAntennaGainsBatch(hor_dirs[:, 0], azimuths,
+                                                 beamwidths, ant_gains)
+    self.assertListEqual(list(gains), list(
+        antenna.GetStandardAntennaGains(hor_dirs[k, 0], azimuths[k],
+                                        beamwidths[k], ant_gains[k])
+        for k in range(6)))
+    # Scalar inputs.
+    for k in range(6):
+      self.assertEqual(
+          antenna.GetStandardAntennaGainsBatch(hor_dirs[k, 0], azimuths[k],
+                                               beamwidths[k], ant_gains[k]),
+          antenna.GetStandardAntennaGains(hor_dirs[k, 0], azimuths[k],
+                                          beamwidths[k], ant_gains[k]))
+
+  def test_dpa_gain_batch(self):
+    np.random.seed(1234)
+    hor_dirs = np.random.uniform(0, 360, 50)
+    azimuths = np.arange(0, 360, 1.5)
+    for beamwidth in [3, 10, 360]:
+      gains = antenna.GetRadarNormalizedAntennaGainsBatch(
+          hor_dirs[:, np.newaxis], azimuths, beamwidth)
+      self.assertEqual(gains.shape, (50, len(azimuths)))
+      for k, azimuth in enumerate(azimuths):
+        self.assertTrue(np.all(
+            gains[:, k] == antenna.GetRadarNormalizedAntennaGains(
+                hor_dirs, azimuth, beamwidth)))
+
+  def test_fss_gain_batch(self):
+    np.random.seed(1234)
+    hor_dirs = np.random.uniform(0, 360, (4, 100))
+    ver_dirs = np.random.uniform(-5, 60, (4, 100))
+    fss_azimuths = np.array([[0], [45], [190], [300]])
+    fss_elevations = np.array([[5], [20], [30], [45]])
+    fss_gains = np.array([[40], [45], [50], [55]])
+    for w1, w2 in [(0, 1.0), (0.5, 0.5)]:
+      gains = antenna.GetFssAntennaGainsBatch(
+          hor_dirs, ver_dirs, fss_azimuths, fss_elevations, fss_gains, w1, w2)
+      for k in range(4):
+        self.assertListEqual(
+            list(gains[k]),
+            list(antenna.GetFssAntennaGains(
+                hor_dirs[k], ver_dirs[k], fss_azimuths[k, 0],
+                fss_elevations[k, 0], fss_gains[k, 0], w1, w2)))
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -18,7 +18,15 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
 import six
+from six.moves import cPickle as pickle
 
 try:  # Python3
   from functools import lru_cache
@@ -87,3 +95,210 @@ class CacheManager(object):
 
   def _overrideModuleFunctionWith(self, fn):
     six.get_function_globals(self._fn)[self._fn.__name__] = fn
+
+
+# Persistent cache management
+def _KeyItem(item):
+  """Returns a canonical hashable representation of a function argument."""
+  if isinstance(item, np.ndarray):
+    return ('ndarray', item.dtype.str, item.shape, item.tobytes())
+  if isinstance(item, np.generic):
+    return item.item()
+  if isinstance(item, list):
+    return ('list',) + tuple(_KeyItem(v) for v in item)
+  if isinstance(item, tuple):
+    return (type(item).__name__,) + tuple(_KeyItem(v) for v in item)
+  if isinstance(item, dict):
+    return ('dict',) + tuple((k, _KeyItem(item[k])) for k in sorted(item))
+  return item
+
+
+# Maximum number of pending writes of a |PersistentCacheManager|.
+_MAX_PENDING_WRITES = 1000
+
+
+def _CallKey(fn_name, args, kwargs):
+  """Returns the unique key (hex digest) of a function call."""
+  key_items = (fn_name, _KeyItem(args), _KeyItem(kwargs))
+  return hashlib.sha1(repr(key_items).encode('utf-8')).hexdigest()
+
+
+class PersistentCacheManager(object):
+  """Persistent cache context manager.
+
+  Similar to |CacheManager|, but the function results are memoized into
+  a SQLite database on disk, so that they can be reused across runs and
+  processes. Typical use is to keep the path loss computed for unchanged CBSDs
+  between daily runs, so that only the new or modified CBSDs are recomputed.
+
+  The key of each entry is built from the function name and the exact value of
+  all its arguments (for example the CBSD and receiver geometry, frequency,
+  reliabilities...). The results shall be picklable.
+
+  A `version` string is associated to the database. Whenever a different version
+  is provided, the whole cache is invalidated. It shall be updated when any
+  input not part of the function arguments is modified, typically the
+  terrain or land cover data release, or the propagation model code.
+
+  The cache size is bounded by `max_entries`: when exiting the context, the
+  least recently used entries are evicted.
+
+  The new entries and access times are written in a single transaction when
+  exiting the context, or whenever `_MAX_PENDING_WRITES` writes are pending.
+  Forked worker processes shall call `flush()` to write their last entries.
+
+  Usage:
+    with PersistentCacheManager(my_function, '/path/to/cache.sqlite',
+                                version='ned_2017_12') as cm:
+      # run the code using my_function
+  """
+  def __init__(self, fn, db_path, version='', max_entries=None):
+    """Initializes the persistent cache context manager.
+
+    Args:
+      fn: The module function to memoize.
+      db_path (str): The SQLite database file path.
+      version (str): The version of the data and models. A change of version
+        invalidates all the entries of the cache.
+      max_entries (int): The maximum number of entries kept in the database, or
+        None for unlimited size.
+    """
+    self._fn = fn
+    self._db_path = db_path
+    self._version = str(version)
+    self._max_entries = max_entries
+    self._conn = None
+    self._conn_pid = None
+    self._lock = threading.Lock()
+    self._pending_entries = {}
+    self._pending_accesses = {}
+    self.hits = 0
+    self.misses = 0
+
+  def __enter__(self):
+    self._InitDatabase()
+    self._overrideModuleFunctionWith(self._CachedCall)
+    return self
+
+  def __exit__(self, *args):
+    self._overrideModuleFunctionWith(self._fn)
+    self.flush()
+    self.evict()
+    self._CloseConnection()
+
+  def _Connection(self):
+    """Returns the database connection of the current process."""
+    # A connection cannot be shared by forked processes.
+    if self._conn is None or self._conn_pid != os.getpid():
+      self._conn = sqlite3.connect(self._db_path, timeout=60,
+                                   check_same_thread=False)
+      self._conn_pid = os.getpid()
+      # The pending writes are the ones of the parent process.
+      self._pending_entries = {}
+      self._pending_accesses = {}
+    return self._conn
+
+  def _CloseConnection(self):
+    if self._conn is not None and self._conn_pid == os.getpid():
+      self._conn.close()
+    self._conn = None
+    self._conn_pid = None
+
+  def _InitDatabase(self):
+    """Creates the database tables and checks the version."""
+    with self._lock:
+      conn = self._Connection()
+      with conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS meta '
+                     '(name TEXT PRIMARY KEY, value TEXT)')
+        conn.execute('CREATE TABLE IF NOT EXISTS cache '
+                     '(key TEXT PRIMARY KEY, value BLOB, last_access REAL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS cache_access '
+                     'ON cache (last_access)')
+        row = conn.execute('SELECT value FROM meta WHERE name = ?',
+                           ('version',)).fetchone()
+        if row is None or row[0] != self._version:
+          conn.execute('DELETE FROM cache')
+          conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                       ('version', self._version))
+
+  def _CachedCall(self, *args, **kwargs):
+    key = _CallKey(self._fn.__name__, args, kwargs)
+    with self._lock:
+      conn = self._Connection()
+      value = self._pending_entries.get(key)
+      if value is None:
+        row = conn.execute('SELECT value FROM cache WHERE key = ?',
+                           (key,)).fetchone()
+        if row is not None:
+          value = bytes(row[0])
+      if value is not None:
+        self._pending_accesses[key] = time.time()
+        self.hits += 1
+        self._FlushIfFull()
+        return pickle.loads(value)
+
+    result = self._fn(*args, **kwargs)
+    value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    with self._lock:
+      self._Connection()
+      self._pending_entries[key] = value
+      self._pending_accesses[key] = time.time()
+      self.misses += 1
+      self._FlushIfFull()
+    return result
+
+  def _FlushIfFull(self):
+    if len(self._pending_accesses) >= _MAX_PENDING_WRITES:
+      self._Flush()
+
+  def _Flush(self):
+    """Writes the pending entries and access times (under lock)."""
+    if not self._pending_accesses:
+      return
+    with self._Connection() as conn:
+      conn.executemany('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                       [(key, sqlite3.Binary(value), self._pending_accesses[key])
+                        for key, value in self._pending_entries.items()])
+      conn.executemany('UPDATE cache SET last_access = ? WHERE key = ?',
+                       [(access, key)
+                        for key, access in self._pending_accesses.items()
+                        if key not in self._pending_entries])
+    self._pending_entries = {}
+    self._pending_accesses = {}
+
+  def flush(self):
+    """Writes the pending entries and access times to the database."""
+    with self._lock:
+      self._Flush()
+
+  def evict(self):
+    """Evicts the least recently used entries above `max_entries`."""
+    if self._max_entries is None:
+      return
+    with self._lock:
+      conn = self._Connection()
+      with conn:
+        conn.execute('DELETE FROM cache WHERE key IN ('
+                     ' SELECT key FROM cache ORDER BY last_access DESC'
+                     ' LIMIT -1 OFFSET ?)', (self._max_entries,))
+
+  def clear(self):
+    """Removes all the entries of the cache."""
+    with self._lock:
+      conn = self._Connection()
+      self._pending_entries = {}
+      self._pending_accesses = {}
+      with conn:
+        conn.execute('DELETE FROM cache')
+
+  def cache_info(self):
+    """Returns a tuple (hits, misses, num_entries)."""
+    with self._lock:
+      self._Flush()
+      num_entries = self._Connection().execute(
+          'SELECT COUNT(*) FROM cache').fetchone()[0]
+    return self.hits, self.misses, num_entries
+
+  def _overrideModuleFunctionWith(self, fn):
+    six.get_function_globals(self._fn)[self._fn.__name__] = fn
@@ -0,0 +1,117 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import namedtuple
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import numpy as np
+
+from reference_models.common import cache
+
+_Result = namedtuple('_Result', ['loss', 'num_calls'])
+_num_calls = [0]
+
+
+def _PathLoss(lat, lon, height, reliability=0.5):
+  _num_calls[0] += 1
+  return _Result(loss=lat + lon + height + np.asarray(reliability),
+                 num_calls=_num_calls[0])
+
+
+def _CallPathLoss(*args, **kwargs):
+  # Calls through the module global, as done by the reference models.
+  return _PathLoss(*args, **kwargs)
+
+
+class TestPersistentCache(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.db_path = os.path.join(self.tmp_dir, 'cache.sqlite')
+    _num_calls[0] = 0
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def test_persistence(self):
+    with cache.PersistentCacheManager(_PathLoss, self.db_path, 'v1') as cm:
+      res1 = _CallPathLoss(37., -122., 10., reliability=[0.1, 0.5])
+      res2 = _CallPathLoss(37., -122., 10., reliability=[0.1, 0.5])
+      _CallPathLoss(37., -122., 20., reliability=[0.1, 0.5])
+      self.assertEqual(cm.cache_info(), (1, 2, 2))
+    self.assertEqual(res1.num_calls, 1)
+    self.assertEqual(res2.num_calls, 1)
+    self.assertTrue(np.array_equal(res1.loss, res2.loss))
+    # Out of context: no more cached.
+    self.assertEqual(_CallPathLoss(37., -122., 10.).num_calls, 3)
+
+    # Entries reused in a new context, unless parameters are different.
+    with cache.PersistentCacheManager(_PathLoss, self.db_path, 'v1') as cm:
+      self.assertEqual(
+          _CallPathLoss(37., -122., 10., reliability=[0.1, 0.5]).num_calls, 1)
+      self.assertEqual(
+          _CallPathLoss(37., -122., 10., reliability=np.array([0.1, 0.5])).num_calls, 4)
+      self.assertEqual(_CallPathLoss(37., -122., 10.).num_calls, 5)
+
+  def test_version_change(self):
+    with cache.PersistentCacheManager(_PathLoss, self.db_path, 'v1'):
+      _CallPathLoss(37., -122., 10.)
+    with cache.PersistentCacheManager(_PathLoss, self.db_path, 'v2') as cm:
+      self.assertEqual(cm.cache_info(), (0, 0, 0))
+      self.assertEqual(_CallPathLoss(37., -122., 10.).num_calls, 2)
+
+  def test_eviction(self):
+    with cache.PersistentCacheManager(_PathLoss, self.db_path,
+                                      max_entries=2) as cm:
+      _CallPathLoss(37., -122., 10.)
+      _CallPathLoss(37., -122., 20.)
+      _CallPathLoss(37., -122., 30.)
+      _CallPathLoss(37., -122., 10.)
+      self.assertEqual(cm.cache_info()[2], 3)
+    self.assertEqual(cm.cache_info()[2], 2)
+    with cache.PersistentCacheManager(_PathLoss, self.db_path,
+                                      max_entries=2) as cm:
+      # Least recently used entry has been evicted.
+      self.assertEqual(_CallPathLoss(37., -122., 10.).num_calls, 1)
+      self.assertEqual(_CallPathLoss(37., -122., 30.).num_calls, 3)
+      self.assertEqual(_CallPathLoss(37., -122., 20.).num_calls, 4)
+
+  def test_grouped_writes(self):
+    def NumEntries():
+      conn = sqlite3.connect(self.db_path)
+      try:
+        return conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+      finally:
+        conn.close()
+    with cache.PersistentCacheManager(_PathLoss, self.db_path, 'v1') as cm:
+      _CallPathLoss(37., -122., 10.)
+      _CallPathLoss(37., -122., 20.)
+      # Pending entries are used, but not yet written.
+      self.assertEqual(_CallPathLoss(37., -122., 10.).num_calls, 1)
+      self.assertEqual(NumEntries(), 0)
+      cm.flush()
+      self.assertEqual(NumEntries(), 2)
+      _CallPathLoss(37., -122., 30.)
+    self.assertEqual(NumEntries(), 3)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -26,6 +26,7 @@ import enum
 import numpy as np
 
 from reference_models.geo import drive
+from reference_models.geo import vincenty
 
 
 class ProtectedEntityType(enum.Enum):
@@ -86,6 +87,170 @@ class CbsdGrantInfo(namedtuple('CbsdGrantInfo',
     """Returns unique CBSD key (ie key based on installation params only)."""
     return self[0:8]
 
+# Columns of the |GrantTable|, ie all the |CbsdGrantInfo| fields except the IDs.
+_GRANT_TABLE_DTYPE = np.dtype([('latitude', np.float64),
+                               ('longitude', np.float64),
+                               ('height_agl', np.float64),
+                               ('indoor_deployment', np.bool_),
+                               ('cbsd_category', 'U1'),
+                               ('antenna_azimuth', np.float64),
+                               ('antenna_gain', np.float64),
+                               ('antenna_beamwidth', np.float64),
+                               ('max_eirp', np.float64),
+                               ('low_frequency', np.float64),
+                               ('high_frequency', np.float64),
+                               ('is_managed_grant', np.bool_)])
+# The optional fields, stored as NaN (or empty string) when None.
+_GRANT_TABLE_OPTIONAL_FIELDS = ('cbsd_category', 'antenna_azimuth',
+                                'antenna_beamwidth', 'max_eirp',
+                                'low_frequency', 'high_frequency')
+
+
+class GrantTable(object):
+  """A columnar table of CBSD grants.
+
+  Holds the same information as a list of |CbsdGrantInfo|, but with the grant
+  parameters stored in a numpy structured array, allowing vectorized filtering
+  on a large number of grants, with a much smaller memory footprint.
+
+  The table behaves as a read-only sequence of |CbsdGrantInfo|, which are
+  created on the fly when accessed, so it can be passed to existing routines
+  expecting a list of grants:
+    table[k]: the k-th grant, as a |CbsdGrantInfo|.
+    table[mask or idxs or slice]: a sub |GrantTable|.
+    iter(table): iterator over the |CbsdGrantInfo| grants.
+
+  Typical usage:
+    table = GrantTable.fromGrants(grants)
+    # Select the cat B grants overlapping a channel
+    mask = (table.frequencyOverlapMask(3550e6, 3560e6) &
+            table.categoryMask('B'))
+    for grant in table[mask]:
+      ...
+
+  Attributes:
+    columns: A numpy structured array holding the grant parameters, one row per
+      grant, with fields named as the |CbsdGrantInfo| fields (except the IDs).
+      Missing optional values are stored as NaN (or empty string for category).
+    cbsd_ids: An object ndarray of the CBSD ids.
+    grant_ids: An object ndarray of the grant ids.
+    index: An int ndarray of the grant indices in the original table, which are
+      kept in the sub-tables extracted from it.
+  """
+  def __init__(self, columns, cbsd_ids, grant_ids, index=None):
+    """Initializes the table from its columns. See class attributes."""
+    self.columns = columns
+    self.cbsd_ids = cbsd_ids
+    self.grant_ids = grant_ids
+    if index is None:
+      index = np.arange(len(columns))
+    self.index = index
+
+  @classmethod
+  def fromGrants(cls, grants):
+    """Builds a |GrantTable| from an iterable of |CbsdGrantInfo|."""
+    grants = list(grants)
+    columns = np.zeros(len(grants), dtype=_GRANT_TABLE_DTYPE)
+    for name in _GRANT_TABLE_DTYPE.names:
+      values = [getattr(grant, name) for grant in grants]
+      if name in _GRANT_TABLE_OPTIONAL_FIELDS:
+        missing = np.nan if name != 'cbsd_category' else ''
+        values = [missing if value is None else value for value in values]
+      columns[name] = values
+    cbsd_ids = np.empty(len(grants), dtype=object)
+    cbsd_ids[:] = [grant.cbsd_id for grant in grants]
+    grant_ids = np.empty(len(grants), dtype=object)
+    grant_ids[:] = [grant.grant_id for grant in grants]
+    return cls(columns, cbsd_ids, grant_ids)
+
+  @classmethod
+  def fromCbsdDataDump(cls, cbsd_data_records, is_managing_sas=True,
+                       ppa_record=None):
+    """Builds a |GrantTable| from FAD CBSD records.
+
+    See `getAllGrantInfoFromCbsdDataDump` for the description of arguments.
+    """
+    if ppa_record is not None:
+      cbsd_data_records = getCbsdsNotPartOfPpaCluster(cbsd_data_records, ppa_record)
+    return cls.fromGrants(
+        constructCbsdGrantInfo(cbsd_data_record['registration'], grant,
+                               is_managing_sas=is_managing_sas)
+        for cbsd_data_record in cbsd_data_records
+        for grant in cbsd_data_record['grants'])
+
+  @classmethod
+  def concatenate(cls, tables):
+    """Returns the concatenation of a sequence of |GrantTable|.
+
+    The index of the returned table is the position of the grants in it.
+    """
+    if not tables:
+      return cls.fromGrants([])
+    return cls(np.concatenate([table.columns for table in tables]),
+               np.concatenate([table.cbsd_ids for table in tables]),
+               np.concatenate([table.grant_ids for table in tables]))
+
+  def __len__(self):
+    return len(self.columns)
+
+  def __iter__(self):
+    for k in range(len(self.columns)):
+      yield self._getGrant(k)
+
+  def __getitem__(self, key):
+    if isinstance(key, (int, np.integer)):
+      return self._getGrant(key)
+    return GrantTable(self.columns[key], self.cbsd_ids[key],
+                      self.grant_ids[key], self.index[key])
+
+  def _getGrant(self, k):
+    """Returns the k-th grant as a |CbsdGrantInfo|."""
+    values = self.columns[k].tolist()
+    values = [None if ((name in _GRANT_TABLE_OPTIONAL_FIELDS) and
+                       (value != value or value == ''))
+              else value
+              for name, value in zip(_GRANT_TABLE_DTYPE.names, values)]
+    return CbsdGrantInfo(*values, cbsd_id=self.cbsd_ids[k],
+                         grant_id=self.grant_ids[k])
+
+  def toGrants(self):
+    """Returns the list of |CbsdGrantInfo| of the table."""
+    return list(self)
+
+  def frequencyOverlapMask(self, low_frequency, high_frequency):
+    """Returns the mask of grants overlapping a frequency range (Hz)."""
+    return ((np.minimum(self.columns['high_frequency'], high_frequency)
+             - np.maximum(self.columns['low_frequency'], low_frequency)) > 0)
+
+  def categoryMask(self, cbsd_category):
+    """Returns the mask of grants of a given category ('A' or 'B')."""
+    return self.columns['cbsd_category'] == cbsd_category
+
+  def managedMask(self):
+    """Returns the mask of grants belonging to the managing SAS."""
+    return self.columns['is_managed_grant']
+
+  def distancesKm(self, latitude, longitude):
+    """Returns the ndarray of geodesic distances (km) of grants to a point."""
+    dists_km, _, _ = vincenty.GeodesicDistanceBearingArrays(
+        self.columns['latitude'], self.columns['longitude'],
+        latitude, longitude)
+    return dists_km
+
+  def neighborhoodMask(self, latitude, longitude,
+                       max_dist_cat_a_km, max_dist_cat_b_km):
+    """Returns the mask of grants within a category dependent distance of a point.
+
+    Inputs:
+      latitude, longitude: The point coordinates (degrees).
+      max_dist_cat_a_km: The neighborhood distance for cat A grants (km).
+      max_dist_cat_b_km: The neighborhood distance for cat B grants (km).
+    """
+    max_dists_km = np.where(self.categoryMask('B'),
+                            max_dist_cat_b_km, max_dist_cat_a_km)
+    return self.distancesKm(latitude, longitude) <= max_dists_km
+
+
 # Define FSS Protection Point, i.e., a tuple with named fields of
 # 'latitude', 'longitude', 'height_agl', 'max_gain_dbi', 'pointing_azimuth',
 # 'pointing_elevation'
@@ -223,8 +388,9 @@ def getCbsdsNotPartOfPpaCluster(cbsds, ppa_record):
   """
   cbsds_not_part_of_ppa_cluster = []
   # Compare the list of CBSDs with the PPA cluster list
+  ppa_cluster_ids = set(ppa_record['ppaInfo']['cbsdReferenceId'])
   for cbsd in cbsds:
-    if cbsd['id'] not in ppa_record['ppaInfo']['cbsdReferenceId']:
+    if cbsd['id'] not in ppa_cluster_ids:
       cbsds_not_part_of_ppa_cluster.append(cbsd)
 
   return cbsds_not_part_of_ppa_cluster
@@ -267,12 +433,18 @@ def getGrantObjectsFromFAD(sas_uut_fad_object, sas_th_fad_objects,
     ppa_record: A PPA record dictionary. If None, ignored. If set, the returned grants
       are not part of the PPA cluster list.
   """
+  def _getCbsdRecords(fad):
+    if ppa_record is None:
+      return fad.getCbsdRecords()
+    return fad.getCbsdRecordsById(ppa_record['ppaInfo']['cbsdReferenceId'],
+                                  exclude=True)
+
   # List of CBSD grant tuples extracted from FAD record
   grants = getAllGrantInfoFromCbsdDataDump(
-      sas_uut_fad_object.getCbsdRecords(), True, ppa_record)
+      _getCbsdRecords(sas_uut_fad_object), True)
   for fad in sas_th_fad_objects:
     grants.extend(getAllGrantInfoFromCbsdDataDump(
-        fad.getCbsdRecords(), False, ppa_record))
+        _getCbsdRecords(fad), False))
 
   return grants
 
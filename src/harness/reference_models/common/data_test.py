@@ -0,0 +1,104 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from reference_models.common import data
+from reference_models.dpa import move_list
+from reference_models.interference import interference
+
+
+def _MakeGrants(num_grants):
+  np.random.seed(1234)
+  grants = []
+  for k in range(num_grants):
+    is_cat_b = bool(k % 3 == 0)
+    low_freq = 3550e6 + 10e6 * np.random.randint(0, 14)
+    grants.append(data.CbsdGrantInfo(
+        latitude=37 + np.random.uniform(0, 1),
+        longitude=-122 + np.random.uniform(0, 1),
+        height_agl=np.random.randint(3, 30),
+        indoor_deployment=bool(k % 2),
+        cbsd_category='B' if is_cat_b else 'A',
+        antenna_azimuth=np.random.uniform(0, 360) if is_cat_b else None,
+        antenna_gain=np.random.uniform(0, 15),
+        antenna_beamwidth=60 if is_cat_b else None,
+        max_eirp=20 + np.random.uniform(0, 10),
+        low_frequency=low_freq,
+        high_frequency=low_freq + 10e6,
+        is_managed_grant=bool(k % 4 == 0),
+        cbsd_id='cbsd_%d' % k,
+        grant_id=None if k % 5 == 0 else 'grant_%d' % k))
+  return grants
+
+
+class TestGrantTable(unittest.TestCase):
+
+  def setUp(self):
+    self.grants = _MakeGrants(200)
+    self.table = data.GrantTable.fromGrants(self.grants)
+
+  def test_same_grants(self):
+    self.assertEqual(len(self.table), 200)
+    self.assertListEqual(self.table.toGrants(), self.grants)
+    self.assertEqual(self.table[5], self.grants[5])
+    self.assertIsNone(self.table[1].antenna_azimuth)
+    self.assertIsNone(self.table[0].grant_id)
+    # Usable as keys of sets.
+    self.assertEqual(set(self.table), set(self.grants))
+
+  def test_sub_table(self):
+    sub_table = self.table[self.table.categoryMask('B')]
+    self.assertListEqual(list(sub_table.index), list(range(0, 200, 3)))
+    self.assertListEqual(list(sub_table),
+                         [grant for grant in self.grants
+                          if grant.cbsd_category == 'B'])
+    self.assertEqual(sub_table[1:3][0], self.grants[3])
+    self.assertEqual(sub_table[1:3].index[0], 3)
+    self.assertEqual(len(self.table[np.array([], dtype=int)]), 0)
+
+  def test_frequency_filtering(self):
+    self.assertListEqual(
+        list(move_list.filterGrantsForFreqRange(self.table, 3600e6, 3610e6)),
+        move_list.filterGrantsForFreqRange(self.grants, 3600e6, 3610e6))
+    for entity_type in [data.ProtectedEntityType.GWPZ_AREA,
+                        data.ProtectedEntityType.ESC]:
+      for low_freq in [3550e6, 3645e6, 3660e6]:
+        constraint = data.ProtectionConstraint(
+            latitude=37.5, longitude=-121.5,
+            low_frequency=low_freq, high_frequency=low_freq + 5e6,
+            entity_type=entity_type)
+        self.assertListEqual(
+            list(interference.findOverlappingGrants(self.table, constraint)),
+            interference.findOverlappingGrants(self.grants, constraint))
+
+  def test_neighborhood_filtering(self):
+    for entity_type in [data.ProtectedEntityType.FSS_CO_CHANNEL,
+                        data.ProtectedEntityType.ESC]:
+      grants_inside = interference.findGrantsInsideNeighborhood(
+          self.table, (-121.5, 37.5), entity_type)
+      self.assertIsInstance(grants_inside, data.GrantTable)
+      self.assertListEqual(
+          list(grants_inside),
+          interference.findGrantsInsideNeighborhood(
+              self.grants, (-121.5, 37.5), entity_type))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,73 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from reference_models.common import mpool
+
+
+class TestMpool(unittest.TestCase):
+
+  def test_hilbert_curve(self):
+    n = 32
+    x, y = np.meshgrid(np.arange(n), np.arange(n), indexing='ij')
+    d = mpool._HilbertIndex(x.ravel(), y.ravel(), 5)
+    self.assertListEqual(sorted(d), list(range(n * n)))
+    # Successive cells along the curve are adjacent.
+    cells = np.zeros((n * n, 2), dtype=int)
+    cells[d] = np.column_stack((x.ravel(), y.ravel()))
+    self.assertTrue(np.all(np.sum(np.abs(np.diff(cells, axis=0)), axis=1) == 1))
+
+  def test_locality_order_groups_tiles(self):
+    np.random.seed(1234)
+    lats = np.random.uniform(34.5, 39.5, 2000)
+    lons = np.random.uniform(-123.5, -117.5, 2000)
+    order = mpool.LocalityOrder(lats, lons)
+    self.assertListEqual(sorted(order), list(range(2000)))
+    tiles = list(zip(np.floor(lats[order]), np.floor(lons[order])))
+    # Each tile is visited in a single run of contiguous locations.
+    runs = [tile for k, tile in enumerate(tiles)
+            if k == 0 or tile != tiles[k-1]]
+    self.assertEqual(len(runs), len(set(tiles)))
+
+  def test_map_by_location(self):
+    points = [(lat, lon) for lat in [37.2, 45.7, 32.1]
+              for lon in [-80.5, -122.3, -100]]
+    results = mpool.MapByLocation(lambda point: point[0] * point[1], points,
+                                  [point[0] for point in points],
+                                  [point[1] for point in points])
+    self.assertListEqual(results, [lat * lon for lat, lon in points])
+    self.assertListEqual(mpool.MapByLocation(abs, [], [], []), [])
+
+  def test_map_by_location_chunks_per_pool(self):
+    class FakePool(object):
+      _processes = 5
+      def map(self, fn, iterable, chunksize=None):
+        self.chunksize = chunksize
+        return [fn(x) for x in iterable]
+    pool = FakePool()
+    results = mpool.MapByLocation(abs, list(range(-100, 0)),
+                                  [37.] * 100, [-120.] * 100,
+                                  chunks_per_worker=2, pool=pool)
+    self.assertListEqual(results, list(range(100, 0, -1)))
+    self.assertEqual(pool.chunksize, 10)
+
+
+if __name__ == '__main__':
+  unittest.main()
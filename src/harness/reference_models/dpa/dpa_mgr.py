@@ -31,6 +31,10 @@ Example usage:
   # Compute the move list
   dpa.ComputeMoveLists()
 
+  # Or compute it incrementally on grant changes
+  dpa.UpdateGrants()  # first call: full calculation
+  dpa.UpdateGrants(added_grants, removed_grants)
+
   # Calculate the keep list interference for a given channel
   channel = (3650, 3660)
   interf_per_point = dpa.CalcKeepListInterference(channel)
@@ -57,6 +61,7 @@ from reference_models.common import data
 from reference_models.common import mpool
 from reference_models.dpa import dpa_builder
 from reference_models.dpa import move_list as ml
+from reference_models.geo import spatial_index
 from reference_models.geo import zones
 
 # The default DPA parameters, corresponding to legacy Coastal DPA.
@@ -191,6 +196,7 @@ class Dpa(object):
     self._channels = None
     self._grants = []
     self._has_th_grants = False
+    self._ml_states = None
     self.ResetFreqRange(freq_ranges_mhz)
     self.ResetLists()
 
@@ -224,6 +230,10 @@ class Dpa(object):
     """Reset move list and neighbor list."""
     self.move_lists = [set() for _ in self._channels]
     self.nbor_lists = [set() for _ in self._channels]
+    # The incremental move list calculation states.
+    self._ml_states = None
+    self._ml_main_grants = None
+    self._inside_grants = None
 
   def _DetectIfPeerSas(self):
     """Returns True if holding grants from peer TH SAS."""
@@ -269,14 +279,13 @@ class Dpa(object):
                  self.radar_height, Dpa.num_iteration,
                  self.azimuth_range, self.neighbor_distances)
     logging.debug('  protected points: %s', self.protected_points)
-    pool = mpool.Pool()
     self.ResetLists()
     # Detect the inside "inside grants", which will allow to
     # add them into move list for sure later on.
-    inside_grants = set()
-    if self.geometry and not isinstance(self.geometry, sgeo.Point):
-      inside_grants = set(g for g in self._grants
-                          if sgeo.Point(g.longitude, g.latitude).intersects(self.geometry))
+    inside_grants = self._GetInsideGrants(self._grants)
+
+    # Spatial index of the grants, for fast neighborhood search.
+    grant_index = spatial_index.GrantsIndex(self._grants)
 
     for chan_idx, (low_freq, high_freq) in enumerate(self._channels):
       moveListConstraint = functools.partial(
@@ -291,10 +300,12 @@ class Dpa(object):
           min_azimuth=self.azimuth_range[0],
           max_azimuth=self.azimuth_range[1],
           neighbor_distances=self.neighbor_distances,
-          apply_clutter_network_loss_and_50_percent=self.apply_clutter_network_loss_and_50_percent)
+          apply_clutter_network_loss_and_50_percent=self.apply_clutter_network_loss_and_50_percent,
+          grant_index=grant_index)
 
       move_list, nbor_list = list(
-          zip(*pool.map(moveListConstraint, self.protected_points)))
+          zip(*mpool.MapByLocation(moveListConstraint, self.protected_points,
+                                   *self._protectedPointsLocations())))
       # Combine the individual point move lists
       move_list = set().union(*move_list)
       nbor_list = set().union(*nbor_list)
@@ -308,6 +319,127 @@ class Dpa(object):
     logging.info('DPA Result movelist `%s`- MOVE_LIST:%s NBOR_LIST: %s',
                  self.name, self.move_lists, self.nbor_lists)
 
+  def UpdateGrants(self, added_grants=(), removed_grants=()):
+    """Updates the grants and incrementally recomputes the move/neighbor lists.
+
+    The interference contributions of the grants are kept between calls, so
+    that only the contributions of the added grants are computed, and the
+    move list is recomputed only for the protected points whose neighborhood
+    has changed. The first call after the grants have been set (see
+    `SetGrantsFromFad()` and `SetGrantsFromList()`) performs the full
+    calculation.
+
+    Note that the random reliabilities used for the contributions of a given
+    grant are drawn once, when the grant is added.
+
+    Args:
+      added_grants: A list of |data.CbsdGrantInfo| grants to add.
+      removed_grants: A list of |data.CbsdGrantInfo| grants to remove.
+    """
+    added_grants = list(added_grants)
+    removed_grants = set(removed_grants)
+    self._grants = [g for g in self._grants if g not in removed_grants]
+    self._grants.extend(added_grants)
+    self._has_th_grants = self._DetectIfPeerSas()
+
+    if self._ml_states is None:
+      # Full calculation, starting from empty states.
+      logging.info('DPA Compute incremental movelist `%s` - initial calculation',
+                   self.name)
+      self._ml_states = [[ml.MoveListState(point)
+                          for point in self.protected_points]
+                         for _ in self._channels]
+      self._ml_main_grants = [set() for _ in self._channels]
+      self._inside_grants = set()
+      added_grants = self._grants
+      removed_grants = set()
+
+    logging.info('DPA Update movelist `%s` - %d added grants, %d removed grants',
+                 self.name, len(added_grants), len(removed_grants))
+    self._inside_grants.difference_update(removed_grants)
+    self._inside_grants.update(self._GetInsideGrants(added_grants))
+
+    for chan_idx, (low_freq, high_freq) in enumerate(self._channels):
+      # DPA Purge algorithm for OOB: only the main grant of each CBSD is used.
+      # The main grants are ranked in the order of a full calculation (see
+      # `ComputeMoveLists()`), so that the move lists are identical.
+      cbsds_grants_map = None
+      if ml.findDpaType(low_freq * 1.e6, high_freq * 1.e6) is ml.DpaType.OUT_OF_BAND:
+        cbsds_grants_map = ml.groupGrantsPerCbsd(self._grants)
+        grant_order = {cbsd_grants[0]: k for k, cbsd_grants in
+                       enumerate(six.itervalues(cbsds_grants_map))}
+      else:
+        grant_order = {grant: k for k, grant in enumerate(self._grants)}
+      prev_main_grants = self._ml_main_grants[chan_idx]
+      added_main_grants = [g for g in self._grants
+                           if g in grant_order and g not in prev_main_grants]
+      removed_main_grants = prev_main_grants.difference(grant_order)
+      self._ml_main_grants[chan_idx] = set(grant_order)
+
+      # Only the points whose neighborhood has changed are recomputed.
+      states = self._ml_states[chan_idx]
+      grant_index = spatial_index.GrantsIndex(added_main_grants)
+      affected_idxs = ml.findAffectedMoveListStates(
+          states, low_freq * 1.e6, high_freq * 1.e6,
+          added_main_grants, removed_main_grants,
+          self.neighbor_distances, grant_index)
+      if affected_idxs:
+        updateMoveListConstraint = functools.partial(
+            ml.updateMoveListConstraint,
+            low_freq=low_freq * 1.e6,
+            high_freq=high_freq * 1.e6,
+            added_grants=added_main_grants,
+            removed_grants=removed_main_grants,
+            inc_ant_height=self.radar_height,
+            num_iter=Dpa.num_iteration,
+            threshold=self.threshold,
+            beamwidth=self.beamwidth,
+            min_azimuth=self.azimuth_range[0],
+            max_azimuth=self.azimuth_range[1],
+            neighbor_distances=self.neighbor_distances,
+            apply_clutter_network_loss_and_50_percent=self.apply_clutter_network_loss_and_50_percent,
+            grant_index=grant_index,
+            grant_order=grant_order)
+        lats, lons = self._protectedPointsLocations()
+        updated_states = mpool.MapByLocation(
+            updateMoveListConstraint, [states[k] for k in affected_idxs],
+            [lats[k] for k in affected_idxs], [lons[k] for k in affected_idxs])
+        for k, state in zip(affected_idxs, updated_states):
+          states[k] = state
+
+      # Combine the individual point move lists
+      states = self._ml_states[chan_idx]
+      move_list = set().union(*[state.move_list for state in states])
+      nbor_list = set().union(*[state.neighbor_list for state in states])
+      if cbsds_grants_map is not None:
+        # DPA Purge Algorithm for OOB - reintegrated in move list
+        for grants_list in (move_list, nbor_list):
+          extra_grants = []
+          for grant in grants_list:
+            extra_grants.extend(cbsds_grants_map[grant.uniqueCbsdKey()][1:])
+          grants_list.update(extra_grants)
+      include_grants = ml.filterGrantsForFreqRange(
+          self._inside_grants, low_freq * 1.e6, high_freq * 1.e6)
+      move_list.update(include_grants)
+      nbor_list.update(include_grants)
+      self.move_lists[chan_idx] = move_list
+      self.nbor_lists[chan_idx] = nbor_list
+
+    logging.info('DPA Result movelist `%s`- MOVE_LIST:%s NBOR_LIST: %s',
+                 self.name, self.move_lists, self.nbor_lists)
+
+  def _protectedPointsLocations(self):
+    """Returns the (latitudes, longitudes) of the protected points."""
+    return ([point.latitude for point in self.protected_points],
+            [point.longitude for point in self.protected_points])
+
+  def _GetInsideGrants(self, grants):
+    """Returns the set of grants located inside the DPA geometry."""
+    if not self.geometry or isinstance(self.geometry, sgeo.Point):
+      return set()
+    return set(g for g in grants
+               if sgeo.Point(g.longitude, g.latitude).intersects(self.geometry))
+
   def _GetChanIdx(self, channel):
     """Gets the channel idx for a given channel."""
     try:
@@ -383,9 +515,8 @@ class Dpa(object):
         do_max=True,
         apply_clutter_network_loss_and_50_percent=self.apply_clutter_network_loss_and_50_percent)
 
-    pool = mpool.Pool()
-    max_interf = pool.map(interfCalculator,
-                          self.protected_points)
+    max_interf = mpool.MapByLocation(interfCalculator, self.protected_points,
+                                     *self._protectedPointsLocations())
     return max_interf
 
   def CheckInterference(self, sas_uut_active_grants, margin_db,
@@ -522,8 +653,8 @@ class Dpa(object):
         apply_clutter_network_loss_and_50_percent=self.apply_clutter_network_loss_and_50_percent,
         threshold=hard_threshold
     )
-    pool = mpool.Pool()
-    result = pool.map(checkPointInterf, self.protected_points)
+    result = mpool.MapByLocation(checkPointInterf, self.protected_points,
+                                 *self._protectedPointsLocations())
 
     if output_data == []:
       output_data.extend(result)
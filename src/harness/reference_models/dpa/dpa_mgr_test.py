@@ -18,6 +18,7 @@ from __future__ import division
 from __future__ import print_function
 
 from collections import namedtuple
+import copy
 import json
 import os
 import shutil
@@ -216,6 +217,54 @@ class TestDpa(unittest.TestCase):
                                    extensive_print=True)
     self.assertEqual(result, False)
 
+  def test_updateGrantsIncremental(self):
+    np.random.seed(1248)
+    orig_itm = wf_itm.CalcItmPropagationLoss
+    wf_itm.CalcItmPropagationLoss = testutils.FakePropagationPredictor(
+        dist_type='REAL', factor=1.0, offset=(144+30-0.1) - 20.0)
+    protection_points = [ProtectionPoint(latitude=36.815, longitude=-76.292),
+                         ProtectionPoint(latitude=36.915, longitude=-76.192)]
+    dpa = dpa_mgr.Dpa(protection_points,
+                      geometry=sgeo.Point(-76.292, 36.815).buffer(0.05),
+                      threshold=-144,
+                      beamwidth=3,
+                      radar_height=50,
+                      neighbor_distances=(150, 190, 0, 25),
+                      freq_ranges_mhz=[(3540, 3570)])
+    cbsds = entities.GenerateCbsdList(
+        30, template_cbsd=entities.CBSD_TEMPLATE_CAT_B_OMNI,
+        ref_latitude=36.815, ref_longitude=-76.292,
+        min_distance_km=1, max_distance_km=60)
+    grants = entities.ConvertToCbsdGrantInfo(cbsds, min_freq_mhz=3550,
+                                             max_freq_mhz=3570, chunks_mhz=10)
+    try:
+      # Full calculation then incremental updates of the grants.
+      dpa.SetGrantsFromList(grants[:40])
+      dpa.UpdateGrants()
+      dpa.UpdateGrants(added_grants=grants[40:], removed_grants=grants[0:6])
+      # Removing the lowest frequency grant of a CBSD changes its OOB main grant.
+      dpa.UpdateGrants(removed_grants=grants[10:11])
+      # Reference from scratch.
+      ref_dpa = copy.copy(dpa)
+      ref_dpa.SetGrantsFromList(grants[6:10] + grants[11:])
+      ref_dpa.ComputeMoveLists()
+    finally:
+      wf_itm.CalcItmPropagationLoss = orig_itm
+
+    self.assertSetEqual(set(dpa._grants), set(ref_dpa._grants))
+    for channel in [(3540, 3550), (3550, 3560), (3560, 3570)]:
+      self.assertTrue(ref_dpa.GetMoveList(channel))
+      self.assertTrue(ref_dpa.GetKeepList(channel))
+      self.assertSetEqual(dpa.GetMoveList(channel),
+                          ref_dpa.GetMoveList(channel))
+      self.assertSetEqual(dpa.GetNeighborList(channel),
+                          ref_dpa.GetNeighborList(channel))
+    # The neighbor grants are kept in the order of a full calculation.
+    for states in dpa._ml_states[1:]:
+      for state in states:
+        idxs = [dpa._grants.index(grant) for grant in state.neighbor_list]
+        self.assertListEqual(idxs, sorted(idxs))
+
 
 if __name__ == '__main__':
   unittest.main()
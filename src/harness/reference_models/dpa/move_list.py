@@ -57,9 +57,9 @@ from six.moves import zip
 from reference_models.antenna import antenna
 from reference_models.common import cache
 from reference_models.common import data
-from reference_models.common import data
 from reference_models.common import mpool
 from reference_models.geo import drive
+from reference_models.geo import spatial_index
 from reference_models.geo import vincenty
 from reference_models.propagation import p2108
 from reference_models.propagation import wf_itm
@@ -137,7 +137,8 @@ def filterGrantsForFreqRange(grants, low_freq, high_freq):
   """Returns a list of all grants affecting a protected frequency range.
 
   Args:
-    grants: A list of |data.CbsdGrantInfo| grants.
+    grants: A list of |data.CbsdGrantInfo| grants, or a |data.GrantTable| (in
+      which case a |data.GrantTable| is returned).
     low_freq: The minimum frequency (Hz).
     high_freq: The maximum frequency (Hz).
   """
@@ -145,13 +146,16 @@ def filterGrantsForFreqRange(grants, low_freq, high_freq):
   if chan_type == DpaType.OUT_OF_BAND:
     # All grants affect COCHANNEL, including those higher than 3650MHz.
     return grants
+  if isinstance(grants, data.GrantTable):
+    return grants[grants.frequencyOverlapMask(low_freq, high_freq)]
   return [g for g in grants
           if (min(g.high_frequency, high_freq) - max(g.low_frequency, low_freq)) > 0]
 
 
 def findGrantsInsideNeighborhood(grants, constraint,
                                  dpa_type,
-                                 neighbor_distances):
+                                 neighbor_distances,
+                                 grant_index=None):
   """Identify the CBSD grants in the neighborhood of protection constraint.
 
   Inputs:
@@ -163,6 +167,8 @@ def findGrantsInsideNeighborhood(grants, constraint,
       or
       [cata_indoor_dist, cata_indoor_6m_dist, cata_outdoor_dist,
         cata_outdoor_6m_dist, catb_dist, catb_6m_dist, cata_oob_dist, catb_oob_dist]
+    grant_index:    an optional |spatial_index.SpatialIndex| of the `grants` list,
+                    used for prefiltering the grants.
 
   Returns:
     A tuple of:
@@ -174,24 +180,27 @@ def findGrantsInsideNeighborhood(grants, constraint,
   grants_inside = []
   idxs_inside = []
 
-  # Loop over each CBSD grant and filter the ones inside the neighborhood
-  for k, grant in enumerate(grants):
-    # Check frequency range
-    if dpa_type is not DpaType.OUT_OF_BAND:
-      overlapping_bw = min(
-          grant.high_frequency, constraint.high_frequency
-      ) - max(grant.low_frequency, constraint.low_frequency)
-      if overlapping_bw <= 0:
-        continue
-
-    # Compute distance from CBSD location to protection constraint location
-    dist_km, _, _ = vincenty.GeodesicDistanceBearing(
-        grant.latitude,
-        grant.longitude,
-        constraint.latitude,
-        constraint.longitude,
-    )
+  if grant_index is None:
+    idxs = range(len(grants))
+  else:
+    # Only the grants potentially in the neighborhood.
+    idxs = grant_index.Candidates(constraint.latitude, constraint.longitude,
+                                  max(neighbor_distances))
+
+  # Check frequency range
+  if dpa_type is not DpaType.OUT_OF_BAND:
+    idxs = [k for k in idxs
+            if (min(grants[k].high_frequency, constraint.high_frequency)
+                - max(grants[k].low_frequency, constraint.low_frequency)) > 0]
+
+  # Compute distance from CBSD locations to protection constraint location
+  dists_km, _, _ = vincenty.GeodesicDistanceBearingArrays(
+      [grants[k].latitude for k in idxs], [grants[k].longitude for k in idxs],
+      constraint.latitude, constraint.longitude)
 
+  # Loop over each CBSD grant and filter the ones inside the neighborhood
+  for k, dist_km in zip(idxs, dists_km):
+    grant = grants[k]
     # Check if CBSD is inside the neighborhood of protection constraint
     if len(neighbor_distances) == 4:
       if dpa_type is DpaType.CO_CHANNEL:
@@ -277,46 +286,41 @@ def ComputeOOBConductedPower(low_freq_cbsd, low_freq_c, high_freq_c):
   return 10 * np.log10(power_mW)
 
 
-def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_type,
-                        apply_clutter_network_loss_and_50_percent):
-  """Calculate interference contribution of each grant in the neighborhood to
-  the protection constraint c.
+def computePathLoss(latitude, longitude, height_agl, indoor_deployment,
+                    constraint_latitude, constraint_longitude, inc_ant_height,
+                    num_iteration, apply_clutter_network_loss_and_50_percent):
+  """Calculate the path loss from a CBSD to the protection constraint c.
 
   Inputs:
-    cbsd_grant:     a |data.CbsdGrantInfo| grant
-    constraint:     protection constraint of type |data.ProtectionConstraint|
+    latitude, longitude: the CBSD location (degrees)
+    height_agl:     the CBSD height above ground level (meters)
+    indoor_deployment: True if the CBSD is indoor
+    constraint_latitude, constraint_longitude: the protection constraint
+                    location (degrees)
     inc_ant_height: reference incumbent antenna height (in meters)
     num_iteration:  a number of Monte Carlo iterations
-    dpa_type:       an enum member of class DpaType
     apply_clutter_network_loss_and_50_percent: if true, add signal and  clutter loss, and use median
 
   Returns:
     A tuple of
-      interference: 	interference contribution, a tuple with named fields
-         'randomInterference' (K random interference contributions
-         of the grant to protection constraint c), and 'bearing_c_cbsd'
-         (bearing from c to CBSD grant location).
-      medianInterference: the median interference.
+      path_loss:    the K random path losses followed by the median path loss
+                    (dB) as a ndarray, or only the median path loss if
+                    `apply_clutter_network_loss_and_50_percent`.
+      incidence_angles: the |wf_itm._IncidenceAngles| of the path.
   """
-  # Get frequency information
-  low_freq_cbsd = grant.low_frequency
-  high_freq_cbsd = grant.high_frequency
-  low_freq_c = constraint.low_frequency
-  high_freq_c = constraint.high_frequency
-
   if apply_clutter_network_loss_and_50_percent:
     # Compute median path loss/interference contribution
     # based on ITM model as defined in [REL1Ext-R2-SGN-02, REL1Ext-R2-SGN-04] (in dB)
     reliabilities = [0.5]
     results = wf_itm.CalcItmPropagationLoss(
-      grant.latitude, grant.longitude, grant.height_agl,
-      constraint.latitude, constraint.longitude,
-      inc_ant_height, grant.indoor_deployment,
+      latitude, longitude, height_agl,
+      constraint_latitude, constraint_longitude,
+      inc_ant_height, indoor_deployment,
       reliability=reliabilities,
       freq_mhz=FREQ_PROP_MODEL)
-    clutter_loss = p2108.calc_P2108(grant.latitude, grant.longitude,
-                                    grant.height_agl, constraint.latitude,
-                                    constraint.longitude)
+    clutter_loss = p2108.calc_P2108(latitude, longitude,
+                                    height_agl, constraint_latitude,
+                                    constraint_longitude)
     path_loss = np.array(results.db_loss) + clutter_loss + p2108.ACTIVITY_LOSS_FACTOR
   else:
     # Compute median and K random realizations of path loss/interference contribution
@@ -326,16 +330,51 @@ def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_ty
     reliabilities = np.append(reliabilities, [0.5])  # add 0.5 (for median loss) as
     # a last value to reliabilities array
     results = wf_itm.CalcItmPropagationLoss(
-      grant.latitude, grant.longitude, grant.height_agl,
-      constraint.latitude, constraint.longitude, inc_ant_height,
-      grant.indoor_deployment,
+      latitude, longitude, height_agl,
+      constraint_latitude, constraint_longitude, inc_ant_height,
+      indoor_deployment,
       reliability=reliabilities,
       freq_mhz=FREQ_PROP_MODEL)
     path_loss = np.array(results.db_loss)
+  return path_loss, results.incidence_angles
+
+
+def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_type,
+                        apply_clutter_network_loss_and_50_percent):
+  """Calculate interference contribution of each grant in the neighborhood to
+  the protection constraint c.
+
+  Inputs:
+    cbsd_grant:     a |data.CbsdGrantInfo| grant
+    constraint:     protection constraint of type |data.ProtectionConstraint|
+    inc_ant_height: reference incumbent antenna height (in meters)
+    num_iteration:  a number of Monte Carlo iterations
+    dpa_type:       an enum member of class DpaType
+    apply_clutter_network_loss_and_50_percent: if true, add signal and  clutter loss, and use median
+
+  Returns:
+    A tuple of
+      interference: 	interference contribution, a tuple with named fields
+         'randomInterference' (K random interference contributions
+         of the grant to protection constraint c), and 'bearing_c_cbsd'
+         (bearing from c to CBSD grant location).
+      medianInterference: the median interference.
+  """
+  # Get frequency information
+  low_freq_cbsd = grant.low_frequency
+  high_freq_cbsd = grant.high_frequency
+  low_freq_c = constraint.low_frequency
+  high_freq_c = constraint.high_frequency
+
+  # Compute the path loss realizations (in dB)
+  path_loss, incidence_angles = computePathLoss(
+      grant.latitude, grant.longitude, grant.height_agl,
+      grant.indoor_deployment, constraint.latitude, constraint.longitude,
+      inc_ant_height, num_iteration, apply_clutter_network_loss_and_50_percent)
 
   # Compute CBSD antenna gain in the direction of protection point
   ant_gain = antenna.GetStandardAntennaGains(
-      results.incidence_angles.hor_cbsd,
+      incidence_angles.hor_cbsd,
       grant.antenna_azimuth, grant.antenna_beamwidth, grant.antenna_gain)
 
   # Compute EIRP of CBSD grant inside the frequency range of protection constraint
@@ -367,7 +406,7 @@ def computeInterference(grant, constraint, inc_ant_height, num_iteration, dpa_ty
 
   # Store interference contributions
   interference = InterferenceContribution(randomInterference=K_interf,
-                                          bearing_c_cbsd=results.incidence_angles.hor_rx)
+                                          bearing_c_cbsd=incidence_angles.hor_rx)
   return interference, median_interf
 
 
@@ -401,13 +440,25 @@ def formInterferenceMatrix(grants, grants_ids, constraint,
                                          num_iter, dpa_type, apply_clutter_network_loss_and_50_percent)
     interf_list.append(interf)
     median_interf.append(median)
+  I, sorted_idxs, sorted_bearings = _sortInterferenceContributions(
+      interf_list, median_interf)
+  sorted_grant_ids = [grants_ids[k] for k in sorted_idxs]
+  return I, sorted_grant_ids, sorted_bearings
+
+
+def _sortInterferenceContributions(interf_list, median_interf):
+  """Sorts the interference contributions by their median interference.
+
+  Returns:
+    A tuple (I, sorted_idxs, sorted_bearings) of the interference matrix
+    (see `formInterferenceMatrix`), the sorting indexes and the sorted bearings.
+  """
   # Sort grants by their median interference contribution, smallest to largest
   sorted_idxs = sorted(
       list(range(len(median_interf))), key=median_interf.__getitem__)
   I = np.array([interf_list[k].randomInterference for k in sorted_idxs]).transpose()
   sorted_bearings = np.array([interf_list[k].bearing_c_cbsd for k in sorted_idxs])
-  sorted_grant_ids = [grants_ids[k] for k in sorted_idxs]
-  return I, sorted_grant_ids, sorted_bearings
+  return I, sorted_idxs, sorted_bearings
 
 
 def findAzimuthRange(min_azimuth, max_azimuth, beamwidth):
@@ -424,11 +475,128 @@ def findAzimuthRange(min_azimuth, max_azimuth, beamwidth):
   return azimuths
 
 
+def _percentileIndex(num_samples):
+  """Returns the index of the lower interpolated protection percentile.
+
+  This is the index in the sorted samples of the value returned by
+  `np.percentile` with the 'lower' interpolation.
+  """
+  return int(np.floor((num_samples - 1) * (PROTECTION_PERCENTILE / 100.)))
+
+
+def _isAboveThreshold(agg_interf, num_grants, t_mW, IG):
+  """Checks if the protection percentile of the aggregate interference of the
+  first `num_grants` grants exceeds the threshold.
+
+  The approximate aggregate interference `agg_interf` is computed with a
+  different summation order than the reference implementation, and so is
+  rounded differently. When too close to the threshold, the aggregate is
+  recomputed the same way as `find_nc_reference` to get the exact same decision.
+
+  Inputs:
+    agg_interf: The approximate protection percentile of aggregate interference.
+    num_grants: The number of grants in the aggregate.
+    t_mW:       The protection threshold (mW).
+    IG:         A function returning the interference matrix at output of the
+                receiver antenna (see `find_nc_reference`).
+  """
+  if num_grants == 0:
+    return False
+  # Any summation of positive values has a relative error below num_grants * eps,
+  # and so is the error on any order statistic.
+  max_error = 4 * (num_grants + 1) * np.finfo(np.float64).eps * agg_interf
+  if abs(agg_interf - t_mW) <= max_error:
+    agg_interf = np.percentile(np.sum(IG()[:, 0:num_grants], axis=1),
+                               PROTECTION_PERCENTILE, interpolation='lower')
+  return agg_interf > t_mW
+
+
 def find_nc(I, bearings, t, beamwidth, min_azimuth, max_azimuth):
   """Returns the index (nc) of the grant in the ordered list of grants such that
   the protection percentile of the interference from the first nc grants is below the
   threshold for all azimuths of the receiver antenna.
 
+  Inputs:
+    I:      2D array of interference contributions (dBm/10 MHz); columns
+            correspond to grants, and rows correspond to Monte Carlo iterations.
+    bearings: a list of bearings from protection point to CBSDs.
+    t:      protection percentile threshold (dBm/10 MHz)
+    beamwidth: protection antenna beamwidth (degree).
+    min_azimuth: minimim protection azimuth (degree).
+    max_azimuth: maximum protection azimuth (degree).
+
+  Returns:
+    nc:     index nc that defines the move list to be {G_nc+1, G_nc+2, ..., G_Nc}
+
+  This implementation gives the same result as `find_nc_reference`, but:
+    - the aggregate interference of all azimuths is computed at once with a
+      matrix product of the interference by the radar antenna gains.
+    - the binary search uses the cumulative sums of the interference, built once
+      per azimuth requiring a search, and `np.partition` for the percentile.
+  """
+  # Create array of incumbent antenna azimuth angles (degrees).
+  azimuths = findAzimuthRange(min_azimuth, max_azimuth, beamwidth)
+
+  # Initialize nc to Nc.
+  Nc = I.shape[1]
+  nc = Nc
+  if nc == 0:
+    return 0
+
+  # Convert protection threshold and interference matrix to linear units.
+  t_mW = np.power(10.0, t/10.0)
+  I_mW = np.power(10.0, I/10.0)
+  idx = _percentileIndex(I.shape[0])
+
+  # Receiver antenna gains for all azimuths, with shape (Nc, num_azimuths).
+  gains = 10**(antenna.GetRadarNormalizedAntennaGainsBatch(
+      np.asarray(bearings)[:, np.newaxis], azimuths, beamwidth)/10.0)
+
+  k_azi = 0
+  while k_azi < len(azimuths):
+    # Compute the protection percentile of the aggregate interference of the first
+    # nc grants for all remaining azimuths.
+    agg_interf = np.dot(I_mW[:, 0:nc], gains[0:nc, k_azi:])
+    agg_interf = np.partition(agg_interf, idx, axis=0)[idx]
+
+    # Find the first azimuth where the protection threshold is not met.
+    for k in range(k_azi, len(azimuths)):
+      IG = functools.partial(np.multiply, I_mW, gains[:, k])
+      if _isAboveThreshold(agg_interf[k - k_azi], nc, t_mW, IG):
+        break
+    else:
+      break
+
+    # Conduct binary search for nc, on the cumulative sums of the interference
+    # contributions (with grants along the first axis for faster summation).
+    cum_IG = np.cumsum(IG()[:, 0:nc].T, axis=0)
+    hi = nc
+    lo = 0
+    while (hi - lo) > 1:
+      mid = (hi + lo) // 2
+      agg_interf = np.partition(cum_IG[mid-1], idx)[idx]
+      if _isAboveThreshold(agg_interf, mid, t_mW, IG):
+        hi = mid
+      else:
+        lo = mid
+
+    nc = lo
+    if nc == 0:
+      return 0
+    k_azi = k + 1
+
+  return nc
+
+
+def find_nc_reference(I, bearings, t, beamwidth, min_azimuth, max_azimuth):
+  """Returns the index (nc) of the grant in the ordered list of grants such that
+  the protection percentile of the interference from the first nc grants is below the
+  threshold for all azimuths of the receiver antenna.
+
+  This is the reference implementation, recomputing the aggregate interference
+  from scratch at each step of the binary search. See `find_nc` for the faster
+  equivalent implementation.
+
   Inputs:
     I:      2D array of interference contributions (dBm/10 MHz); columns
             correspond to grants, and rows correspond to Monte Carlo iterations.
@@ -491,6 +659,23 @@ def _addMinFreqGrantToFront(l, grant):
   if l[-1].low_frequency < l[0].low_frequency:
     l[0], l[-1] = l[-1], l[0]
 
+
+def groupGrantsPerCbsd(grants):
+  """Groups the grants per CBSD, for the DPA purge algorithm for OOB.
+
+  Inputs:
+    grants: A list of CBSD |data.CbsdGrantInfo| grants.
+
+  Returns:
+    A dict of the grants of each CBSD, keyed by the CBSD unique key. For each
+    CBSD, the first grant of the list is the one with minimum frequency.
+  """
+  cbsds_grants_map = defaultdict(list)
+  for grant in grants:
+    key = grant.uniqueCbsdKey()
+    _addMinFreqGrantToFront(cbsds_grants_map[key], grant)
+  return cbsds_grants_map
+
 #------------------------------------------
 # Public interface below
 def moveListConstraint(protection_point, low_freq, high_freq,
@@ -498,7 +683,8 @@ def moveListConstraint(protection_point, low_freq, high_freq,
                        inc_ant_height,
                        num_iter, threshold, beamwidth,
                        neighbor_distances,
-                       min_azimuth=0, max_azimuth=360, apply_clutter_network_loss_and_50_percent=False):
+                       min_azimuth=0, max_azimuth=360, apply_clutter_network_loss_and_50_percent=False,
+                       grant_index=None):
   """Returns the move list for a given protection constraint.
 
   Note that the returned indexes corresponds to the grant.grant_index
@@ -522,6 +708,7 @@ def moveListConstraint(protection_point, low_freq, high_freq,
     min_azimuth:       The minimum azimuth (degrees) for incumbent transmission.
     max_azimuth:       The maximum azimuth (degrees) for incumbent transmission.
     apply_clutter_network_loss_and_50_percent: if true, add signal and clutter loss, and use median
+    grant_index:       An optional |spatial_index.SpatialIndex| of the `grants` list.
 
   Returns:
     A tuple of (move_list_grants, neighbor_list_grants) for that protection constraint:
@@ -530,6 +717,13 @@ def moveListConstraint(protection_point, low_freq, high_freq,
   """
   logging.debug('DPA Create move list for point (%s), freq (%s, %s), threshold (%s), neighborhood distance (%r)',
                protection_point, low_freq, high_freq, threshold, neighbor_distances)
+  if grant_index is not None:
+    # Prefilter the grants potentially in the neighborhood. Note that all the
+    # grants of a CBSD share the same location, so this is compatible with the
+    # DPA purge algorithm for OOB.
+    grants = [grants[k] for k in grant_index.Candidates(
+        protection_point.latitude, protection_point.longitude,
+        max(neighbor_distances))]
   if not grants:
     return [], []
 
@@ -545,10 +739,7 @@ def moveListConstraint(protection_point, low_freq, high_freq,
 
   # DPA Purge algorithm for OOB
   if dpa_type is DpaType.OUT_OF_BAND:
-    cbsds_grants_map = defaultdict(list)
-    for grant in grants:
-      key = grant.uniqueCbsdKey()
-      _addMinFreqGrantToFront(cbsds_grants_map[key], grant)
+    cbsds_grants_map = groupGrantsPerCbsd(grants)
     # Reset the grants to the minimum frequency grant for each CBSDs.
     grants = [cbsd_grants[0] for cbsd_grants in six.itervalues(cbsds_grants_map)]
 
@@ -558,6 +749,11 @@ def moveListConstraint(protection_point, low_freq, high_freq,
 
   movelist_grants = []
   if len(neighbor_grants):  # Found CBSDs in the neighborhood
+    # Load in background the terrain tiles of the upcoming propagation paths.
+    drive.terrain_driver.PrefetchForPaths(
+        [grant.latitude for grant in neighbor_grants],
+        [grant.longitude for grant in neighbor_grants],
+        constraint.latitude, constraint.longitude)
     # Form the matrix of interference contributions
     I, sorted_neighbor_idxs, bearings = formInterferenceMatrix(
         neighbor_grants, neighbor_idxs, constraint, inc_ant_height, num_iter, dpa_type,
@@ -597,6 +793,155 @@ def moveListConstraint(protection_point, low_freq, high_freq,
   return (movelist_grants, neighbor_grants)
 
 
+class MoveListState(object):
+  """State of the move list calculation of a protection constraint.
+
+  It holds the interference contributions of the neighbor grants, allowing
+  to update the move list incrementally when grants are added or removed.
+  See `updateMoveListConstraint()`.
+
+  Attributes:
+    protection_point: The protection point, having attributes 'latitude'
+      and 'longitude'.
+    contributions: A dict of the neighbor grants interference contributions,
+      keyed by |data.CbsdGrantInfo| grant, holding tuples
+      (interference, median_interf) as returned by `computeInterference()`.
+    move_list: The list of grants on the move list.
+  """
+  def __init__(self, protection_point):
+    self.protection_point = protection_point
+    self.contributions = {}
+    self.move_list = []
+
+  @property
+  def neighbor_list(self):
+    """The list of grants in the neighborhood."""
+    return list(self.contributions)
+
+
+def updateMoveListConstraint(state, low_freq, high_freq,
+                             added_grants, removed_grants,
+                             inc_ant_height,
+                             num_iter, threshold, beamwidth,
+                             neighbor_distances,
+                             min_azimuth=0, max_azimuth=360,
+                             apply_clutter_network_loss_and_50_percent=False,
+                             grant_index=None, grant_order=None):
+  """Updates incrementally the move list of a protection constraint.
+
+  Only the interference contributions of the added grants falling inside the
+  neighborhood are computed, and the move list is recomputed only if the
+  neighbor grants have changed. Starting from an empty `MoveListState` with
+  all grants added is equivalent to `moveListConstraint()`.
+
+  Note that for out-of-band constraints, the DPA purge algorithm shall be
+  performed by the caller: only the main grant of each CBSD (see
+  `groupGrantsPerCbsd()`) shall be provided, and the other grants of the CBSD
+  reintegrated in the returned lists.
+
+  Inputs:
+    state:             A |MoveListState| for the protection point, as returned
+                       by a previous call, or a new one.
+    low_freq:          The low frequency of protection constraint (Hz).
+    high_freq:         The high frequency of protection constraint (Hz).
+    added_grants:      A list of CBSD |data.CbsdGrantInfo| grants to add.
+    removed_grants:    A list or set of CBSD |data.CbsdGrantInfo| grants to remove.
+    grant_index:       An optional |spatial_index.SpatialIndex| of `added_grants`.
+    grant_order:       An optional dict of the rank of each grant in the list
+                       of grants of a full calculation. If provided, the neighbor
+                       grants are kept in that order, so that grants with the same
+                       median interference are sorted as in `moveListConstraint()`.
+    Other inputs:      See `moveListConstraint()`.
+
+  Returns:
+    The updated |MoveListState|.
+  """
+  dpa_type = findDpaType(low_freq, high_freq)
+  if not beamwidth: beamwidth = 360
+
+  # Assign values to the protection constraint
+  constraint = data.ProtectionConstraint(latitude=state.protection_point.latitude,
+                                         longitude=state.protection_point.longitude,
+                                         low_frequency=low_freq,
+                                         high_frequency=high_freq,
+                                         entity_type=data.ProtectedEntityType.DPA)
+
+  is_changed = False
+  for grant in removed_grants:
+    if state.contributions.pop(grant, None) is not None:
+      is_changed = True
+
+  # Compute the interference of new grants in the neighborhood.
+  neighbor_grants, _ = findGrantsInsideNeighborhood(
+      added_grants, constraint, dpa_type, neighbor_distances, grant_index)
+  for grant in neighbor_grants:
+    if grant in state.contributions:
+      continue
+    state.contributions[grant] = computeInterference(
+        grant, constraint, inc_ant_height, num_iter, dpa_type,
+        apply_clutter_network_loss_and_50_percent)
+    is_changed = True
+
+  if not is_changed:
+    return state
+  if not state.contributions:
+    state.move_list = []
+    return state
+
+  grants = list(state.contributions)
+  if grant_order is not None:
+    grants.sort(key=grant_order.__getitem__)
+    state.contributions = {grant: state.contributions[grant] for grant in grants}
+  interf_list, median_interf = list(zip(*[state.contributions[grant]
+                                          for grant in grants]))
+  I, sorted_idxs, bearings = _sortInterferenceContributions(
+      interf_list, median_interf)
+  nc = find_nc(I, bearings, threshold, beamwidth, min_azimuth, max_azimuth)
+  state.move_list = [grants[k] for k in sorted_idxs[nc:]]
+  return state
+
+
+def findAffectedMoveListStates(states, low_freq, high_freq,
+                               added_grants, removed_grants,
+                               neighbor_distances, grant_index=None):
+  """Finds the move list states affected by an update of the grants.
+
+  A state is affected if one of its neighbor grants is removed, or if one of
+  the added grants is inside its neighborhood. The other states are left
+  unchanged by `updateMoveListConstraint()`.
+
+  Inputs:
+    states:            A list of |MoveListState|.
+    low_freq:          The low frequency of protection constraint (Hz).
+    high_freq:         The high frequency of protection constraint (Hz).
+    added_grants:      A list of CBSD |data.CbsdGrantInfo| grants to add.
+    removed_grants:    A list or set of CBSD |data.CbsdGrantInfo| grants to remove.
+    neighbor_distances: The neighborhood distances (km) (see `moveListConstraint()`).
+    grant_index:       An optional |spatial_index.SpatialIndex| of `added_grants`.
+
+  Returns:
+    The list of indexes of the affected states.
+  """
+  dpa_type = findDpaType(low_freq, high_freq)
+  affected_idxs = []
+  for k, state in enumerate(states):
+    if any(grant in state.contributions for grant in removed_grants):
+      affected_idxs.append(k)
+      continue
+    if not added_grants:
+      continue
+    constraint = data.ProtectionConstraint(latitude=state.protection_point.latitude,
+                                           longitude=state.protection_point.longitude,
+                                           low_frequency=low_freq,
+                                           high_frequency=high_freq,
+                                           entity_type=data.ProtectedEntityType.DPA)
+    neighbor_grants, _ = findGrantsInsideNeighborhood(
+        added_grants, constraint, dpa_type, neighbor_distances, grant_index)
+    if any(grant not in state.contributions for grant in neighbor_grants):
+      affected_idxs.append(k)
+  return affected_idxs
+
+
 def getDpaNeighborGrants(grants, protection_points, dpa_geometry,
                          low_freq, high_freq, neighbor_distances):
   """Gets the list of actual neighbor grants of a DPA, for a given channel.
@@ -627,6 +972,8 @@ def getDpaNeighborGrants(grants, protection_points, dpa_geometry,
                         if sgeo.Point(g.longitude, g.latitude).intersects(dpa_geometry))
     neighbor_grants = set(filterGrantsForFreqRange(inside_grants, low_freq, high_freq))
 
+  grants = list(grants)
+  grant_index = spatial_index.GrantsIndex(grants)
   for point in protection_points:
     # Assign values to the protection constraint
     constraint = data.ProtectionConstraint(latitude=point.latitude,
@@ -638,7 +985,8 @@ def getDpaNeighborGrants(grants, protection_points, dpa_geometry,
     # Identify CBSD grants in the neighborhood of the protection constraint
     nbors, _ = findGrantsInsideNeighborhood(grants, constraint,
                                                   dpa_type,
-                                                  neighbor_distances)
+                                                  neighbor_distances,
+                                                  grant_index)
     neighbor_grants.update(nbors)
 
   return neighbor_grants
@@ -696,10 +1044,7 @@ def calcAggregatedInterference(protection_point,
 
   # DPA Purge algorithm for OOB
   if dpa_type is DpaType.OUT_OF_BAND:
-    cbsds_grants_map = defaultdict(list)
-    for grant in grants:
-      key = grant.uniqueCbsdKey()
-      _addMinFreqGrantToFront(cbsds_grants_map[key], grant)
+    cbsds_grants_map = groupGrantsPerCbsd(grants)
     # Reset the grants to the minimum frequency grant for each CBSDs.
     grants = [cbsd_grants[0] for cbsd_grants in six.itervalues(cbsds_grants_map)]
 
@@ -724,21 +1069,47 @@ def calcAggregatedInterference(protection_point,
 
   interf_matrix = 10 ** (interf_matrix / 10.)
   azimuths = findAzimuthRange(min_azimuth, max_azimuth, beamwidth)
-
-  agg_interf = np.zeros(len(azimuths))
-  for k, azi in enumerate(azimuths):
-    dpa_gains = antenna.GetRadarNormalizedAntennaGains(bearings, azi, beamwidth)
-    dpa_interf = interf_matrix * 10 ** (dpa_gains / 10.0)
-    if apply_clutter_network_loss_and_50_percent:
-      agg_interf[k] = np.sum(dpa_interf)
-    else:
-      agg_interf[k] = np.percentile(np.sum(dpa_interf, axis=1),
-                                    PROTECTION_PERCENTILE, interpolation='lower')
+  agg_interf = _aggregateInterferenceOverAzimuths(
+      interf_matrix, bearings, azimuths, beamwidth,
+      use_percentile=not apply_clutter_network_loss_and_50_percent)
   agg_interf = 10 * np.log10(agg_interf)
 
   return np.max(agg_interf) if do_max else agg_interf
 
 
+def _aggregateInterferenceOverAzimuths(interf_matrix, bearings, azimuths,
+                                       beamwidth, use_percentile=True):
+  """Computes the aggregate interference at the output of the radar antenna for
+  all the radar azimuths.
+
+  The aggregate interference of all azimuths is obtained with a single matrix
+  product of the interference by the (grants x azimuths) radar antenna linear
+  gains, and the protection percentile of all azimuths with a single partition.
+  The result is the same as aggregating each azimuth separately, except for the
+  rounding of the different summation order.
+
+  Inputs:
+    interf_matrix: 2D array of interference contributions (mW); columns
+                   correspond to grants, and rows to Monte Carlo iterations.
+    bearings:      a list of bearings from protection point to CBSDs.
+    azimuths:      the radar antenna azimuths (degrees).
+    beamwidth:     the radar antenna beamwidth (degrees).
+    use_percentile: If True, returns the protection percentile of the aggregate
+                   interference over the Monte Carlo iterations, otherwise the
+                   sum over all iterations.
+
+  Returns:
+    The aggregate interference (mW) per azimuth, as a ndarray.
+  """
+  gains = 10 ** (antenna.GetRadarNormalizedAntennaGainsBatch(
+      np.asarray(bearings)[:, np.newaxis], azimuths, beamwidth) / 10.0)
+  agg_interf = np.dot(interf_matrix, gains)
+  if not use_percentile:
+    return np.sum(agg_interf, axis=0)
+  idx = _percentileIndex(agg_interf.shape[0])
+  return np.partition(agg_interf, idx, axis=0)[idx]
+
+
 class InterferenceCacheManager(cache.CacheManager):
   """Interference cache context manager.
 
@@ -762,6 +1133,39 @@ class InterferenceCacheManager(cache.CacheManager):
     cache.CacheManager.__init__(self, computeInterference, maxsize)
 
 
+class PersistentPropagationCacheManager(cache.PersistentCacheManager):
+  """Persistent path loss cache context manager.
+
+  By running the DPA routines within this context manager, the path losses are
+  stored in a database on disk and reused across runs. The entries are keyed
+  by the path parameters only (CBSD location, height and indoor status,
+  protection point location and height, number of iterations), so that a change
+  of grant EIRP or antenna does not require a new path loss calculation.
+
+  Like with |InterferenceCacheManager|, the path loss realizations for the
+  random reliabilities drawn on first calculation of a path are stored with its
+  entry, and reused by subsequent calls.
+
+  Usage:
+    with PersistentPropagationCacheManager(db_path, version) as cm:
+      # perform calculations
+      interfs = calcAggregatedInterference(...)
+      ...
+  """
+  def __init__(self, db_path, version='', max_entries=None):
+    """Initialize the persistent cache context manager.
+
+    Args:
+      db_path (str): The database file path.
+      version (str): The version of the terrain data and models. Any change of
+        version invalidates the entries of the cache.
+      max_entries (int): The maximum number of entries kept in the database
+        (managed in LRU fashion). If None, unlimited size.
+    """
+    cache.PersistentCacheManager.__init__(self, computePathLoss,
+                                          db_path, version, max_entries)
+
+
 #----------------------------------
 # Legacy routine, just to support existing client code using old interface.
 def findMoveList(protection_specs, protection_points, registration_requests,
@@ -820,7 +1224,10 @@ def findMoveList(protection_specs, protection_points, registration_requests,
                       min_azimuth=min_azimuth,
                       max_azimuth=max_azimuth,
                       neighbor_distances=neighbor_distances)
-  M_c, _ = list(zip(*pool.map(moveListC, protection_points)))
+  M_c, _ = list(zip(*mpool.MapByLocation(
+      moveListC, protection_points,
+      [point.latitude for point in protection_points],
+      [point.longitude for point in protection_points], pool=pool)))
 
   # Find the unique CBSD indices in the M_c list of lists.
   M = set().union(*M_c)
@@ -15,10 +15,13 @@
 
 from collections import namedtuple
 import os
+import shutil
+import tempfile
 import unittest
 
 import numpy as np
 
+from reference_models.antenna import antenna
 from reference_models.dpa import move_list
 from reference_models.propagation import wf_itm
 from reference_models.tools import entities
@@ -243,5 +246,122 @@ class TestDpa(unittest.TestCase):
     self.assertListEqual(nbor_grants, [])
     self.assertListEqual(move_grants, [])
 
+  def test_find_nc_same_as_reference(self):
+    np.random.seed(1248)
+    num_iter, num_grants = 500, 300
+    I = np.random.normal(-150, 10, (num_iter, num_grants))
+    I = I[:, np.argsort(np.median(I, axis=0))]
+    bearings = np.random.uniform(0, 360, num_grants)
+    for t in [-150, -130, -125, -120, -100]:
+      for beamwidth, min_azimuth, max_azimuth in [(3, 0, 360), (360, 0, 360),
+                                                  (3, 100, 150)]:
+        self.assertEqual(
+            move_list.find_nc(I, bearings, t, beamwidth,
+                              min_azimuth, max_azimuth),
+            move_list.find_nc_reference(I, bearings, t, beamwidth,
+                                        min_azimuth, max_azimuth))
+
+    # Threshold exactly on the aggregate interference of some grants.
+    bearings = np.zeros(num_grants)
+    for num_keep in [1, 10, 123]:
+      agg_interf = np.percentile(np.sum(10**(I[:, 0:num_keep] / 10.), axis=1),
+                                 move_list.PROTECTION_PERCENTILE,
+                                 interpolation='lower')
+      t = 10 * np.log10(agg_interf)
+      nc = move_list.find_nc(I, bearings, t, 360, 0, 360)
+      self.assertEqual(nc, move_list.find_nc_reference(I, bearings, t, 360, 0, 360))
+      self.assertGreaterEqual(nc, num_keep - 1)
+      self.assertLessEqual(nc, num_keep + 1)
+
+  def test_aggregate_over_azimuths(self):
+    np.random.seed(1248)
+    bearings = np.random.uniform(0, 360, 200)
+    for num_iter, use_percentile in [(500, True), (1, False)]:
+      interf_matrix = 10**(np.random.normal(-150, 10, (num_iter, 200)) / 10.)
+      for beamwidth, min_azimuth, max_azimuth in [(3, 0, 360), (360, 0, 360),
+                                                  (1, 100, 150)]:
+        azimuths = move_list.findAzimuthRange(min_azimuth, max_azimuth,
+                                              beamwidth)
+        agg_interf = move_list._aggregateInterferenceOverAzimuths(
+            interf_matrix, bearings, azimuths, beamwidth, use_percentile)
+        self.assertEqual(agg_interf.shape, (len(azimuths),))
+        for k, azi in enumerate(azimuths):
+          dpa_gains = antenna.GetRadarNormalizedAntennaGains(bearings, azi,
+                                                             beamwidth)
+          dpa_interf = interf_matrix * 10 ** (dpa_gains / 10.0)
+          if use_percentile:
+            exp_interf = np.percentile(np.sum(dpa_interf, axis=1),
+                                       move_list.PROTECTION_PERCENTILE,
+                                       interpolation='lower')
+          else:
+            exp_interf = np.sum(dpa_interf)
+          self.assertAlmostEqual(agg_interf[k] / exp_interf, 1, 12)
+
+  def test_affected_states(self):
+    np.random.seed(1248)
+    wf_itm.CalcItmPropagationLoss = testutils.FakePropagationPredictor(
+        dist_type='REAL', factor=1.0, offset=(144+30-0.1) - 20.0)
+    points = [ProtectionPoint(latitude=36.815, longitude=-76.292),
+              ProtectionPoint(latitude=37.815, longitude=-76.292)]
+    grants = [
+        entities.ConvertToCbsdGrantInfo(
+            entities.GenerateCbsdList(
+                2, template_cbsd=entities.CBSD_TEMPLATE_CAT_A_OUTDOOR,
+                ref_latitude=point.latitude, ref_longitude=point.longitude,
+                min_distance_km=5, max_distance_km=10),
+            min_freq_mhz=3600,
+            max_freq_mhz=3610)
+        for point in points]
+    states = [move_list.MoveListState(point) for point in points]
+    grant_order = {grant: k for k, grant in enumerate(grants[0][::-1])}
+    states[0] = move_list.updateMoveListConstraint(
+        states[0], 3600e6, 3610e6, grants[0], [],
+        50, 100, -144, 3, (40, 80, 0, 25), grant_order=grant_order)
+    # The neighbor grants are kept in the provided order.
+    self.assertListEqual(states[0].neighbor_list, grants[0][::-1])
+
+    self.assertListEqual(move_list.findAffectedMoveListStates(
+        states, 3600e6, 3610e6, [], [], (40, 80, 0, 25)), [])
+    self.assertListEqual(move_list.findAffectedMoveListStates(
+        states, 3600e6, 3610e6, grants[0], [], (40, 80, 0, 25)), [])
+    self.assertListEqual(move_list.findAffectedMoveListStates(
+        states, 3600e6, 3610e6, [], grants[0][:1], (40, 80, 0, 25)), [0])
+    self.assertListEqual(move_list.findAffectedMoveListStates(
+        states, 3600e6, 3610e6, grants[1], grants[1], (40, 80, 0, 25)), [1])
+
+  def test_persistent_propagation_cache(self):
+    num_calls = [0]
+    def FakeItm(*args, **kwargs):
+      num_calls[0] += 1
+      return wf_itm._PropagResult(
+          db_loss=list(100 + 10 * np.asarray(kwargs['reliability'])),
+          incidence_angles=wf_itm._IncidenceAngles(10, 0, 190, 0),
+          internals=None)
+    wf_itm.CalcItmPropagationLoss = FakeItm
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'cache.sqlite')
+    path = (45, -80, 10, False, 45.1, -80, 50, 5, False)
+    original_fn = move_list.computePathLoss
+    try:
+      np.random.seed(1)
+      with move_list.PersistentPropagationCacheManager(db_path, 'v1') as cm:
+        self.assertIsNot(move_list.computePathLoss, original_fn)
+        path_loss, angles = move_list.computePathLoss(*path)
+        move_list.computePathLoss(45, -80, 20, False, 45.1, -80, 50, 5, False)
+        self.assertEqual(cm.cache_info(), (0, 2, 2))
+      self.assertIs(move_list.computePathLoss, original_fn)
+      self.assertEqual(len(path_loss), 6)
+      self.assertEqual(path_loss[-1], 105)
+      self.assertEqual(angles.hor_rx, 190)
+      # The random realizations are reused in a new context.
+      np.random.seed(2)
+      with move_list.PersistentPropagationCacheManager(db_path, 'v1') as cm:
+        cached_path_loss, _ = move_list.computePathLoss(*path)
+        self.assertEqual(cm.cache_info(), (1, 0, 2))
+      self.assertListEqual(list(cached_path_loss), list(path_loss))
+      self.assertEqual(num_calls[0], 2)
+    finally:
+      shutil.rmtree(tmp_dir)
+
 if __name__ == '__main__':
   unittest.main()
@@ -41,22 +41,43 @@ county_driver = county.CountyDriver()
 
 
 
-def ConfigureTerrainDriver(terrain_dir=None, cache_size=None):
+def ConfigureTerrainDriver(terrain_dir=None, cache_size=None, use_mmap=None,
+                           radial_fan_dist_km=None, cache_max_bytes=None,
+                           radial_fan_cache_size=None):
   """Configure the NED terrain driver.
 
-  Note that memory usage is about cache_size * 50MB.
+  Note that memory usage is about cache_size * 50MB, unless memory-mapped
+  mode is used, in which case tiles are shared through the OS page cache.
 
   Inputs:
     terrain_dir: if specified, change the terrain directory.
     cache_size:  if specified, change the terrain tile cache size.
+    use_mmap:    if specified, enable or disable the memory-mapped tile mode.
+    radial_fan_dist_km: if specified, the range of the per-transmitter terrain
+      radial fans (0 disables the radial fan mode). See
+      |terrain.TerrainDriver.SetRadialFanMode|.
+    cache_max_bytes: if specified, bound the memory of the tile cache (bytes),
+      in addition to its size in number of tiles.
+    radial_fan_cache_size: if specified with `radial_fan_dist_km`, the maximum
+      number of radial fans kept in cache.
   """
   if terrain_dir is not None:
     terrain_driver.SetTerrainDirectory(terrain_dir)
   if cache_size is not None:
     terrain_driver.SetCacheSize(cache_size)
-
-
-def ConfigureNlcdDriver(nlcd_dir=None, cache_size=None):
+  if use_mmap is not None:
+    terrain_driver.SetMemoryMapMode(use_mmap)
+  if radial_fan_dist_km is not None:
+    if radial_fan_cache_size is not None:
+      terrain_driver.SetRadialFanMode(max_dist_km=radial_fan_dist_km,
+                                      cache_size=radial_fan_cache_size)
+    else:
+      terrain_driver.SetRadialFanMode(max_dist_km=radial_fan_dist_km)
+  if cache_max_bytes is not None:
+    terrain_driver.SetCacheMemoryLimit(cache_max_bytes)
+
+
+def ConfigureNlcdDriver(nlcd_dir=None, cache_size=None, cache_max_bytes=None):
   """Configure the NLCD driver.
 
   Note that the memory usage is about cache_size * 12MB.
@@ -64,11 +85,28 @@ def ConfigureNlcdDriver(nlcd_dir=None, cache_size=None):
   Inputs:
     nlcd_dir: if specified, changes the NLCD Data default directory.
     cache_size:  if specified, change the NLCD tile cache size.
+    cache_max_bytes: if specified, bound the memory of the tile cache (bytes),
+      in addition to its size in number of tiles.
   """
   if nlcd_dir is not None:
     nlcd_driver.SetNlcdDirectory(nlcd_dir)
   if cache_size is not None:
     nlcd_driver.SetCacheSize(cache_size)
+  if cache_max_bytes is not None:
+    nlcd_driver.SetCacheMemoryLimit(cache_max_bytes)
+
+
+def ConfigureSharedTileStore(store=None):
+  """Configure the NED and NLCD drivers to use a shared memory tile store.
+
+  See module |shared_tiles| for typical usage with the worker processes.
+
+  Inputs:
+    store: a |shared_tiles.SharedTileStore|, or None to stop using the
+      currently configured store.
+  """
+  terrain_driver.SetSharedTileStore(store)
+  nlcd_driver.SetSharedTileStore(store)
 
 
 def ConfigureItuDrivers(itu_dir=None):
@@ -37,12 +37,11 @@ from __future__ import division
 from __future__ import print_function
 
 import os
-import threading
-import time
 
 import numpy as np
 
 from reference_models.geo import CONFIG
+from reference_models.geo import tile_cache
 from reference_models.geo import tiles
 
 
@@ -110,10 +109,11 @@ class NlcdDriver:
   """TerrainDriver class to retrieve land cover data.
 
   This driver works on 1-degrees unprojected NLCD tile database.
-  Keeps a LRU cache of most recent needed tiles.
+  Keeps a LRU cache of most recent needed tiles (see |tile_cache.TileCache|).
   For best performance it is best to:
    - group request in neighboring regions so that tiles eviction is reduced
-   - set the cache_size to the appropriate value for the region size.
+   - set the cache_size to the appropriate value for the region size, or
+     bound the cache memory with `SetCacheMemoryLimit()`.
 
   Typical usage:
     # Initialize driver
@@ -132,14 +132,15 @@ class NlcdDriver:
     driver.stats.Report()  # simple statistic reporting
     driver.stats.Reset()   # reset the statistic counter
   """
+  TILE_TYPE = 'nlcd'
+
   def __init__(self, nlcd_directory=None, cache_size=8):
     self.SetNlcdDirectory(nlcd_directory)
-    self.SetCacheSize(cache_size)
+    self.stats = tiles.TileStats(self.TILE_TYPE)
     # Keep a small tile cache, LRU fashion
-    self._tile_cache = {}
-    self._tile_lru = {}
-    self.stats = tiles.TileStats('nlcd')
-    self._lock = threading.Lock()
+    self._tile_cache = tile_cache.TileCache(cache_size, stats=self.stats)
+    self._lock = self._tile_cache.lock
+    self._shared_store = None
 
   def SetNlcdDirectory(self, nlcd_directory):
     """Configures the NLCD data directory."""
@@ -148,13 +149,86 @@ class NlcdDriver:
       self._nlcd_dir = CONFIG.GetLandCoverDir()
 
   def SetCacheSize(self, cache_size):
-    """Configures the cache size."""
-    if cache_size < 1: cache_size = 1
+    """Configures the cache size (in number of tiles)."""
     self.cache_size = cache_size
 
-  def _CacheLruUpdate(self, key):
-    """Updates the cache LRU."""
-    self._tile_lru[key] = time.time()
+  def SetCacheMemoryLimit(self, max_bytes=None):
+    """Configures the maximum memory (in bytes) of the tile cache.
+
+    The tiles held in process memory are accounted for their size, while the
+    memory-mapped and shared memory tiles are not. The cache is then bounded
+    both by this memory limit and by the `cache_size` in number of tiles.
+
+    Inputs:
+      max_bytes (int): the memory limit, or None for no limit.
+    """
+    self._tile_cache.SetLimits(max_bytes=max_bytes)
+
+  @property
+  def cache_size(self):
+    """The maximum number of tiles in cache."""
+    return self._tile_cache.max_tiles
+
+  @cache_size.setter
+  def cache_size(self, cache_size):
+    self._tile_cache.SetLimits(cache_size, self._tile_cache.max_bytes)
+
+  @property
+  def _tile_lru(self):
+    """The keys of the cached tiles, from least to most recently used."""
+    return self._tile_cache.Keys()
+
+  def SetSharedTileStore(self, store=None):
+    """Configures a shared memory tile store.
+
+    Tiles found in the store are used directly instead of being read from disk.
+    See module |shared_tiles|.
+
+    Inputs:
+      store (|shared_tiles.SharedTileStore|): the store, or None to stop using
+        the currently configured store.
+    """
+    with self._lock:
+      if store is not self._shared_store:
+        self._tile_cache.Clear()
+        if self._shared_store is not None:
+          self._shared_store.Detach(self.TILE_TYPE)
+      self._shared_store = store
+
+  def ReadTile(self, ilat, ilon):
+    """Reads a given tile from the database, without using the cache.
+
+    Input:
+      ilat, ilon (int): coordinate of NW corner.
+
+    Returns:
+      the tile as a 2D array, or None if unmanaged tile.
+
+    Raises:
+      IOError: if an expected tile cannot be read
+    """
+    if (ilat, ilon) not in _TILES_KEYS:
+      return None
+
+    encoding = '%c%02d%c%03d' % (
+        'sn'[int(ilat >= 0)], abs(ilat),
+        'we'[int(ilon >= 0)], abs(ilon))
+
+    tile_name1 = 'nlcd_' + encoding + '_ref.int'
+    tile_name2 = 'nlcd_' + encoding + '.int'
+    tile_name3 = os.path.join('nlcd_islands', tile_name1)
+    tile_name = (tile_name1
+                 if os.path.isfile(os.path.join(self._nlcd_dir, tile_name1))
+                 else (tile_name2
+                       if os.path.isfile(os.path.join(self._nlcd_dir, tile_name2))
+                       else tile_name3))
+
+    try:
+      return np.fromfile(
+          os.path.join(self._nlcd_dir, tile_name),
+          dtype=np.uint8).reshape(_TILE_DIM, _TILE_DIM)
+    except IOError:
+      raise IOError('NLCD Tile (%d,%d) not found.' % (ilat, ilon))
 
   def GetTile(self, ilat, ilon):
     """Returns a given tile as a 2D array, or None if unmanaged tile.
@@ -169,47 +243,32 @@ class NlcdDriver:
       IOError: if an expected tile cannot be read
     """
     key = (ilat, ilon)
+    if key not in _TILES_KEYS:
+      return None
+    # Cached tiles are read without locking.
+    tile = self._tile_cache.Get(key)
+    if tile is not None:
+      return tile
 
     with self._lock:
-      # Manage the cases of mem-loaded or unmanaged tiles.
-      try:
-        tile = self._tile_cache[key]
-        self._CacheLruUpdate(key)
+      # The tile may have been loaded by another thread in the meantime.
+      tile = self._tile_cache.Get(key, count_stats=False)
+      if tile is not None:
         return tile
-      except KeyError:
-        if key not in _TILES_KEYS:
-          return None
-
-      # Load a tile in memory and manage the cache
-      encoding = '%c%02d%c%03d' % (
-          'sn'[int(ilat >= 0)], abs(ilat),
-          'we'[int(ilon >= 0)], abs(ilon))
-
-      tile_name1 = 'nlcd_' + encoding + '_ref.int'
-      tile_name2 = 'nlcd_' + encoding + '.int'
-      tile_name3 = os.path.join('nlcd_islands', tile_name1)
-      tile_name = (tile_name1
-                   if os.path.isfile(os.path.join(self._nlcd_dir, tile_name1))
-                   else (tile_name2
-                         if os.path.isfile(os.path.join(self._nlcd_dir, tile_name2))
-                         else tile_name3))
-
-      try:
-        self._tile_cache[key] = np.fromfile(
-            os.path.join(self._nlcd_dir, tile_name),
-            dtype=np.uint8).reshape(_TILE_DIM, _TILE_DIM)
-      except IOError:
-        raise IOError('NLCD Tile (%d,%d) not found.' % (ilat, ilon))
-
-      # Check cache size and evict oldest
-      if len(self._tile_cache) > self.cache_size:
-        key_to_evict = min(self._tile_lru, key=self._tile_lru.get)
-        self._tile_cache.pop(key_to_evict)
-        self._tile_lru.pop(key_to_evict)
-      self._CacheLruUpdate(key)
-      self.stats.UpdateForTileLoad(ilat, ilon)
-
-      return self._tile_cache[key]
+
+      # Get the tile from the shared store, or load it in memory.
+      nbytes = 0
+      if self._shared_store is not None:
+        tile = self._shared_store.GetTile(self.TILE_TYPE, ilat, ilon)
+      if tile is not None:
+        self.stats.UpdateForStoreHit()
+      else:
+        tile = self.ReadTile(ilat, ilon)
+        self.stats.UpdateForTileLoad(ilat, ilon)
+        nbytes = tile.nbytes
+      self._tile_cache.Put(key, tile, nbytes)
+
+      return tile
 
   def GetLandCoverCodes(self, lat, lon):
     """Retrieves the NLCD value of one or several points.
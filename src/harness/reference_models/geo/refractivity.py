@@ -104,6 +104,45 @@ class RefractivityIndexer:
 
     return refractivity
 
+  def Refractivities(self, lats, lons):
+    """Returns ITU refractivities for a set of points.
+
+    This is the vectorized version of `Refractivity`, giving identical results.
+
+    Inputs:
+      lats, lons: the coordinates of the points, as ndarray.
+
+    Returns:
+      the sea level refractivities on those points, as a ndarray.
+    """
+    if self._data is None:
+      self._data = np.loadtxt(self._datafile)
+      logging.info('Loaded refractivity data from %s' % self._datafile)
+
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    lons = np.where(lons < 0, lons + 360.0, lons)
+
+    rows = (self._lat_start - lats) / self._delta_lat
+    cols = (lons - self._lon_start) / self._delta_lon
+
+    # Bilinear interpolation on values
+    irows = np.floor(rows).astype(int)
+    icols = np.floor(cols).astype(int)
+
+    r00 = self._data[irows,   icols]
+    r11 = self._data[irows+1, icols+1]
+    r01 = self._data[irows,   icols+1]
+    r10 = self._data[irows+1, icols]
+
+    alpha_r, alpha_c = rows - irows, cols - icols
+    refractivities = ( r11 * alpha_r * alpha_c +
+                       r00 * (1-alpha_r) * (1-alpha_c) +
+                       r01 * (1-alpha_r) * alpha_c +
+                       r10 * alpha_r * (1-alpha_c) )
+
+    return refractivities
+
 if __name__ == '__main__':
   indx = RefractivityIndexer()
   r = indx.Refractivity(float(sys.argv[1]), float(sys.argv[2]))
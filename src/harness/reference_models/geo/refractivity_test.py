@@ -64,5 +64,14 @@ class TestRefractivity(unittest.TestCase):
     self.assertEqual(self.refDriver.Refractivity(1.5, 0.375), 150)
     self.assertEqual(self.refDriver.Refractivity(0.375, 0.375), 150*0.25 + 20*0.75)
 
+  def test_vectorized(self):
+    np.random.seed(12345)
+    lats = np.random.uniform(-89., 89., 500)
+    lons = np.random.uniform(-180., 180., 500)
+    refractivities = self.refDriver.Refractivities(lats, lons)
+    self.assertListEqual(
+        list(refractivities),
+        [self.refDriver.Refractivity(lat, lon) for lat, lon in zip(lats, lons)])
+
 if __name__ == '__main__':
   unittest.main()
@@ -0,0 +1,248 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Shared memory store of NED/NLCD tiles.
+
+By default each worker process of the multiprocessing pool (see `mpool`) keeps
+its own LRU cache of tiles in its terrain and NLCD drivers, which means that
+the same tiles are read from disk and held in memory once per process.
+
+The `SharedTileStore` allows the parent process to load the tiles once per
+host into shared memory blocks (`multiprocessing.shared_memory`). The drivers
+in every worker then attach to those blocks by tile key, instead of reading
+the tiles from disk.
+
+Typical usage (in the parent process):
+  # Configure the pool
+  mpool.Configure(num_processes)
+
+  # Create the store and load the tiles of the region of interest
+  store = shared_tiles.SharedTileStore()
+  store.AddDriverTiles(drive.terrain_driver, terrain_tile_keys)
+  store.AddDriverTiles(drive.nlcd_driver, nlcd_tile_keys)
+
+  # Let the drivers of all processes use the store
+  drive.ConfigureSharedTileStore(store)
+  mpool.RunOnEachWorkerProcess(drive.ConfigureSharedTileStore, store)
+
+  ... run the calculation ...
+
+  # Release the shared memory
+  mpool.RunOnEachWorkerProcess(drive.ConfigureSharedTileStore, None)
+  drive.ConfigureSharedTileStore(None)
+  store.Close()
+
+Tiles not found in the store are simply read from disk by the drivers, as usual.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+import threading
+
+import numpy as np
+
+try:
+  from multiprocessing import shared_memory
+except ImportError:  # Python2 or Python3 < 3.8
+  raise ImportError('The shared tile store requires python 3.8 or later '
+                    '(multiprocessing.shared_memory).')
+
+
+# Header of each shared block: (num_rows, num_cols, dtype character code).
+_HEADER_DTYPE = np.int64
+_HEADER_SIZE = 3
+_HEADER_BYTES = _HEADER_SIZE * np.dtype(_HEADER_DTYPE).itemsize
+
+
+class SharedTileStore(object):
+  """A store of tiles held in shared memory.
+
+  The store is owned by the process which creates it: only that process can add
+  tiles, and it is responsible for releasing the shared memory with `Close()`.
+  Copies of the store passed to other processes (by pickling, for example through
+  `mpool.RunOnEachWorkerProcess`) can only read the tiles.
+
+  Attributes:
+    name (str): the unique name of the store, used as prefix of all the shared
+      memory block names.
+  """
+  def __init__(self, name=None):
+    """Creates a new store.
+
+    Inputs:
+      name (str): an optional name for the store. By default a unique name is
+        derived from the process id.
+    """
+    self.name = name if name is not None else 'sastiles%d' % os.getpid()
+    self._owner_pid = os.getpid()
+    self._owned_blocks = {}
+    self._attached_blocks = {}
+    self._lock = threading.Lock()
+
+  def __getstate__(self):
+    # Only the name is transferred to other processes.
+    return {'name': self.name}
+
+  def __setstate__(self, state):
+    self.name = state['name']
+    self._owner_pid = None
+    self._owned_blocks = {}
+    self._attached_blocks = {}
+    self._lock = threading.Lock()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.Close()
+
+  def _IsOwner(self):
+    return self._owner_pid == os.getpid()
+
+  @staticmethod
+  def _BlockKey(tile_type, ilat, ilon):
+    return (tile_type, int(ilat), int(ilon))
+
+  def _BlockName(self, tile_type, ilat, ilon):
+    return '%s_%s_%c%02d%c%03d' % (
+        self.name, tile_type,
+        'sn'[int(ilat >= 0)], abs(int(ilat)),
+        'we'[int(ilon >= 0)], abs(int(ilon)))
+
+  @staticmethod
+  def _TileView(block):
+    """Returns a read-only ndarray view of the tile held in a shared block."""
+    header = np.ndarray((_HEADER_SIZE,), dtype=_HEADER_DTYPE, buffer=block.buf)
+    num_rows, num_cols, dtype_code = [int(v) for v in header]
+    tile = np.ndarray((num_rows, num_cols), dtype=np.dtype(chr(dtype_code)),
+                      buffer=block.buf, offset=_HEADER_BYTES)
+    tile.flags.writeable = False
+    return tile
+
+  def AddTile(self, tile_type, ilat, ilon, tile):
+    """Adds a tile to the store.
+
+    Inputs:
+      tile_type (str): the tile type, for example 'ned' or 'nlcd'.
+      ilat, ilon (int): integer coordinates of NW corner.
+      tile (ndarray): the 2D tile data.
+
+    Returns:
+      True if the tile has been added, False if already in the store.
+
+    Raises:
+      RuntimeError: if not called in the process owning the store.
+    """
+    if not self._IsOwner():
+      raise RuntimeError('Tiles can only be added by the store owner process.')
+    key = self._BlockKey(tile_type, ilat, ilon)
+    with self._lock:
+      if key in self._owned_blocks:
+        return False
+      tile = np.asarray(tile)
+      block = shared_memory.SharedMemory(
+          name=self._BlockName(*key), create=True,
+          size=_HEADER_BYTES + tile.nbytes)
+      header = np.ndarray((_HEADER_SIZE,), dtype=_HEADER_DTYPE, buffer=block.buf)
+      header[:] = [tile.shape[0], tile.shape[1], ord(tile.dtype.char)]
+      data = np.ndarray(tile.shape, dtype=tile.dtype,
+                        buffer=block.buf, offset=_HEADER_BYTES)
+      data[:] = tile
+      del header, data
+      self._owned_blocks[key] = block
+      return True
+
+  def AddDriverTiles(self, driver, tile_keys):
+    """Adds the tiles of a terrain or NLCD driver into the store.
+
+    The tiles are read directly from the database, bypassing the driver cache.
+
+    Inputs:
+      driver: a |terrain.TerrainDriver| or |nlcd.NlcdDriver|.
+      tile_keys: an iterable of (ilat, ilon) coordinates of the tiles NW corner.
+        Tiles not managed by the driver are ignored.
+
+    Returns:
+      the number of tiles added to the store.
+    """
+    num_added = 0
+    for ilat, ilon in tile_keys:
+      if self._BlockKey(driver.TILE_TYPE, ilat, ilon) in self._owned_blocks:
+        continue
+      tile = driver.ReadTile(ilat, ilon)
+      if tile is None:
+        continue
+      num_added += self.AddTile(driver.TILE_TYPE, ilat, ilon, tile)
+    return num_added
+
+  def GetTile(self, tile_type, ilat, ilon):
+    """Returns a tile of the store as a read-only 2D array, or None if not found.
+
+    Inputs:
+      tile_type (str): the tile type, for example 'ned' or 'nlcd'.
+      ilat, ilon (int): integer coordinates of NW corner.
+    """
+    key = self._BlockKey(tile_type, ilat, ilon)
+    with self._lock:
+      block = self._owned_blocks.get(key)
+      if block is None:
+        block = self._attached_blocks.get(key)
+      if block is None:
+        try:
+          block = shared_memory.SharedMemory(name=self._BlockName(*key))
+        except (IOError, OSError, ValueError):
+          return None
+        self._attached_blocks[key] = block
+      return self._TileView(block)
+
+  def Detach(self, tile_type=None):
+    """Detaches from the shared blocks attached by this process.
+
+    Tile arrays of that type previously returned by `GetTile` shall not be used
+    anymore.
+
+    Inputs:
+      tile_type (str): the tile type to detach from, for example 'ned' or 'nlcd'.
+        By default detaches from the blocks of all types.
+    """
+    with self._lock:
+      keys = [key for key in self._attached_blocks
+              if tile_type is None or key[0] == tile_type]
+      for key in keys:
+        block = self._attached_blocks.pop(key)
+        try:
+          block.close()
+        except BufferError:
+          # Some views are still referenced: let the GC release the block.
+          pass
+
+  def Close(self):
+    """Releases all the shared memory of the store.
+
+    In the owner process, this also destroys the shared blocks, which shall not
+    be used anymore by any process.
+    """
+    self.Detach()
+    if not self._IsOwner():
+      return
+    with self._lock:
+      for block in self._owned_blocks.values():
+        try:
+          block.close()
+        except BufferError:
+          pass
+        block.unlink()
+      self._owned_blocks.clear()
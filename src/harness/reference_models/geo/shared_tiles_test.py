@@ -0,0 +1,129 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from reference_models.geo import nlcd
+from reference_models.geo import terrain
+try:
+  from reference_models.geo import shared_tiles
+except ImportError:
+  shared_tiles = None
+
+
+def _GetWorkerElevations(store, tile_dir, lats, lons):
+  driver = terrain.TerrainDriver(tile_dir)
+  # Remove the data from disk, to check that the tile comes from the store.
+  driver.SetTerrainDirectory(os.path.join(tile_dir, 'none'))
+  driver.SetSharedTileStore(store)
+  elev = driver.GetTerrainElevation(lats, lons)
+  num_loads = driver.stats.ActiveTilesCount()[0]
+  store_hits = driver.stats.store_hits
+  driver.SetSharedTileStore(None)
+  return elev, num_loads, store_hits
+
+
+@unittest.skipIf(shared_tiles is None, 'Shared memory not supported')
+class TestSharedTiles(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.tile_dir = tempfile.mkdtemp()
+    np.random.seed(12345)
+    tile = np.random.uniform(-10, 1000, (terrain._TILE_DIM, terrain._TILE_DIM))
+    tile.astype(np.float32).tofile(
+        os.path.join(cls.tile_dir, 'floatn38w123_1_std.flt'))
+    cls.lats = 37 + np.arange(0.005, 0.99, 0.01)
+    cls.lons = -122.99 + np.arange(0.005, 0.99, 0.01)
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tile_dir)
+
+  def test_add_and_get(self):
+    tile = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    with shared_tiles.SharedTileStore('sastest%d' % os.getpid()) as store:
+      self.assertTrue(store.AddTile('nlcd', 38, -123, tile))
+      self.assertFalse(store.AddTile('nlcd', 38, -123, tile))
+      self.assertIsNone(store.GetTile('nlcd', 39, -123))
+      self.assertIsNone(store.GetTile('ned', 38, -123))
+      # Access from a non-owner copy of the store.
+      reader = pickle.loads(pickle.dumps(store))
+      shared_tile = reader.GetTile('nlcd', 38, -123)
+      self.assertEqual(shared_tile.dtype, np.uint8)
+      self.assertTrue(np.array_equal(shared_tile, tile))
+      self.assertFalse(shared_tile.flags.writeable)
+      with self.assertRaises(RuntimeError):
+        reader.AddTile('nlcd', 39, -123, tile)
+      del shared_tile
+      reader.Close()
+    self.assertIsNone(reader.GetTile('nlcd', 38, -123))
+
+  def test_driver_with_store(self):
+    ref_elev = terrain.TerrainDriver(self.tile_dir).GetTerrainElevation(
+        self.lats, self.lons)
+
+    driver = terrain.TerrainDriver(self.tile_dir)
+    with shared_tiles.SharedTileStore('sastest%d' % os.getpid()) as store:
+      self.assertEqual(
+          store.AddDriverTiles(driver, [(38, -123), (38, -123), (0, 0)]), 1)
+      # Loading is done bypassing the driver cache.
+      self.assertEqual(len(driver._tile_cache), 0)
+
+      # Use the store in a pool of worker processes.
+      pool = multiprocessing.Pool(2)
+      results = pool.starmap(_GetWorkerElevations,
+                             [(store, self.tile_dir, self.lats, self.lons)] * 4)
+      pool.close()
+      pool.join()
+      for elev, num_loads, store_hits in results:
+        self.assertEqual(np.max(np.abs(elev - ref_elev)), 0)
+        self.assertEqual(num_loads, 0)
+        self.assertEqual(store_hits, 1)
+
+  def test_detach_per_driver(self):
+    ned_tile = np.arange(12, dtype=np.float32).reshape(3, 4)
+    nlcd_tile = np.arange(12, dtype=np.uint8).reshape(3, 4)
+    with shared_tiles.SharedTileStore('sastest%d' % os.getpid()) as store:
+      store.AddTile('ned', 38, -123, ned_tile)
+      store.AddTile('nlcd', 38, -123, nlcd_tile)
+      reader = pickle.loads(pickle.dumps(store))
+      terrain_driver = terrain.TerrainDriver(self.tile_dir)
+      nlcd_driver = nlcd.NlcdDriver(self.tile_dir)
+      terrain_driver.SetSharedTileStore(reader)
+      nlcd_driver.SetSharedTileStore(reader)
+      reader.GetTile('ned', 38, -123)
+      shared_tile = reader.GetTile('nlcd', 38, -123)
+      # Stopping the store in the terrain driver keeps the NLCD blocks.
+      terrain_driver.SetSharedTileStore(None)
+      self.assertListEqual(list(reader._attached_blocks),
+                           [('nlcd', 38, -123)])
+      self.assertTrue(np.array_equal(shared_tile, nlcd_tile))
+      del shared_tile
+      nlcd_driver.SetSharedTileStore(None)
+      self.assertEqual(len(reader._attached_blocks), 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
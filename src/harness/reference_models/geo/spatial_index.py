@@ -0,0 +1,157 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""Spatial index of locations, for fast neighborhood queries.
+
+The neighborhood of a protection point is defined by the geodesic distance
+(see `vincenty.py`) to the CBSDs. Computing that distance for every CBSD and
+every protection point is costly.
+
+The `SpatialIndex` allows to quickly find the candidate locations within a
+given distance, using a conservative prefiltering based on:
+  - the latitude, with all locations sorted by latitude.
+  - the chord distance between the ECEF coordinates of the locations on the
+    WGS84 ellipsoid, which is always lower than the geodesic distance.
+The exact geodesic distance is then only computed on the candidates.
+
+Typical usage:
+  # Build the index once for a list of grants
+  grant_index = spatial_index.GrantsIndex(grants)
+
+  # Get the indices of the grants potentially within 40km of a point
+  idxs = grant_index.Candidates(lat, lon, 40)
+
+  # Or the indices and distances of the grants within 40km
+  idxs, dists_km = grant_index.Neighbors(lat, lon, 40)
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from reference_models.geo import vincenty
+
+# WGS84 ellipsoid parameters (km).
+_WGS84_A = 6378.1370
+_WGS84_F = 1./298.257223563
+_WGS84_E2 = _WGS84_F * (2 - _WGS84_F)
+# Lower bound of the meridional radius of curvature, reached at the equator.
+_MIN_MERIDIONAL_RADIUS = _WGS84_A * (1 - _WGS84_E2)
+# Margin used for absorbing rounding errors in the prefiltering (km).
+_MARGIN_KM = 1e-6
+
+
+def _ToEcef(lats, lons):
+  """Returns the ECEF coordinates (km) of points on the WGS84 ellipsoid.
+
+  Inputs:
+    lats, lons: ndarray of latitudes and longitudes (degrees).
+
+  Returns:
+    A ndarray of shape (N, 3) of ECEF coordinates.
+  """
+  phi = np.radians(lats)
+  lmbda = np.radians(lons)
+  sin_phi = np.sin(phi)
+  cos_phi = np.cos(phi)
+  n = _WGS84_A / np.sqrt(1 - _WGS84_E2 * sin_phi**2)
+  return np.column_stack((n * cos_phi * np.cos(lmbda),
+                          n * cos_phi * np.sin(lmbda),
+                          n * (1 - _WGS84_E2) * sin_phi))
+
+
+class SpatialIndex(object):
+  """Spatial index of a set of locations.
+
+  The index is immutable and picklable, so it can be built once in the main
+  process and shared with the worker processes.
+
+  Attributes:
+    num_points: The number of indexed locations.
+  """
+  def __init__(self, latitudes, longitudes):
+    """Builds the index.
+
+    Inputs:
+      latitudes, longitudes: sequences of the location coordinates (degrees).
+    """
+    latitudes = np.asarray(latitudes, dtype=np.float64).ravel()
+    longitudes = np.asarray(longitudes, dtype=np.float64).ravel()
+    if latitudes.shape != longitudes.shape:
+      raise ValueError('Latitudes and longitudes shall have same size.')
+    self.num_points = len(latitudes)
+    self._order = np.argsort(latitudes, kind='mergesort')
+    self._inv_order = np.empty_like(self._order)
+    self._inv_order[self._order] = np.arange(self.num_points)
+    self._lats = latitudes[self._order]
+    self._lons = longitudes[self._order]
+    self._ecef = _ToEcef(self._lats, self._lons)
+
+  def Candidates(self, lat, lon, max_dist_km):
+    """Returns the candidate locations within a given distance of a point.
+
+    The prefiltering is conservative: all the locations within the geodesic
+    distance are returned, plus possibly a few more locations slightly beyond.
+
+    Inputs:
+      lat, lon: The point coordinates (degrees).
+      max_dist_km: The maximum geodesic distance (km).
+
+    Returns:
+      The sorted ndarray of indices of the candidate locations.
+    """
+    # Latitude band: the geodesic is longer than the meridian arc between
+    # the two latitudes.
+    max_dlat = np.degrees((max_dist_km + _MARGIN_KM) / _MIN_MERIDIONAL_RADIUS)
+    start = np.searchsorted(self._lats, lat - max_dlat, side='left')
+    end = np.searchsorted(self._lats, lat + max_dlat, side='right')
+    # Chord distance, always lower than the geodesic distance.
+    point = _ToEcef(np.array([lat]), np.array([lon]))[0]
+    chords2 = np.sum((self._ecef[start:end] - point)**2, axis=1)
+    inside = chords2 <= (max_dist_km + _MARGIN_KM)**2
+    return np.sort(self._order[start:end][inside])
+
+  def Neighbors(self, lat, lon, max_dist_km):
+    """Returns the locations within a given geodesic distance of a point.
+
+    Inputs:
+      lat, lon: The point coordinates (degrees).
+      max_dist_km: The maximum geodesic distance (km).
+
+    Returns:
+      A tuple (idxs, dists_km) of the sorted ndarray of indices of the locations
+      within the distance, and their geodesic distances (km).
+    """
+    idxs = self.Candidates(lat, lon, max_dist_km)
+    lats, lons = self.Locations(idxs)
+    dists_km, _, _ = vincenty.GeodesicDistanceBearingArrays(lats, lons, lat, lon)
+    inside = dists_km <= max_dist_km
+    return idxs[inside], dists_km[inside]
+
+  def Locations(self, idxs):
+    """Returns the (lats, lons) ndarray of the locations of given indices."""
+    sorted_idxs = self._inv_order[np.asarray(idxs, dtype=int)]
+    return self._lats[sorted_idxs], self._lons[sorted_idxs]
+
+
+def GrantsIndex(grants):
+  """Returns the |SpatialIndex| of the location of a list of grants.
+
+  Inputs:
+    grants: A list of |data.CbsdGrantInfo| grants, or any object with attributes
+      'latitude' and 'longitude'.
+  """
+  return SpatialIndex([grant.latitude for grant in grants],
+                      [grant.longitude for grant in grants])
@@ -0,0 +1,77 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import namedtuple
+import pickle
+import unittest
+
+import numpy as np
+
+from reference_models.geo import spatial_index
+from reference_models.geo import vincenty
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+  def test_neighbors_same_as_vincenty(self):
+    np.random.seed(12345)
+    lats = np.random.uniform(35, 40, 3000)
+    lons = np.random.uniform(-125, -119, 3000)
+    index = spatial_index.SpatialIndex(lats, lons)
+    self.assertEqual(index.num_points, 3000)
+    for lat, lon, max_dist_km in [(37.5, -122, 40), (37.5, -122, 150),
+                                  (35.1, -124.9, 80), (39, -119.5, 0.5),
+                                  (45, -122, 100)]:
+      dists_km = np.array([vincenty.GeodesicDistanceBearing(lat2, lon2, lat, lon)[0]
+                           for lat2, lon2 in zip(lats, lons)])
+      exp_idxs = np.where(dists_km <= max_dist_km)[0]
+      idxs, idx_dists_km = index.Neighbors(lat, lon, max_dist_km)
+      self.assertListEqual(list(idxs), list(exp_idxs))
+      self.assertTrue(np.allclose(idx_dists_km, dists_km[exp_idxs],
+                                  rtol=0, atol=1e-9))
+      # Prefiltering is conservative, but still efficient.
+      candidates = index.Candidates(lat, lon, max_dist_km)
+      self.assertTrue(set(exp_idxs).issubset(candidates))
+      self.assertLessEqual(len(candidates), len(exp_idxs) * 1.01 + 1)
+
+  def test_on_boundary(self):
+    lat, lon = 37.5, -122.
+    lats, lons, _ = vincenty.GeodesicPoints(lat, lon, [10, 20, 30], 45)
+    index = spatial_index.SpatialIndex(lats, lons)
+    dist_km = vincenty.GeodesicDistanceBearing(lats[1], lons[1], lat, lon)[0]
+    idxs, _ = index.Neighbors(lat, lon, dist_km)
+    self.assertListEqual(list(idxs), [0, 1])
+
+  def test_grants_index(self):
+    Grant = namedtuple('Grant', ['latitude', 'longitude'])
+    grants = [Grant(37.5, -122.), Grant(37.7, -122.), Grant(38.5, -122.)]
+    index = pickle.loads(pickle.dumps(spatial_index.GrantsIndex(grants)))
+    self.assertListEqual(list(index.Candidates(37.6, -122., 40)), [0, 1])
+    lats, lons = index.Locations([2, 0])
+    self.assertListEqual(list(lats), [38.5, 37.5])
+    self.assertListEqual(list(lons), [-122., -122.])
+
+  def test_empty(self):
+    index = spatial_index.SpatialIndex([], [])
+    self.assertEqual(len(index.Candidates(37.5, -122, 40)), 0)
+    idxs, dists_km = index.Neighbors(37.5, -122, 40)
+    self.assertEqual(len(idxs), 0)
+    self.assertEqual(len(dists_km), 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -29,13 +29,17 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from collections import OrderedDict
+import logging
 import os
 import threading
-import time
+import weakref
 
 import numpy as np
+from six.moves import queue
 
 from reference_models.geo import CONFIG
+from reference_models.geo import tile_cache
 from reference_models.geo import tiles
 from reference_models.geo import vincenty
 
@@ -45,24 +49,144 @@ _NUM_PIXEL_OVERLAP = 6 # Number of pixel overlap in tiles
 _TILE_BASE_DIM = 3600
 _TILE_DIM = _TILE_BASE_DIM + 2 * _NUM_PIXEL_OVERLAP # Dimension of a tile
 _TILES_KEYS = tiles.NED_TILES
+# Number of radials computed per vectorized batch when building a radial fan.
+_FAN_BATCH_RADIALS = 64
+
+# The drivers with a running prefetch thread, stopped before any fork so that
+# the child processes do not inherit a tile cache lock held by that thread.
+_prefetching_drivers = weakref.WeakSet()
+
+
+def _StopPrefetchBeforeFork():
+  for driver in list(_prefetching_drivers):
+    driver._StopPrefetch()
+
+
+if hasattr(os, 'register_at_fork'):
+  os.register_at_fork(before=_StopPrefetchBeforeFork)
+
+
+class TerrainRadialFan(object):
+  """Terrain elevations on a fan of radials around a point.
+
+  The fan holds the terrain elevation on a regular (azimuth, distance) grid
+  centered on a point (typically a CBSD), as a compact float32 array. Once built,
+  the terrain profile from that point toward any other point within the fan
+  range is obtained by bilinear interpolation on the grid, without any further
+  geodesic computation nor tile access.
+
+  As the profile points are interpolated between the radials, the profiles are
+  an approximation of the ones computed by |TerrainDriver.TerrainProfile|. The
+  azimuth resolution shall be chosen so that the distance between adjacent
+  radials stays in the order of the terrain resolution over the required range.
+
+  Attributes:
+    lat, lon: the coordinates of the fan center (degrees).
+    max_dist_km: the fan range (km).
+    num_azimuths: the number of radials, equally spaced from azimuth 0.
+    radial_res_km: the distance between the radial samples (km).
+    elevs: the terrain elevations, as a float32 ndarray of shape
+      (num_azimuths, num_radial_points).
+  """
+
+  def __init__(self, terrain_driver, lat, lon, max_dist_km,
+               num_azimuths=1440, radial_res_meter=30.):
+    """Builds the radial fan.
+
+    Inputs:
+      terrain_driver: the |TerrainDriver| used for reading the terrain.
+      lat, lon: the coordinates of the fan center (degrees).
+      max_dist_km: the fan range (km).
+      num_azimuths: the number of radials.
+      radial_res_meter: the target resolution along the radials (m).
+    """
+    self.lat = lat
+    self.lon = lon
+    self.max_dist_km = float(max_dist_km)
+    self.num_azimuths = int(num_azimuths)
+    num_radial_points = max(
+        int(np.ceil(1000. * self.max_dist_km / radial_res_meter)) + 1, 2)
+    self.radial_res_km = self.max_dist_km / (num_radial_points - 1.)
+    self._azimuth_step = 360. / self.num_azimuths
+
+    dists_km = self.radial_res_km * np.arange(num_radial_points)
+    azimuths = self._azimuth_step * np.arange(self.num_azimuths)
+    self.elevs = np.zeros((self.num_azimuths, num_radial_points),
+                          dtype=np.float32)
+    for k in range(0, self.num_azimuths, _FAN_BATCH_RADIALS):
+      batch_azimuths = azimuths[k:k+_FAN_BATCH_RADIALS]
+      num_points = len(batch_azimuths) * num_radial_points
+      lats, lons, _ = vincenty.GeodesicPointsArrays(
+          np.full(num_points, lat), np.full(num_points, lon),
+          np.tile(dists_km, len(batch_azimuths)),
+          np.repeat(batch_azimuths, num_radial_points))
+      self.elevs[k:k+len(batch_azimuths)] = terrain_driver.GetTerrainElevation(
+          lats, lons, do_interp=True).reshape(len(batch_azimuths),
+                                              num_radial_points)
+    self.elevs[:, 0] = terrain_driver.GetTerrainElevation(lat, lon,
+                                                          do_interp=True)
+
+  def GetElevations(self, dists_km, bearings):
+    """Returns the interpolated terrain elevation at some points of the fan.
+
+    Inputs:
+      dists_km (scalar or ndarray): distances of the points from the fan
+        center (km), at most `max_dist_km`.
+      bearings (scalar or ndarray): bearings of the points from the fan center
+        (degrees).
+
+    Returns:
+      the terrain elevations as a float64 ndarray.
+    """
+    az_pos = np.asarray(bearings, dtype=float) % 360. / self._azimuth_step
+    dist_pos = np.asarray(dists_km, dtype=float) / self.radial_res_km
+    az_idx = np.floor(az_pos).astype(int)
+    alpha_az = az_pos - az_idx
+    az_idx0 = az_idx % self.num_azimuths
+    az_idx1 = (az_idx + 1) % self.num_azimuths
+    dist_idx = np.clip(np.floor(dist_pos).astype(int),
+                       0, self.elevs.shape[1] - 2)
+    alpha_dist = np.clip(dist_pos - dist_idx, 0., 1.)
+
+    elevs0 = ((1 - alpha_dist) * self.elevs[az_idx0, dist_idx]
+              + alpha_dist * self.elevs[az_idx0, dist_idx + 1])
+    elevs1 = ((1 - alpha_dist) * self.elevs[az_idx1, dist_idx]
+              + alpha_dist * self.elevs[az_idx1, dist_idx + 1])
+    return (1 - alpha_az) * elevs0 + alpha_az * elevs1
+
+  @property
+  def nbytes(self):
+    """The memory size of the fan elevations (bytes)."""
+    return self.elevs.nbytes
+
 
 class TerrainDriver:
   """TerrainDriver class to retrieve elevation data.
 
-  Keeps a LRU cache of most recent needed tiles.
+  Keeps a LRU cache of most recent needed tiles (see |tile_cache.TileCache|).
   For best performance it is best to:
    - group request in neighboring regions so that tiles eviction is reduced
-   - set the cache_size to the appropriate value for the region size.
+     (see |mpool.MapByLocation|)
+   - set the cache_size to the appropriate value for the region size, or
+     bound the cache memory with `SetCacheMemoryLimit()`.
   One tile being 1x1 degrees typically covers around 110km x 90km in continental US.
 
+  Tiles can optionally be opened as read-only memory maps instead of being
+  fully read in memory. In that mode the tile data lives in the OS page cache,
+  and is therefore shared by all processes (for example the workers of a
+  multiprocessing pool) accessing the same tiles on one host.
+
   Attributes:
     cache_size (int): maximum number of tiles cached in memory.
-      Memory usage is about 50MB per tile.
+      Memory usage is about 50MB per tile (in non memory-mapped mode).
+    use_mmap (bool): True if tiles are opened as read-only memory maps.
     stats (|tile.TileStats|): a tile statistic counter.
 
   Typical usage:
     # Initialize driver
     driver = TerrainDriver(cache_size=8)
+    # or with tiles memory-mapped and shared through the OS page cache
+    driver = TerrainDriver(cache_size=64, use_mmap=True)
 
     # Get the altitude in one or several locations
     altitudes = driver.GetTerrainElevation(lat, lon, do_interp=True)
@@ -71,28 +195,55 @@ class TerrainDriver:
     its_profile = driver.TerrainProfile(lat1, lon1, lat2, lon2,
                                         target_res_meters=30, max_points=1501)
 
+    # Get the profiles of many paths in one batch
+    profiles, num_points = driver.TerrainProfiles(lat1s, lon1s, lat2s, lon2s,
+                                                  target_res_meter=30,
+                                                  max_points=1501)
+
     # Compute the HAAT(Height above average terrain) for a given point
     haat = driver.ComputeNormalizedHaat(lat, lon)
 
+    # Interpolate the profiles from cached per-transmitter radial fans, when
+    # the same transmitters are used toward many receivers
+    driver.SetRadialFanMode(max_dist_km=80)
+
+    # Bound the memory of the tile cache to 1GB
+    driver.SetCacheMemoryLimit(1 << 30)
+
+    # Read in background the tiles of the paths to be computed next
+    driver.PrefetchForPaths(lat1s, lon1s, lat2s, lon2s)
+
     # Manage driver statistics. Useful to understand/optimize cache usage/size
-    driver.stats.Report()  # simple statistic reporting
+    driver.stats.Report()  # simple statistic reporting, incl. cache hit rate
     driver.stats.Reset()   # reset the statistic counter
   """
-  def __init__(self, terrain_directory=None, cache_size=8):
+  TILE_TYPE = 'ned'
+
+  def __init__(self, terrain_directory=None, cache_size=8, use_mmap=False):
+    self._radial_fans = OrderedDict()
+    self._fans_lock = threading.Lock()
+    self.SetRadialFanMode()
     self.SetTerrainDirectory(terrain_directory)
-    self.SetCacheSize(cache_size)
+    self.stats = tiles.TileStats(self.TILE_TYPE)
     # Keep a small tile cache, LRU fashion
-    self._tile_cache = {}
-    self._tile_lru = {}
-    self.stats = tiles.TileStats('ned')
-    self._lock = threading.Lock()
+    self._tile_cache = tile_cache.TileCache(cache_size, stats=self.stats)
+    self._lock = self._tile_cache.lock
     self.do_flat = False
+    self.use_mmap = use_mmap
+    self._shared_store = None
+    # Background prefetching of tiles
+    self._prefetch_queue = None
+    self._prefetch_thread = None
+    self._prefetch_pid = None
+    self._prefetch_pending = {}
 
   def SetTerrainDirectory(self, terrain_directory):
     """Configures the terrain data directory."""
     self._terrain_dir = terrain_directory
     if self._terrain_dir is None:
       self._terrain_dir = CONFIG.GetTerrainDir()
+    with self._fans_lock:
+      self._radial_fans.clear()
 
   def SetFlatEarthMode(self, do_flat=False):
     """Sets the driver in flat-earth mode.
@@ -106,13 +257,172 @@ class TerrainDriver:
     self.do_flat = do_flat
 
   def SetCacheSize(self, cache_size):
-    """Configures the cache size."""
-    if cache_size < 1: cache_size = 1
+    """Configures the cache size (in number of tiles)."""
     self.cache_size = cache_size
 
-  def _CacheLruUpdate(self, key):
-    """Updates the cache LRU."""
-    self._tile_lru[key] = time.time()
+  def SetMemoryMapMode(self, use_mmap=False):
+    """Configures the tile reading mode.
+
+    In memory-mapped mode, the tiles are opened as read-only `np.memmap` instead
+    of being fully read in memory. The tile data is then backed by the OS page
+    cache and shared by all processes of the host, so that the per-process memory
+    usage becomes negligible and the cache_size can be increased accordingly.
+    Changing the mode flushes the current tile cache.
+
+    Inputs:
+      use_mmap (bool): if True, use memory-mapped tiles.
+    """
+    use_mmap = bool(use_mmap)
+    with self._lock:
+      if use_mmap != self.use_mmap:
+        self._tile_cache.Clear()
+      self.use_mmap = use_mmap
+
+  def SetRadialFanMode(self, max_dist_km=0, num_azimuths=1440,
+                       radial_res_meter=30., cache_size=8, min_paths=1000):
+    """Configures the radial fan mode of the terrain profiles.
+
+    In radial fan mode, a |TerrainRadialFan| is built for the starting point of
+    the profiles requested in batch (see `TerrainProfiles`), and the profiles
+    toward points within the fan range are interpolated from that fan.
+    Building a fan costs about as much as a few thousand standard profiles,
+    while each interpolated profile is several times faster. So a fan is only
+    built for a starting point having at least `min_paths` paths within range in
+    a single `TerrainProfiles` call, as done by grant-major workloads where
+    each transmitter is used toward many receivers at once (see for example
+    |aggregate_interference.aggregateInterferenceForPointsByGrant|). Point-major
+    workloads, which compute a few paths per transmitter at a time, thus never
+    build fans and use the standard profiles.
+    The fans of the most recent starting points are kept in a LRU cache, and
+    are used by the batch profiles from those points. The single profiles of
+    `TerrainProfile` are never interpolated from a fan.
+    Memory usage of a fan is about `4 * num_azimuths * max_dist_km * 1000 /
+    radial_res_meter` bytes, ie 15MB with the default settings and 80km.
+
+    Note that the profiles are then an approximation of the standard profiles
+    (see |TerrainRadialFan|). Changing the mode flushes the current fans.
+
+    Inputs:
+      max_dist_km: the range of the fans (km). Profiles longer than the range
+        are computed with the standard method. Zero disables the mode.
+      num_azimuths: the number of radials of the fans.
+      radial_res_meter: the resolution along the radials (m).
+      cache_size: the maximum number of fans cached in memory.
+      min_paths: the minimum number of paths from a starting point in a
+        `TerrainProfiles` call for building its fan.
+    """
+    with self._fans_lock:
+      self._radial_fans.clear()
+      self._fans_max_dist_km = max_dist_km
+      self._fans_num_azimuths = num_azimuths
+      self._fans_radial_res_meter = radial_res_meter
+      self._fans_cache_size = max(cache_size, 1)
+      self._fans_min_paths = min_paths
+
+  def GetRadialFan(self, lat, lon, do_build=True):
+    """Returns the radial fan of a point in radial fan mode, or None.
+
+    Inputs:
+      lat, lon: the coordinates of the fan center (degrees).
+      do_build: if True (default), the fan is built if not already cached
+        (see `SetRadialFanMode`), otherwise only a cached fan is returned.
+    """
+    if self._fans_max_dist_km <= 0 or self.do_flat:
+      return None
+    key = (lat, lon)
+    with self._fans_lock:
+      fan = self._radial_fans.pop(key, None)
+      if fan is not None:
+        self._radial_fans[key] = fan
+        return fan
+    if not do_build:
+      return None
+    # Built outside of the lock, as reading the tiles uses the driver lock.
+    fan = TerrainRadialFan(self, lat, lon, self._fans_max_dist_km,
+                           self._fans_num_azimuths,
+                           self._fans_radial_res_meter)
+    with self._fans_lock:
+      self._radial_fans[key] = fan
+      while len(self._radial_fans) > self._fans_cache_size:
+        self._radial_fans.popitem(last=False)
+    return fan
+
+  def SetCacheMemoryLimit(self, max_bytes=None):
+    """Configures the maximum memory (in bytes) of the tile cache.
+
+    The tiles held in process memory are accounted for their size, while the
+    memory-mapped and shared memory tiles are not. The cache is then bounded
+    both by this memory limit and by the `cache_size` in number of tiles.
+
+    Inputs:
+      max_bytes (int): the memory limit, or None for no limit.
+    """
+    self._tile_cache.SetLimits(max_bytes=max_bytes)
+
+  @property
+  def cache_size(self):
+    """The maximum number of tiles in cache."""
+    return self._tile_cache.max_tiles
+
+  @cache_size.setter
+  def cache_size(self, cache_size):
+    self._tile_cache.SetLimits(cache_size, self._tile_cache.max_bytes)
+
+  @property
+  def _tile_lru(self):
+    """The keys of the cached tiles, from least to most recently used."""
+    return self._tile_cache.Keys()
+
+  def SetSharedTileStore(self, store=None):
+    """Configures a shared memory tile store.
+
+    Tiles found in the store are used directly instead of being read from disk.
+    See module |shared_tiles|.
+
+    Inputs:
+      store (|shared_tiles.SharedTileStore|): the store, or None to stop using
+        the currently configured store.
+    """
+    with self._lock:
+      if store is not self._shared_store:
+        self._tile_cache.Clear()
+        if self._shared_store is not None:
+          self._shared_store.Detach(self.TILE_TYPE)
+      self._shared_store = store
+
+  def ReadTile(self, ilat, ilon):
+    """Reads a given tile from the database, without using the cache.
+
+    Inputs:
+      ilat, ilon (int): integer coordinates of NW corner.
+
+    Returns:
+      the tile as a 2D array, or None if unmanaged tile.
+
+    Raises:
+      IOError: if an expected tile cannot be read
+    """
+    if (ilat, ilon) not in _TILES_KEYS:
+      return None
+
+    encoding = '%c%02d%c%03d' % (
+        'sn'[int(ilat >= 0)], abs(ilat),
+        'we'[int(ilon >= 0)], abs(ilon))
+    tile_name1 = 'usgs_ned_1_' + encoding + '_gridfloat_std.flt'
+    tile_name2 = 'float' + encoding + '_1_std.flt'
+    tile_name = (tile_name1
+                 if os.path.isfile(os.path.join(self._terrain_dir, tile_name1))
+                 else tile_name2)
+
+    tile_path = os.path.join(self._terrain_dir, tile_name)
+    try:
+      if self.use_mmap:
+        return np.memmap(tile_path, dtype=np.float32, mode='r',
+                         shape=(_TILE_DIM, _TILE_DIM))
+      return np.fromfile(
+          tile_path, dtype=np.float32).reshape(_TILE_DIM, _TILE_DIM)
+    except IOError:
+      raise IOError('NED Tile (%d,%d) not found.' % (ilat, ilon))
 
   def GetTile(self, ilat, ilon):
     """Returns a given tile as a 2D array, or None if unmanaged tile.
@@ -128,43 +438,157 @@ class TerrainDriver:
       IOError: if an expected tile cannot be read
     """
     key = (ilat, ilon)
+    if key not in _TILES_KEYS:
+      return None
+    # Cached tiles are read without locking.
+    tile = self._tile_cache.Get(key)
+    if tile is not None:
+      return tile
+    # Wait for the tile if being prefetched (by this process).
+    pending = self._prefetch_pending.get(key)
+    if pending is not None and self._prefetch_pid == os.getpid():
+      pending.wait()
 
     with self._lock:
-      # Manage the cases of mem-loaded or unmanaged tiles.
-      try:
-        tile = self._tile_cache[key]
-        self._CacheLruUpdate(key)
+      # The tile may have been loaded by another thread in the meantime.
+      tile = self._tile_cache.Get(key, count_stats=False)
+      if tile is not None:
         return tile
-      except KeyError:
-        if key not in _TILES_KEYS:
-          return None
-
-      # Load a tile in memory and manage the cache.
-      encoding = '%c%02d%c%03d' % (
-          'sn'[int(ilat >= 0)], abs(ilat),
-          'we'[int(ilon >= 0)], abs(ilon))
-      tile_name1 = 'usgs_ned_1_' + encoding + '_gridfloat_std.flt'
-      tile_name2 = 'float' + encoding + '_1_std.flt'
-      tile_name = (tile_name1
-                   if os.path.isfile(os.path.join(self._terrain_dir, tile_name1))
-                   else tile_name2)
+      tile, from_store = self._LoadTile(ilat, ilon)
+      self._PutTile(key, tile, from_store)
+
+      return tile
+
+  def _LoadTile(self, ilat, ilon):
+    """Gets a tile from the shared store, or loads it in memory.
+
+    Returns:
+      a tuple (tile, from_store), with `from_store` True if the tile comes from
+      the shared store.
+    """
+    if self._shared_store is not None:
+      tile = self._shared_store.GetTile(self.TILE_TYPE, ilat, ilon)
+      if tile is not None:
+        return tile, True
+    return self.ReadTile(ilat, ilon), False
+
+  def _PutTile(self, key, tile, from_store):
+    """Inserts a loaded tile in cache and accounts for it (under lock)."""
+    if from_store:
+      self.stats.UpdateForStoreHit()
+      nbytes = 0
+    else:
+      self.stats.UpdateForTileLoad(*key)
+      nbytes = 0 if self.use_mmap else tile.nbytes
+    self._tile_cache.Put(key, tile, nbytes)
+
+  def Prefetch(self, bounding_boxes):
+    """Loads in background the tiles covering some areas.
+
+    The tiles are read by a background thread and inserted in the cache, so that
+    their reading overlaps with the computation. A `GetTile()` of a tile being
+    prefetched waits for it, instead of reading it again.
+    Only the tiles of the first boxes, up to the cache size in number of tiles,
+    are prefetched, so that the prefetched tiles do not evict each other.
+    Errors while reading a tile are ignored, and raised on the actual access.
+
+    Note: the thread is specific to the process calling this routine. It is
+    stopped, after completion of the current prefetching, before any fork of
+    the process, and restarted on the next call.
+
+    Inputs:
+      bounding_boxes: a sequence of boxes (lat_min, lon_min, lat_max, lon_max),
+        in degrees.
+    """
+    if self.do_flat:
+      return
+    keys = []
+    for lat_min, lon_min, lat_max, lon_max in bounding_boxes:
+      for ilat in range(int(np.ceil(lat_min)), int(np.ceil(lat_max)) + 1):
+        for ilon in range(int(np.floor(lon_min)), int(np.floor(lon_max)) + 1):
+          key = (ilat, ilon)
+          if key in _TILES_KEYS and key not in keys:
+            keys.append(key)
+    keys = keys[:self.cache_size]
 
+    with self._lock:
+      if self._prefetch_pid != os.getpid():
+        # Starts the thread lazily, in the current process.
+        self._prefetch_queue = queue.Queue()
+        self._prefetch_pending = {}
+        self._prefetch_pid = os.getpid()
+        self._prefetch_thread = threading.Thread(target=self._PrefetchLoop,
+                                                 args=(self._prefetch_queue,))
+        self._prefetch_thread.daemon = True
+        self._prefetch_thread.start()
+        _prefetching_drivers.add(self)
+      for key in keys:
+        if key in self._tile_cache or key in self._prefetch_pending:
+          continue
+        self._prefetch_pending[key] = threading.Event()
+        self._prefetch_queue.put(key)
+
+  def PrefetchForPaths(self, lat1s, lon1s, lat2s, lon2s, margin_deg=0.02):
+    """Loads in background the tiles required by the profiles of some paths.
+
+    See `Prefetch()`. The paths are covered by the bounding box of their
+    end points, extended by a margin for the curvature of the geodesics.
+
+    Inputs:
+      lat1s, lon1s, lat2s, lon2s: the coordinates of the start and end points
+        of the paths (degrees), as scalars or sequences.
+      margin_deg: the margin around the paths (degrees).
+    """
+    lat1s, lon1s, lat2s, lon2s = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(v, dtype=float))
+          for v in (lat1s, lon1s, lat2s, lon2s)])
+    if not lat1s.size:
+      return
+    # The distinct ranges of tiles covering the paths.
+    tile_ranges = np.column_stack((
+        np.ceil(np.minimum(lat1s, lat2s) - margin_deg),
+        np.floor(np.minimum(lon1s, lon2s) - margin_deg),
+        np.ceil(np.maximum(lat1s, lat2s) + margin_deg),
+        np.floor(np.maximum(lon1s, lon2s) + margin_deg)))
+    _, idxs = np.unique(tile_ranges, axis=0, return_index=True)
+    self.Prefetch(tile_ranges[np.sort(idxs)])
+
+  def WaitPrefetch(self):
+    """Waits for the completion of the current prefetching."""
+    if self._prefetch_pid == os.getpid():
+      self._prefetch_queue.join()
+
+  def _StopPrefetch(self):
+    """Stops the prefetch thread of the current process, once idle."""
+    with self._lock:
+      if self._prefetch_pid != os.getpid():
+        return
+      prefetch_queue, thread = self._prefetch_queue, self._prefetch_thread
+      self._prefetch_pid = None
+      self._prefetch_thread = None
+      _prefetching_drivers.discard(self)
+    prefetch_queue.put(None)
+    thread.join()
+
+  def _PrefetchLoop(self, prefetch_queue):
+    """Loads the prefetched tiles in cache (background thread)."""
+    while True:
+      key = prefetch_queue.get()
+      if key is None:
+        prefetch_queue.task_done()
+        return
       try:
-        self._tile_cache[key] = np.fromfile(
-            os.path.join(self._terrain_dir, tile_name),
-            dtype=np.float32).reshape(_TILE_DIM, _TILE_DIM)
-      except IOError:
-        raise IOError('NED Tile (%d,%d) not found.' % (ilat, ilon))
-
-      # Check cache size and evict oldest
-      if len(self._tile_cache) > self.cache_size:
-        key_to_evict = min(self._tile_lru, key=self._tile_lru.get)
-        self._tile_cache.pop(key_to_evict)
-        self._tile_lru.pop(key_to_evict)
-      self._CacheLruUpdate(key)
-      self.stats.UpdateForTileLoad(ilat, ilon)
-
-      return self._tile_cache[key]
+        if key not in self._tile_cache:
+          # The tile is read without locking the cache.
+          tile, from_store = self._LoadTile(*key)
+          with self._lock:
+            if key not in self._tile_cache:
+              self._PutTile(key, tile, from_store)
+      except Exception as e:
+        logging.debug('Prefetch of NED tile %s failed: %s', key, e)
+      finally:
+        self._prefetch_pending.pop(key).set()
+        prefetch_queue.task_done()
 
   def GetTerrainElevation(self, lat, lon, do_interp=True):
     """Retrieves the elevation for one or several points.
@@ -297,11 +721,103 @@ class TerrainDriver:
       num_points = 2
 
     resolution = dist / float(num_points-1)
-    lats, lons = vincenty.GeodesicSampling(lat1, lon1, lat2, lon2, num_points)
     elev = [num_points-1, resolution]
+    lats, lons = vincenty.GeodesicSampling(lat1, lon1, lat2, lon2, num_points)
     elev.extend(self.GetTerrainElevation(lats, lons, do_interp))
     return elev
 
+  def TerrainProfiles(self, lat1s, lon1s, lat2s, lon2s,
+                      target_res_meter=-1,
+                      target_res_arcsec=1,
+                      do_interp=True,
+                      max_points=-1):
+    """Returns the terrain profiles between several pairs of points.
+
+    This is the batch version of `TerrainProfile`, where the geodesics of all the
+    paths are sampled in one vectorized operation, and the terrain elevation of
+    all the points is read with a single grouped tile lookup.
+
+    Inputs:
+      lat1s, lon1s: coordinates of starting points (in degrees).
+      lat2s, lon2s: coordinates of final points (in degrees).
+      target_res_meter: target resolution between points (in meters).
+        If unspecified, uses 'target_res_arcsec' instead.
+      target_res_arcsec: target resolution between 2 point (in arcsec).
+        Only used if 'target_res_meter' unspecified.
+      do_interp: if True (default), use bilinear interpolation on terrain data.
+      max_points: if positive, resolution extended if number of points is beyond
+                  this number.
+
+    Returns:
+      a tuple (profiles, num_points) of:
+        profiles: a 2D ndarray holding one elevation profile per row, in the ITS
+          format (see `TerrainProfile`). The rows are padded with zeros beyond
+          the path points, ie: profiles[k, :num_points[k]+2] is the ITS profile
+          of path k.
+        num_points: an int ndarray of the number of terrain points of each path.
+    """
+    lat1s = np.atleast_1d(np.asarray(lat1s, dtype=float))
+    lon1s = np.atleast_1d(np.asarray(lon1s, dtype=float))
+    lat2s = np.atleast_1d(np.asarray(lat2s, dtype=float))
+    lon2s = np.atleast_1d(np.asarray(lon2s, dtype=float))
+    if not len(lat1s):
+      return np.zeros((0, 2)), np.zeros(0, dtype=int)
+
+    if target_res_meter < 0:
+      target_res_meter = _RADIUS_EARTH_METERS * np.radians(target_res_arcsec/3600.)
+
+    # Distance between end points (m). It is computed exactly as in
+    # `TerrainProfile`, since it sets the number of points and resolution of the
+    # profile, on which ITM is discontinuous: the array version may differ by
+    # a few ULP, which can change ITM results by a hundredth of dB.
+    dists_km, bearings = np.array([
+        vincenty.GeodesicDistanceBearing(lat1, lon1, lat2, lon2)[:2]
+        for lat1, lon1, lat2, lon2 in zip(lat1s, lon1s, lat2s, lon2s)]).T
+    dists = dists_km * 1000.
+
+    num_points = np.ceil(dists/float(target_res_meter)) + 1
+    if max_points > 0:
+      num_points = np.minimum(num_points, max_points)
+    num_points = np.maximum(num_points, 2).astype(int)
+
+    resolutions = dists / (num_points - 1.)
+    path_idx = np.repeat(np.arange(len(num_points)), num_points)
+    starts = np.cumsum(num_points) - num_points
+    point_idx = np.arange(len(path_idx)) - starts[path_idx]
+
+    # In radial fan mode, interpolate the paths within range of their fan.
+    on_fan = np.zeros(len(num_points), dtype=bool)
+    elevs = np.zeros(len(path_idx))
+    if do_interp and self._fans_max_dist_km > 0 and not self.do_flat:
+      latlon1s = lat1s + 1j*lon1s
+      in_range = dists <= 1000. * self._fans_max_dist_km
+      keys, counts = np.unique(latlon1s[in_range], return_counts=True)
+      for key, count in zip(keys, counts):
+        fan = self.GetRadialFan(key.real, key.imag,
+                                do_build=(count >= self._fans_min_paths))
+        if fan is None:
+          continue
+        in_fan = (latlon1s == key) & in_range
+        on_fan |= in_fan
+        pts = in_fan[path_idx]
+        elevs[pts] = fan.GetElevations(
+            resolutions[path_idx[pts]] / 1000. * point_idx[pts],
+            bearings[path_idx[pts]])
+
+    if not np.all(on_fan):
+      off_fan = ~on_fan
+      lats, lons = vincenty.GeodesicSamplings(
+          lat1s[off_fan], lon1s[off_fan], lat2s[off_fan], lon2s[off_fan],
+          num_points[off_fan], dists_km[off_fan], bearings[off_fan])
+      elevs[off_fan[path_idx]] = self.GetTerrainElevation(lats, lons, do_interp)
+
+    # Scatter into the padded profile array.
+    profiles = np.zeros((len(num_points), np.max(num_points) + 2))
+    profiles[:, 0] = num_points - 1
+    profiles[:, 1] = resolutions
+    profiles[path_idx, point_idx + 2] = elevs
+    return profiles, num_points
+
   def ComputeNormalizedHaat(self, lat, lon):
     """Computes normalized HAAT (Height Above Average Terrain).
 
@@ -20,9 +20,11 @@ import logging
 import numpy as np
 import unittest
 import shutil
+import tempfile
 
 from reference_models.tools import testutils
 from reference_models.geo import terrain
+from reference_models.geo import vincenty
 
 
 TEST_DIR = os.path.join(os.path.dirname(__file__),'testdata', 'ned')
@@ -152,5 +154,194 @@ class TestTerrain(unittest.TestCase):
     self.assertEqual(haat, 0.0)
     self.assertEqual(h0, 0.0)
 
+
+class TestTerrainSyntheticTile(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # Synthetic tile, so that the test does not depend on the real NED data.
+    cls.tile_dir = tempfile.mkdtemp()
+    np.random.seed(12345)
+    tile = np.random.uniform(-10, 1000, (terrain._TILE_DIM, terrain._TILE_DIM))
+    tile.astype(np.float32).tofile(
+        os.path.join(cls.tile_dir, 'floatn38w123_1_std.flt'))
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tile_dir)
+
+  def test_mmap_same_as_inmemory(self):
+    lats = 37 + np.arange(0.005, 0.99, 0.01)
+    lons = -122.99 + np.arange(0.005, 0.99, 0.01)
+    driver = terrain.TerrainDriver(self.tile_dir)
+    mmap_driver = terrain.TerrainDriver(self.tile_dir, use_mmap=True)
+    for do_interp in [False, True]:
+      elev = driver.GetTerrainElevation(lats, lons, do_interp)
+      mmap_elev = mmap_driver.GetTerrainElevation(lats, lons, do_interp)
+      self.assertEqual(np.max(np.abs(elev - mmap_elev)), 0)
+    self.assertIsInstance(mmap_driver.GetTile(38, -123), np.memmap)
+    self.assertFalse(mmap_driver.GetTile(38, -123).flags.writeable)
+
+  def test_cache_stats_and_memory_limit(self):
+    driver = terrain.TerrainDriver(self.tile_dir)
+    driver.SetCacheMemoryLimit(1000)
+    driver.GetTerrainElevation([37.5, 37.6], [-122.5, -122.6])
+    # The last tile is kept even if larger than the memory limit.
+    self.assertEqual(len(driver._tile_cache), 1)
+    self.assertEqual(driver._tile_cache.nbytes, terrain._TILE_DIM**2 * 4)
+    driver.GetTerrainElevation(37.5, -122.5)
+    self.assertEqual((driver.stats.hits, driver.stats.misses), (1, 1))
+    self.assertEqual(driver.stats.tiles_stats[(38, -123)], 1)
+    # Memory-mapped tiles are not accounted in the memory limit.
+    driver.SetMemoryMapMode(True)
+    driver.GetTerrainElevation(37.5, -122.5)
+    self.assertEqual(driver._tile_cache.nbytes, 0)
+    driver.cache_size = 0
+    self.assertEqual(driver.cache_size, 1)
+
+  def test_prefetch(self):
+    driver = terrain.TerrainDriver(self.tile_dir)
+    # Paths within the synthetic tile, and toward a missing tile.
+    driver.PrefetchForPaths([37.5, 37.6, 37.9], [-122.5, -122.6, -122.5],
+                            37.4, [-122.3, -122.4, -123.2])
+    driver.WaitPrefetch()
+    self.assertListEqual(driver._tile_lru, [(38, -123)])
+    self.assertEqual(driver.stats.tiles_stats[(38, -123)], 1)
+    self.assertEqual(driver.stats.misses, 0)
+    driver.GetTerrainElevation(37.5, -122.5)
+    self.assertEqual(driver.stats.hits, 1)
+    # The error of the missing tile is raised on actual access.
+    with self.assertRaises(IOError):
+      driver.GetTile(38, -124)
+    # No prefetch beyond the cache size.
+    driver.SetCacheSize(1)
+    driver.Prefetch([(37.5, -123.5, 37.6, -122.5)])
+    driver.WaitPrefetch()
+    self.assertListEqual(driver._tile_lru, [(38, -123)])
+
+  @unittest.skipUnless(hasattr(os, 'register_at_fork'), 'requires fork hooks')
+  def test_prefetch_stopped_before_fork(self):
+    driver = terrain.TerrainDriver(self.tile_dir)
+    driver.Prefetch([(37.5, -122.5, 37.6, -122.4)])
+    thread = driver._prefetch_thread
+    self.assertTrue(thread.is_alive())
+    pid = os.fork()
+    if pid == 0:
+      # The child can access the tiles without deadlocking on the cache lock.
+      os._exit(0 if driver.GetTile(38, -123) is not None else 1)
+    _, status = os.waitpid(pid, 0)
+    self.assertEqual(status, 0)
+    self.assertFalse(thread.is_alive())
+    self.assertListEqual(driver._tile_lru, [(38, -123)])
+    self.assertEqual(driver.stats.tiles_stats[(38, -123)], 1)
+    # The thread is restarted on next prefetch.
+    driver.Prefetch([(37.5, -123.5, 37.6, -123.4)])
+    self.assertTrue(driver._prefetch_thread.is_alive())
+    driver.WaitPrefetch()
+
+  def test_mmap_mode_switch(self):
+    driver = terrain.TerrainDriver(self.tile_dir)
+    self.assertNotIsInstance(driver.GetTile(38, -123), np.memmap)
+    driver.SetMemoryMapMode(True)
+    self.assertEqual(len(driver._tile_cache), 0)
+    self.assertIsInstance(driver.GetTile(38, -123), np.memmap)
+
+  def test_mmap_missing_tile(self):
+    driver = terrain.TerrainDriver(self.tile_dir, use_mmap=True)
+    with self.assertRaises(IOError):
+      driver.GetTile(37, -122)
+
+  def test_profiles(self):
+    driver = terrain.TerrainDriver(self.tile_dir)
+    np.random.seed(1234)
+    lat1s = np.random.uniform(37.1, 37.9, 30)
+    lon1s = np.random.uniform(-122.9, -122.1, 30)
+    lat2s = lat1s + np.random.uniform(-0.1, 0.1, 30)
+    lon2s = lon1s + np.random.uniform(-0.1, 0.1, 30)
+    lat2s[3], lon2s[3] = lat1s[3], lon1s[3]
+    for max_points in [-1, 500]:
+      profiles, num_points = driver.TerrainProfiles(
+          lat1s, lon1s, lat2s, lon2s, target_res_meter=30, max_points=max_points)
+      self.assertEqual(profiles.shape, (30, np.max(num_points) + 2))
+      for k in range(30):
+        exp_profile = driver.TerrainProfile(
+            lat1s[k], lon1s[k], lat2s[k], lon2s[k],
+            target_res_meter=30, max_points=max_points)
+        self.assertEqual(len(exp_profile), num_points[k] + 2)
+        self.assertEqual(profiles[k, 0], exp_profile[0])
+        self.assertEqual(profiles[k, 1], exp_profile[1])
+        self.assertTrue(np.allclose(profiles[k, 2:num_points[k]+2],
+                                    exp_profile[2:], rtol=0, atol=1e-6))
+        self.assertTrue(np.all(profiles[k, num_points[k]+2:] == 0))
+
+  def test_radial_fan_grid(self):
+    driver = terrain.TerrainDriver(self.tile_dir)
+    fan = terrain.TerrainRadialFan(driver, 37.5, -122.5, 10,
+                                   num_azimuths=360, radial_res_meter=100)
+    self.assertEqual(fan.elevs.dtype, np.float32)
+    self.assertEqual(fan.elevs.shape, (360, 101))
+    # On the grid points, the fan elevations are the terrain elevations.
+    for azimuth in [0, 17, 359]:
+      dists = np.arange(101) * fan.radial_res_km
+      lats, lons, _ = vincenty.GeodesicPoints(37.5, -122.5, dists, azimuth)
+      lats[0], lons[0] = 37.5, -122.5
+      exp_elevs = driver.GetTerrainElevation(lats, lons)
+      self.assertLess(np.max(np.abs(
+          fan.GetElevations(dists, azimuth) - exp_elevs)), 1e-3)
+      self.assertLess(np.max(np.abs(
+          fan.GetElevations(dists, azimuth + 360) - exp_elevs)), 1e-3)
+
+  def test_radial_fan_profiles(self):
+    # Smooth synthetic terrain, for checking the interpolated profiles.
+    tile_dir = tempfile.mkdtemp()
+    y, x = np.mgrid[0:terrain._TILE_DIM, 0:terrain._TILE_DIM]
+    tile = 500 + 300 * np.sin(x / 200.) * np.cos(y / 150.)
+    tile.astype(np.float32).tofile(
+        os.path.join(tile_dir, 'floatn38w123_1_std.flt'))
+    try:
+      driver = terrain.TerrainDriver(tile_dir)
+      fan_driver = terrain.TerrainDriver(tile_dir)
+      fan_driver.SetRadialFanMode(max_dist_km=20, cache_size=2, min_paths=5)
+      np.random.seed(1234)
+      lat1s = np.repeat([37.5, 37.6], 10)
+      lon1s = np.repeat([-122.5, -122.4], 10)
+      lat2s = lat1s + np.random.uniform(-0.2, 0.2, 20)
+      lon2s = lon1s + np.random.uniform(-0.2, 0.2, 20)
+      profiles, num_points = fan_driver.TerrainProfiles(
+          lat1s, lon1s, lat2s, lon2s, target_res_meter=30, max_points=1501)
+      for k in range(20):
+        exp_profile = driver.TerrainProfile(
+            lat1s[k], lon1s[k], lat2s[k], lon2s[k],
+            target_res_meter=30, max_points=1501)
+        self.assertEqual(num_points[k], exp_profile[0] + 1)
+        self.assertEqual(profiles[k, 1], exp_profile[1])
+        self.assertLess(np.max(np.abs(profiles[k, 2:num_points[k]+2] -
+                                      exp_profile[2:])), 0.5)
+        # The single profiles never use the cached fans.
+        self.assertEqual(
+            fan_driver.TerrainProfile(lat1s[k], lon1s[k], lat2s[k], lon2s[k],
+                                      target_res_meter=30, max_points=1501),
+            exp_profile)
+      self.assertEqual(len(fan_driver._radial_fans), 2)
+      self.assertIs(fan_driver.GetRadialFan(37.5, -122.5),
+                    fan_driver.GetRadialFan(37.5, -122.5))
+      fan_driver.GetRadialFan(37.7, -122.5)
+      self.assertEqual(len(fan_driver._radial_fans), 2)
+      # Fans are not built for a few paths per starting point.
+      fan_driver.SetRadialFanMode(max_dist_km=20, cache_size=2, min_paths=11)
+      fan_driver.TerrainProfiles(
+          lat1s, lon1s, lat2s, lon2s, target_res_meter=30, max_points=1501)
+      fan_driver.TerrainProfile(37.5, -122.5, 37.6, -122.6)
+      self.assertEqual(len(fan_driver._radial_fans), 0)
+      # Paths beyond the fan range use the standard profile.
+      self.assertEqual(
+          fan_driver.TerrainProfile(37.5, -122.5, 37.7, -122.9,
+                                    target_res_meter=30),
+          driver.TerrainProfile(37.5, -122.5, 37.7, -122.9,
+                                target_res_meter=30))
+    finally:
+      shutil.rmtree(tile_dir)
+
+
 if __name__ == '__main__':
   unittest.main()
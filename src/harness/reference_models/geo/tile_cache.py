@@ -0,0 +1,147 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+
+"""LRU cache of NED/NLCD tiles, shared by the terrain and NLCD drivers.
+
+The cache is bounded both in number of tiles and in memory (bytes), evicting
+the least recently used tiles first. All operations are O(1).
+
+Typical usage (within a driver):
+  cache = tile_cache.TileCache(max_tiles=8, max_bytes=None,
+                               stats=tiles.TileStats('ned'))
+  tile = cache.Get(key)
+  if tile is None:
+    with cache.lock:
+      tile = cache.Get(key, count_stats=False)
+      if tile is None:
+        tile = ... read the tile ...
+        cache.Put(key, tile, tile.nbytes)
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import OrderedDict
+import threading
+
+
+class TileCache(object):
+  """LRU cache of tiles, bounded in number of tiles and in bytes.
+
+  Reads (`Get`) do not take the lock: they rely on the atomicity of the
+  `OrderedDict` single operations. The lock shall be held by the caller for
+  loading and inserting a missing tile, so that a tile is loaded only once.
+
+  Attributes:
+    max_tiles (int): the maximum number of tiles.
+    max_bytes (int): the maximum memory of the tiles, or None if unbounded.
+    nbytes (int): the current memory of the cached tiles.
+    lock (|threading.RLock|): the lock protecting the tile insertions.
+    stats (|tiles.TileStats|): an optional tile statistic counter.
+  """
+
+  def __init__(self, max_tiles=8, max_bytes=None, stats=None):
+    self._tiles = OrderedDict()
+    self._tile_nbytes = {}
+    self.nbytes = 0
+    self.lock = threading.RLock()
+    self.stats = stats
+    self.max_tiles = 1
+    self.max_bytes = None
+    self.SetLimits(max_tiles, max_bytes)
+
+  def __len__(self):
+    return len(self._tiles)
+
+  def __contains__(self, key):
+    return key in self._tiles
+
+  def Keys(self):
+    """Returns the keys of the cached tiles, from least to most recently used."""
+    return list(self._tiles)
+
+  def SetLimits(self, max_tiles=None, max_bytes=None):
+    """Configures the cache limits, evicting tiles if required.
+
+    Inputs:
+      max_tiles (int): the maximum number of tiles (at least 1), or None to
+        keep the current limit.
+      max_bytes (int): the maximum memory of the tiles, or None if unbounded.
+        The most recently used tile is always kept, even if larger.
+    """
+    with self.lock:
+      if max_tiles is not None:
+        self.max_tiles = max(int(max_tiles), 1)
+      self.max_bytes = max_bytes
+      self._Evict()
+
+  def Get(self, key, count_stats=True):
+    """Returns a cached tile and marks it as most recently used.
+
+    Inputs:
+      key: the tile key.
+      count_stats (bool): if True, counts the hit or miss in the statistics.
+
+    Returns:
+      the tile, or None if not in cache.
+    """
+    tile = self._tiles.get(key)
+    if tile is not None:
+      try:
+        self._tiles.move_to_end(key)
+      except KeyError:
+        # Evicted concurrently: the tile is still valid for this read.
+        pass
+    if count_stats and self.stats is not None:
+      if tile is None:
+        self.stats.UpdateForTileMiss()
+      else:
+        self.stats.UpdateForTileHit()
+    return tile
+
+  def Put(self, key, tile, nbytes=0):
+    """Inserts a tile as the most recently used, evicting LRU tiles if needed.
+
+    Shall be called with the `lock` held.
+
+    Inputs:
+      key: the tile key.
+      tile: the tile data (not None).
+      nbytes (int): the memory accounted for the tile. For example 0 for tiles
+        not held in process memory (memory-mapped or shared memory tiles).
+    """
+    if key in self._tiles:
+      self.nbytes -= self._tile_nbytes[key]
+    self._tiles[key] = tile
+    self._tiles.move_to_end(key)
+    self._tile_nbytes[key] = nbytes
+    self.nbytes += nbytes
+    self._Evict()
+
+  def Clear(self):
+    """Removes all the tiles from the cache."""
+    with self.lock:
+      self._tiles.clear()
+      self._tile_nbytes.clear()
+      self.nbytes = 0
+
+  def _Evict(self):
+    """Evicts the LRU tiles until within the limits."""
+    while len(self._tiles) > 1 and (
+        len(self._tiles) > self.max_tiles or
+        (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+      key, _ = self._tiles.popitem(last=False)
+      self.nbytes -= self._tile_nbytes.pop(key)
+      if self.stats is not None:
+        self.stats.UpdateForTileEviction()
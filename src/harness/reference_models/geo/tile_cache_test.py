@@ -0,0 +1,73 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import unittest
+
+import numpy as np
+
+from reference_models.geo import tile_cache
+from reference_models.geo import tiles
+
+
+class TestTileCache(unittest.TestCase):
+
+  def setUp(self):
+    self.stats = tiles.TileStats('ned')
+    self.cache = tile_cache.TileCache(max_tiles=3, stats=self.stats)
+
+  def _put(self, key, nbytes=0):
+    with self.cache.lock:
+      self.cache.Put(key, np.zeros(1), nbytes)
+
+  def test_lru_eviction(self):
+    for key in [(1, 1), (1, 2), (1, 3)]:
+      self._put(key)
+    self.assertIsNotNone(self.cache.Get((1, 1)))
+    self._put((1, 4))
+    self.assertListEqual(self.cache.Keys(), [(1, 3), (1, 1), (1, 4)])
+    self.assertIsNone(self.cache.Get((1, 2)))
+    self.assertEqual(len(self.cache), 3)
+    self.assertEqual((self.stats.hits, self.stats.misses, self.stats.evictions),
+                     (1, 1, 1))
+    self.assertEqual(self.stats.HitRate(), 0.5)
+    self.cache.SetLimits(max_tiles=1)
+    self.assertListEqual(self.cache.Keys(), [(1, 4)])
+    self.assertEqual(self.stats.evictions, 3)
+    self.stats.Reset()
+    self.assertEqual((self.stats.hits, self.stats.misses, self.stats.evictions),
+                     (0, 0, 0))
+
+  def test_memory_limit(self):
+    self.cache.SetLimits(max_tiles=10, max_bytes=250)
+    self._put((1, 1), 100)
+    self._put((1, 2), 0)
+    self._put((1, 3), 100)
+    self.assertEqual(self.cache.nbytes, 200)
+    self._put((1, 4), 100)
+    self.assertListEqual(self.cache.Keys(), [(1, 2), (1, 3), (1, 4)])
+    self.assertEqual(self.cache.nbytes, 200)
+    # The most recent tile is kept even if above the limit.
+    self._put((1, 5), 1000)
+    self.assertListEqual(self.cache.Keys(), [(1, 5)])
+    self.assertEqual(self.cache.nbytes, 1000)
+    self.cache.Clear()
+    self.assertEqual(len(self.cache), 0)
+    self.assertEqual(self.cache.nbytes, 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
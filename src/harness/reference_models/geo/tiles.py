@@ -29,6 +29,12 @@ import numpy as np
 
 class TileStats(object):
   """Tile access statistics & analysis.
+
+  Attributes:
+    tiles_stats: a dict of the number of loads per tile.
+    hits, misses, evictions: the tile cache counters (see |tile_cache.TileCache|).
+    store_hits: the number of tiles obtained from the shared tile store instead
+      of being loaded from disk (see |shared_tiles.SharedTileStore|).
   """
   def __init__(self, type='ned'):
     """Initializes the tile accessor for type 'ned' or 'nlcd'."""
@@ -40,6 +46,23 @@ class TileStats(object):
       return
     self.tiles_stats[(ilat, ilon)] += 1
 
+  def UpdateForTileHit(self):
+    self.hits += 1
+
+  def UpdateForTileMiss(self):
+    self.misses += 1
+
+  def UpdateForTileEviction(self):
+    self.evictions += 1
+
+  def UpdateForStoreHit(self):
+    self.store_hits += 1
+
+  def HitRate(self):
+    """Returns the tile cache hit rate (or 0 if no access)."""
+    num_accesses = self.hits + self.misses
+    return float(self.hits) / num_accesses if num_accesses else 0.
+
   def ActiveTilesCount(self):
     counts = [cnt for cnt in self.tiles_stats.values() if cnt > 0]
     num_active_tiles = len(counts)
@@ -47,6 +70,10 @@ class TileStats(object):
 
   def Reset(self):
     self.tiles_stats = {tile: 0 for tile in self._tiles_set}
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.store_hits = 0
 
   def Report(self):
     num_active_tiles, counts = self.ActiveTilesCount()
@@ -58,6 +85,12 @@ class TileStats(object):
         avg=np.mean(counts), std=np.std(counts)))
     print("  Min:{min} Max:{max}".format(
         min=np.min(counts), max=np.max(counts)))
+    print("Cache: {hits} hits, {misses} misses, {evictions} evictions "
+          "(hit rate: {rate:.3f})".format(
+              hits=self.hits, misses=self.misses, evictions=self.evictions,
+              rate=self.HitRate()))
+    print("Shared store: {store_hits} tile hits".format(
+        store_hits=self.store_hits))
 
 
 NED_TILES = frozenset([
@@ -97,6 +97,31 @@ class ClimateIndexer:
 
     return climate
 
+  def TropoClims(self, lats, lons):
+    """Returns ITU climate zones for a set of points.
+
+    This is the vectorized version of `TropoClim`, giving identical results.
+
+    Inputs:
+      lats, lons: the coordinates of the points, as ndarray.
+
+    Returns:
+      the climate codes of the points, as an int ndarray.
+    """
+    if self._data is None:
+      self._data = np.loadtxt(self.datafile, dtype=int)
+      logging.info('Loaded climate data from %s' % self.datafile)
+
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    irows = ((self._lat_start - lats)/self._delta_lat + 0.5).astype(int)
+    icols = ((lons - self._lon_start)/self._delta_lon + 0.5).astype(int)
+
+    climates = self._data[irows, icols]
+    climates[climates == 0] = 7
+
+    return climates
+
 _ZONE_NAMES = [
     'Unknown',
     'Equatorial',
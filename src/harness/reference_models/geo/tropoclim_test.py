@@ -54,5 +54,14 @@ class TestTropoclim(unittest.TestCase):
     r0 = self.climDriver.TropoClim(-30, -20)
     self.assertEqual(r0, 7)
 
+  def test_vectorized(self):
+    np.random.seed(12345)
+    lats = np.random.uniform(-89.5, 89.5, 500)
+    lons = np.random.uniform(-179.5, 179.5, 500)
+    climates = self.climDriver.TropoClims(lats, lons)
+    self.assertListEqual(
+        list(climates),
+        [self.climDriver.TropoClim(lat, lon) for lat, lon in zip(lats, lons)])
+
 if __name__ == '__main__':
   unittest.main()
@@ -215,59 +215,202 @@ def InsureFeatureCollection(geometry, as_dict=False):
   return geometry if as_dict else json.dumps(geometry)
 
 
-def GridPolygon(poly, res_arcsec):
+# The tolerance (in degrees) for including the grid points falling on the border
+# of a polygon, ie roughly 1mm.
+_GRID_BORDER_TOLERANCE_DEG = 1e-8
+
+
+def _PolygonRings(poly):
+  """Returns the list of rings (as Nx2 ndarray) of a polygonal geometry."""
+  if isinstance(poly, sgeo.Polygon):
+    return ([np.asarray(poly.exterior.coords)] +
+            [np.asarray(ring.coords) for ring in poly.interiors])
+  rings = []
+  for geom in poly.geoms:
+    if isinstance(geom, (sgeo.Polygon, sgeo.MultiPolygon,
+                         sgeo.GeometryCollection)):
+      rings.extend(_PolygonRings(geom))
+  return rings
+
+
+def _GridPolygonRows(poly, res, max_points):
+  """Grids a polygon by scanline rasterization, yielding chunks of rows.
+
+  The grid points of each row are found from the crossings of the row with the
+  polygon edges (with the even-odd rule), while the points within
+  `_GRID_BORDER_TOLERANCE_DEG` of an edge (in euclidean distance) are also
+  included, as with the polygon buffered by that tolerance.
+
+  Args:
+    poly: A shapely Polygon or MultiPolygon.
+    res: The resolution (in degrees) of the grid.
+    max_points: The maximum number of grid nodes covered by a chunk of rows.
+
+  Yields:
+    The grid points of successive chunks of rows, as Nx2 ndarray of (lon, lat),
+    in increasing latitude then longitude order.
+  """
+  bounds = poly.bounds
+  lng_min = np.floor(bounds[0] / res) * res
+  lat_min = np.floor(bounds[1] / res) * res
+  lng_max = np.ceil(bounds[2] / res) * res + res/2
+  lat_max = np.ceil(bounds[3] / res) * res + res/2
+  # Same as the np.mgrid[lng_min:lng_max:res, lat_min:lat_max:res] nodes, but
+  # without the floating point accumulation errors.
+  lngs = lng_min + np.arange(np.floor((lng_max - lng_min) / res) + 1) * res
+  lats = lat_min + np.arange(np.floor((lat_max - lat_min) / res) + 1) * res
+
+  tol = _GRID_BORDER_TOLERANCE_DEG
+  rings = _PolygonRings(poly)
+  xa = np.concatenate([ring[:-1, 0] for ring in rings])
+  ya = np.concatenate([ring[:-1, 1] for ring in rings])
+  xb = np.concatenate([ring[1:, 0] for ring in rings])
+  yb = np.concatenate([ring[1:, 1] for ring in rings])
+  # The range of rows within the tolerance band of each edge.
+  edge_row_start = np.searchsorted(lats, np.minimum(ya, yb) - tol, 'left')
+  edge_row_end = np.searchsorted(lats, np.maximum(ya, yb) + tol, 'right')
+
+  rows_per_chunk = max(1, int(max_points // len(lngs)))
+  for chunk_start in range(0, len(lats), rows_per_chunk):
+    chunk_end = min(chunk_start + rows_per_chunk, len(lats))
+    row_start = np.maximum(edge_row_start, chunk_start)
+    row_end = np.minimum(edge_row_end, chunk_end)
+    edges = np.flatnonzero(row_end > row_start)
+    if not len(edges):
+      continue
+    # All the (edge, row) pairs in the chunk.
+    counts = row_end[edges] - row_start[edges]
+    pair_edges = np.repeat(edges, counts)
+    pair_rows = (np.repeat(row_start[edges] - np.cumsum(counts) + counts, counts)
+                 + np.arange(np.sum(counts)))
+    y = lats[pair_rows]
+    x1, y1, x2, y2 = (xa[pair_edges], ya[pair_edges],
+                      xb[pair_edges], yb[pair_edges])
+
+    # Interior: spans between successive crossings of a row.
+    is_crossing = (y1 <= y) != (y2 <= y)
+    cross_rows = pair_rows[is_crossing]
+    cx1, cy1, cx2, cy2 = (x1[is_crossing], y1[is_crossing],
+                          x2[is_crossing], y2[is_crossing])
+    cross_x = cx1 + (y[is_crossing] - cy1) * (cx2 - cx1) / (cy2 - cy1)
+    order = np.lexsort((cross_x, cross_rows))
+    cross_rows, cross_x = cross_rows[order], cross_x[order]
+    span_rows = cross_rows[0::2]
+    span_lo, span_hi = cross_x[0::2], cross_x[1::2]
+
+    # Marks the grid nodes of the interior spans with a cumulative count.
+    rows = span_rows - chunk_start
+    coverage = np.zeros((chunk_end - chunk_start, len(lngs) + 1), dtype=np.int32)
+    np.add.at(coverage, (rows, np.searchsorted(lngs, span_lo, 'left')), 1)
+    np.add.at(coverage, (rows, np.searchsorted(lngs, span_hi, 'right')), -1)
+    covered = np.cumsum(coverage[:, :-1], axis=1) > 0
+
+    # Border: the candidate nodes are the ones within the bounds of the part of
+    # each edge in the tolerance band of the row, and are kept if within the
+    # tolerance distance of the edge.
+    dx = x2 - x1
+    dy = y2 - y1
+    with np.errstate(divide='ignore', invalid='ignore'):
+      ta = np.where(dy == 0, 0, (y - tol - y1) / dy)
+      tb = np.where(dy == 0, 1, (y + tol - y1) / dy)
+    t0 = np.clip(np.minimum(ta, tb), 0, 1)
+    t1 = np.clip(np.maximum(ta, tb), 0, 1)
+    bx0 = x1 + t0 * dx
+    bx1 = x1 + t1 * dx
+    cols_lo = np.searchsorted(lngs, np.minimum(bx0, bx1) - tol, 'left')
+    cols_hi = np.searchsorted(lngs, np.maximum(bx0, bx1) + tol, 'right')
+    counts = cols_hi - cols_lo
+    cand = np.repeat(np.arange(len(pair_rows)), counts)
+    cand_cols = (np.repeat(cols_lo - np.cumsum(counts) + counts, counts)
+                 + np.arange(np.sum(counts)))
+    px = lngs[cand_cols] - x1[cand]
+    py = y[cand] - y1[cand]
+    cdx, cdy = dx[cand], dy[cand]
+    length2 = cdx**2 + cdy**2
+    with np.errstate(divide='ignore', invalid='ignore'):
+      t = np.where(length2 == 0, 0, (px * cdx + py * cdy) / length2)
+    t = np.clip(t, 0, 1)
+    is_border = (px - t * cdx)**2 + (py - t * cdy)**2 <= tol**2
+    covered[pair_rows[cand[is_border]] - chunk_start,
+            cand_cols[is_border]] = True
+
+    row_idxs, col_idxs = np.nonzero(covered)
+    if len(row_idxs):
+      yield np.column_stack((lngs[col_idxs], lats[row_idxs + chunk_start]))
+
+
+def _IsLargelyDisjoint(poly):
+  """Returns True for a MultiPolygon covering a small part of its bounds."""
+  bounds = poly.bounds
+  bound_area = (bounds[2] - bounds[0]) * (bounds[3] - bounds[1])
+  return isinstance(poly, sgeo.MultiPolygon) and poly.area < bound_area * 0.01
+
+
+def GridPolygonChunks(poly, res_arcsec, max_points=1000000):
+  """Grids a polygon or multi-polygon, yielding the grid points by chunks.
+
+  Same as `GridPolygon`, but the grid points are generated by chunks of
+  successive rows (of same latitude), so that large areas can be processed
+  without holding all their grid points in memory. The points are yielded row
+  by row, in increasing latitude then longitude order (and polygon by polygon
+  for largely disjoint multi-polygons, in which case a point on the border of
+  two polygons may be yielded twice).
+
+  Args:
+    poly: A Polygon or MultiPolygon in WGS84 or NAD83, defined either as a
+      shapely, GeoJSON (dict or str) or generic  geometry.
+      A generic geometry is any object implementing the __geo_interface__ protocol.
+    res_arcsec: The resolution (in arcsec) used for regular gridding.
+    max_points: The maximum number of grid nodes covered by a chunk, ie the
+      chunk size is about `max_points` times the polygon area over its bounds.
+
+  Yields:
+    The grid points of the chunks, as Nx2 ndarray of (lon, lat).
+  """
+  poly = ToShapely(poly)
+  if not poly:
+    return
+  res = res_arcsec / 3600.
+  # For largely disjoint polygons, we process per polygon to avoid scanning
+  # the empty space between them.
+  polys = poly.geoms if _IsLargelyDisjoint(poly) else [poly]
+  for p in polys:
+    for points in _GridPolygonRows(p, res, max_points):
+      yield points
+
+
+def GridPolygon(poly, res_arcsec, as_array=False):
   """Grids a polygon or multi-polygon.
 
   This performs regular gridding of a polygon in PlateCarree (equirectangular)
   projection (ie with fixed step in degrees in lat/lon space).
   Points falling in the boundary of polygon will be included.
+  The grid points are obtained by scanline rasterization of the polygon (see
+  `GridPolygonChunks` for a chunked version).
 
   Args:
     poly: A Polygon or MultiPolygon in WGS84 or NAD83, defined either as a
       shapely, GeoJSON (dict or str) or generic  geometry.
       A generic geometry is any object implementing the __geo_interface__ protocol.
     res_arcsec: The resolution (in arcsec) used for regular gridding.
+    as_array: If True, returns the points as a Nx2 ndarray of (lon, lat).
 
   Returns:
-    A list of (lon, lat) defining the grid points.
+    A list of (lon, lat) defining the grid points, in increasing longitude then
+    latitude order.
   """
-  poly = ToShapely(poly)
-  bound_area = (poly.bounds[2] - poly.bounds[0]) * (poly.bounds[3] - poly.bounds[1])
-  if not poly:
-    return []
-  if isinstance(poly, sgeo.MultiPolygon) and poly.area < bound_area * 0.01:
-    # For largely disjoint polygons, we process per polygon
-    # to avoid inefficiencies if polygons largely disjoint.
-    pts = ops.unary_union(
-        [sgeo.asMultiPoint(GridPolygon(p, res_arcsec))
-         for p in poly])
-    return [(p.x, p.y) for p in pts]
-
-  res = res_arcsec / 3600.
-  bounds = poly.bounds
-  lng_min = np.floor(bounds[0] / res) * res
-  lat_min = np.floor(bounds[1] / res) * res
-  lng_max = np.ceil(bounds[2] / res) * res + res/2
-  lat_max = np.ceil(bounds[3] / res) * res + res/2
-  # The mesh creation is conceptually equivalent to
-  #mesh_lng, mesh_lat = np.mgrid[lng_min:lng_max:res,
-  #                              lat_min:lat_max:res]
-  # but without the floating point accumulation errors
-  mesh_lng, mesh_lat = np.meshgrid(
-      np.arange(np.floor((lng_max - lng_min) / res) + 1),
-      np.arange(np.floor((lat_max - lat_min) / res) + 1),
-      indexing='ij')
-  mesh_lng = lng_min + mesh_lng * res
-  mesh_lat = lat_min + mesh_lat * res
-  points = np.vstack((mesh_lng.ravel(), mesh_lat.ravel())).T
-  # Performs slight buffering by 1mm to include border points in case they fall
-  # exactly on a multiple of 1 arcsec.
-  pts = poly.buffer(1e-8).intersection(sgeo.asMultiPoint(points))
-  if not pts:
-    return []
-  if isinstance(pts, sgeo.Point):
-    return [(pts.x, pts.y)]
-  return [(p.x, p.y) for p in pts]
+  chunks = list(GridPolygonChunks(poly, res_arcsec))
+  if not chunks:
+    points = np.zeros((0, 2))
+  else:
+    points = np.concatenate(chunks)
+    if len(chunks) > 1 and _IsLargelyDisjoint(ToShapely(poly)):
+      points = np.unique(points, axis=0)
+    else:
+      points = points[np.lexsort((points[:, 1], points[:, 0]))]
+  if as_array:
+    return points
+  return [(lng, lat) for lng, lat in points.tolist()]
 
 
 def _RingArea(latitudes, longitudes):
@@ -27,6 +27,26 @@ from reference_models.geo import utils
 
 TEST_DIR = os.path.join(os.path.dirname(__file__),'testdata', 'json')
 
+
+def _GridByIntersection(poly, res_arcsec):
+  # Straightforward gridding: intersection of all the grid nodes of the
+  # bounding box with the slightly buffered polygon.
+  res = res_arcsec / 3600.
+  bounds = poly.bounds
+  lng_min = np.floor(bounds[0] / res) * res
+  lat_min = np.floor(bounds[1] / res) * res
+  lng_max = np.ceil(bounds[2] / res) * res + res/2
+  lat_max = np.ceil(bounds[3] / res) * res + res/2
+  mesh_lng, mesh_lat = np.meshgrid(
+      lng_min + np.arange(np.floor((lng_max - lng_min) / res) + 1) * res,
+      lat_min + np.arange(np.floor((lat_max - lat_min) / res) + 1) * res,
+      indexing='ij')
+  points = sgeo.MultiPoint(
+      list(zip(mesh_lng.ravel(), mesh_lat.ravel())))
+  pts = poly.buffer(1e-8).intersection(points)
+  return sorted((p.x, p.y) for p in getattr(pts, 'geoms', [pts]))
+
+
 class TestUtils(unittest.TestCase):
 
   def test_area_simple_square(self):
@@ -160,6 +180,55 @@ class TestUtils(unittest.TestCase):
     pts = utils.GridPolygon(ops.unary_union(shape_geo), res_arcsec=1800)
     self.assertSetEqual(set(pts), exp_pts)
 
+  def test_grid_same_as_points_intersection(self):
+    polys = [
+        sgeo.Point(-100, 35).buffer(0.2).difference(
+            sgeo.Point(-100.05, 35.02).buffer(0.1)),
+        sgeo.Polygon([(-100, 35), (-99.9, 35), (-99.95, 35.1)]),
+        sgeo.Polygon([(-108.05, 42.25), (-107.90, 42.25),
+                      (-107.90, 42.20), (-108.05, 42.20)])]
+    for poly in polys:
+      for res_arcsec in [10., 60.]:
+        self.assertListEqual(utils.GridPolygon(poly, res_arcsec),
+                             _GridByIntersection(poly, res_arcsec))
+
+  def test_grid_same_as_points_intersection_random(self):
+    # Random polygons with vertices on or near the grid nodes, so that many
+    # nodes fall within or around the border tolerance.
+    np.random.seed(1234)
+    res_arcsec = 10.
+    res = res_arcsec / 3600.
+    for _ in range(50):
+      num_vertices = np.random.randint(3, 12)
+      angles = np.sort(np.random.uniform(0, 2 * np.pi, num_vertices))
+      radius = np.random.randint(2, 20, num_vertices) * res
+      lngs = np.round((-99.9 + radius * np.cos(angles)) / res) * res
+      lats = np.round((30.4 + radius * np.sin(angles)) / res) * res
+      jitter = np.random.choice([0, 1], (num_vertices, 2)) * np.random.uniform(
+          -2e-8, 2e-8, (num_vertices, 2))
+      poly = sgeo.Polygon(np.column_stack((lngs, lats)) + jitter).buffer(0)
+      self.assertListEqual(utils.GridPolygon(poly, res_arcsec),
+                           _GridByIntersection(poly, res_arcsec))
+
+  def test_grid_chunks_and_array(self):
+    poly = sgeo.Point(-100, 35).buffer(0.2).difference(
+        sgeo.Point(-100.05, 35.02).buffer(0.1))
+    pts = utils.GridPolygon(poly, res_arcsec=10.)
+    pts_array = utils.GridPolygon(poly, res_arcsec=10., as_array=True)
+    self.assertEqual(pts_array.shape, (len(pts), 2))
+    self.assertListEqual([tuple(pt) for pt in pts_array], pts)
+    chunks = list(utils.GridPolygonChunks(poly, res_arcsec=10.,
+                                          max_points=5000))
+    self.assertGreater(len(chunks), 3)
+    # Chunks are made of full rows, in increasing latitude.
+    for chunk, next_chunk in zip(chunks[:-1], chunks[1:]):
+      self.assertLess(np.max(chunk[:, 1]), np.min(next_chunk[:, 1]))
+    self.assertSetEqual(set(tuple(pt) for pt in np.concatenate(chunks)),
+                        set(pts))
+    self.assertEqual(utils.GridPolygon(sgeo.Polygon(), 10.), [])
+    self.assertEqual(utils.GridPolygon(sgeo.Polygon(), 10.,
+                                       as_array=True).shape, (0, 2))
+
   def test_polygons_equal(self):
     poly_ref = sgeo.Point(0,0).buffer(1)
 
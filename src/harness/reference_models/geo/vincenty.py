@@ -19,11 +19,21 @@ Typical usage:
   # Get distance and bearing between 2 points on the earth
   dist_km, bearing, rev_bearing = GeodesicDistanceBearing(lat1, lon1, lat2, lon2)
 
+  # Get distances and bearings between many pairs of points
+  dists_km, bearings, rev_bearings = GeodesicDistanceBearingArrays(
+      lat1s, lon1s, lat2s, lon2s)
+
   # Get location of a all points at given bearing, at one or multiple distances
   lat2, lon2 = GeodesicPoints(lat1, lon1, dist_km, bearing)
 
+  # Get location of many points, each with its own origin, distance and bearing
+  lat2s, lon2s, _ = GeodesicPointsArrays(lat1s, lon1s, dists_km, bearings)
+
   # Get N equidistant points along the geodesic between 2 locations
   points = GeodesicSampling(lat, lon1, lat2, lon2, N)
+
+  # Get equidistant points along the geodesics between many pairs of locations
+  lats, lons = GeodesicSamplings(lat1s, lon1s, lat2s, lon2s, num_points)
 """
 from __future__ import absolute_import
 from __future__ import division
@@ -123,6 +133,115 @@ def GeodesicDistanceBearing(lat1, lon1, lat2, lon2, accuracy=1.0E-12):
   return s, alpha1, alpha2
 
 
+def GeodesicDistanceBearingArrays(lat1, lon1, lat2, lon2, accuracy=1.0E-12):
+  """Calculates distances and bearings between several pairs of points.
+
+  Vectorized version of `GeodesicDistanceBearing`, where the inputs are arrays
+  (or scalars broadcastable to a common shape) with one value per pair of points.
+  The iteration is done until convergence of every pair, updating only the pairs
+  not yet converged. The results are equal to the scalar version up to floating
+  point rounding (the numpy and `math` transcendental routines may differ by
+  1 ULP).
+
+  Inputs:
+    lat1, lon1: the initial points coodinates (in degrees)
+    lat2, lon2: the final points coodinates (in degrees)
+    accuracy: accuracy for the vincenty convergence (optional)
+
+  Returns:
+    a tuple of ndarray of distances (km), initial bearings (deg), and back
+    bearings (deg).
+  """
+  lat1, lon1, lat2, lon2 = np.broadcast_arrays(
+      *[np.asarray(v, dtype=float) for v in (lat1, lon1, lat2, lon2)])
+  shape = lat1.shape
+  lat1, lon1, lat2, lon2 = [v.ravel() for v in (lat1, lon1, lat2, lon2)]
+
+  a = 6378.1370        # semi-major axis (km), WGS84
+  f = 1./298.257223563 # flattening of the ellipsoid, WGS84
+  b = (1-f)*a          # semi-minor axis
+
+  phi1 = np.radians(lat1)
+  L1   = np.radians(lon1)
+  phi2 = np.radians(lat2)
+  L2   = np.radians(lon2)
+
+  U1 = np.arctan((1-f)*np.tan(phi1))
+  U2 = np.arctan((1-f)*np.tan(phi2))
+  sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+  sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+  L = L2 - L1
+
+  num_pairs = len(L)
+  lmbda = L.copy()
+  lastlmbda = np.zeros(num_pairs)
+  sin_sigma = np.zeros(num_pairs)
+  cos_sigma = np.ones(num_pairs)
+  sigma = np.zeros(num_pairs)
+  cossq_alpha = np.ones(num_pairs)
+  cos2sigma_m = np.zeros(num_pairs)
+
+  # Same points are excluded from the iteration.
+  is_same = (lat1 == lat2) & (lon1 == lon2)
+  idxs = np.where(~is_same)[0]
+  while len(idxs):
+    # Using iteration on partial subset for equivalence with scalar version
+    lastlmbda[idxs] = lmbda[idxs]
+    sin_lmbda = np.sin(lmbda[idxs])
+    cos_lmbda = np.cos(lmbda[idxs])
+    s_U1, c_U1 = sin_U1[idxs], cos_U1[idxs]
+    s_U2, c_U2 = sin_U2[idxs], cos_U2[idxs]
+
+    sin_sigma[idxs] = np.sqrt(np.square(c_U2*sin_lmbda) +
+                              np.square(c_U1*s_U2 - s_U1*c_U2*cos_lmbda))
+    cos_sigma[idxs] = s_U1*s_U2 + c_U1*c_U2*cos_lmbda
+    sigma[idxs] = np.arctan2(sin_sigma[idxs], cos_sigma[idxs])
+
+    sin_alpha = (c_U1*c_U2*sin_lmbda)/np.sin(sigma[idxs])
+    cossq_alpha[idxs] = 1 - np.square(sin_alpha)
+
+    cos2sigma_m[idxs] = np.cos(sigma[idxs]) - (2.*s_U1*s_U2/cossq_alpha[idxs])
+
+    C = (f/16.)*cossq_alpha[idxs]*(4. + f*(4. - 3.*cossq_alpha[idxs]))
+
+    lmbda[idxs] = (L[idxs] + (1. - C)*f*sin_alpha
+                   *(sigma[idxs] + C*sin_sigma[idxs]
+                     * (cos2sigma_m[idxs] + C*cos_sigma[idxs]
+                        * (-1. + 2.*np.square(cos2sigma_m[idxs])))))
+    idxs = idxs[np.abs(lmbda[idxs] - lastlmbda[idxs]) > accuracy]
+
+  usq = cossq_alpha*(a**2.0 - b**2.0)/b**2.0
+  A = 1 + (usq/16384.)*(4096. + usq*(-768. + usq*(320. - 175.*usq)))
+  B = (usq/1024.)*(256. + usq*(-128. + usq*(74. - 47.*usq)))
+  sin_sigma = np.sin(sigma)
+  dsigma = (B*sin_sigma
+            * (cos2sigma_m + 0.25*B
+               * (np.cos(sigma)*(-1. + 2.*np.square(cos2sigma_m))
+                  - (1./6.)*B*cos2sigma_m*(-3. + 4.*np.square(sin_sigma))
+                  * (-3. + 4.*np.square(cos2sigma_m)))))
+
+  s = b*A*(sigma-dsigma)
+
+  sin_lmbda = np.sin(lmbda)
+  cos_lmbda = np.cos(lmbda)
+  alpha1 = np.arctan2(cos_U2*sin_lmbda,
+                      (cos_U1*sin_U2 - sin_U1*cos_U2*cos_lmbda))
+  alpha2 = np.arctan2(cos_U1*sin_lmbda,
+                      (-sin_U1*cos_U2 + cos_U1*sin_U2*cos_lmbda))
+  alpha2 = np.where(alpha2 < pi, alpha2 + pi, alpha2 - pi)
+
+  alpha1 = (alpha1 + 2.*pi) % (2.*pi)
+  alpha2 = (alpha2 + 2.*pi) % (2.*pi)
+
+  alpha1 = np.degrees(alpha1)
+  alpha2 = np.degrees(alpha2)
+
+  s[is_same] = 0.
+  alpha1[is_same] = 0.
+  alpha2[is_same] = 0.
+  return s.reshape(shape), alpha1.reshape(shape), alpha2.reshape(shape)
+
+
 def GeodesicPoint(lat, lon, dist_km, bearing, accuracy=1.0E-12):
   """Computes the coordinates from a point towards a bearing at given distance.
 
@@ -336,3 +455,177 @@ def GeodesicSampling(lat1, lon1, lat2, lon2, num_points):
   lats[0], lons[0] = lat1, lon1
   lats[-1], lons[-1] = lat2, lon2
   return lats, lons
+
+
+def GeodesicPointsArrays(lat, lon, dist_km, bearing, accuracy=1.0E-12):
+  """Computes the coordinates from points towards bearings at given distances.
+
+  Fully vectorized version of `GeodesicPoint`, where all the inputs are 1D
+  ndarray of same size (one value per target point). The results are equal to
+  the scalar version up to floating point rounding.
+
+  Inputs:
+    lat,lon: the initial points coordinates (in degrees),
+    dist_km: the distances of the target points (in km)
+    bearing: the bearing angles (in degrees)
+    accuracy: accuracy for the vincenty convergence (optional)
+
+  Returns:
+    a tuple of ndarray of the points latitude, longitude and reverse bearing,
+    all in degrees.
+  """
+  lat = np.atleast_1d(np.asarray(lat, dtype=float))
+  return _GeodesicPointsArrays(lat, lon, bearing, dist_km, np.arange(len(lat)),
+                               accuracy)
+
+
+def _GeodesicPointsArrays(lat, lon, bearing, dist_km, path_idx,
+                          accuracy=1.0E-12):
+  """Computes the coordinates of points along several geodesics.
+
+  Vectorized version of `GeodesicPoints` over several geodesics, each one
+  defined by its initial point and bearing. The terms per geodesic are computed
+  once, and then indexed for each of its target points.
+
+  Inputs:
+    lat, lon: the initial points coordinates of the geodesics (in degrees),
+    bearing: the bearing angles of the geodesics (in degrees)
+    dist_km: the distances of the target points (in km)
+    path_idx: the index of the geodesic of each target point.
+    accuracy: accuracy for the vincenty convergence (optional)
+
+  Returns:
+    a tuple of ndarray of the target points latitude, longitude and reverse
+    bearing, all in degrees.
+  """
+  a = 6378.1370        # semi-major axis (km), WGS84
+  f = 1./298.257223563 # flattening of the ellipsoid, WGS84
+  b = (1-f)*a          # semi-minor axis
+
+  # Terms per geodesic.
+  phi1 = np.radians(lat)
+  L1   = np.radians(lon)
+  alpha1 = np.radians(bearing)
+
+  U1 = np.arctan((1-f)*np.tan(phi1))
+  sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+  sin_alpha1, cos_alpha1 = np.sin(alpha1), np.cos(alpha1)
+
+  sigma1 = np.arctan2(np.tan(U1), cos_alpha1)
+
+  sinalpha = cos_U1*sin_alpha1
+  sqsinalpha = np.square(sinalpha)
+  cossq_alpha = (1. - sqsinalpha)
+  usq = cossq_alpha*(a**2.0-b**2.0)/b**2.0
+
+  A = 1 + usq/16384. * (4096. + usq*(-768 + usq*(320.-175.*usq)))
+  B = usq/1024.*(256. + usq*(-128. + usq*(74.-47.*usq)))
+  C = (f/16.) * cossq_alpha * (4. + f * (4. - 3.*cossq_alpha))
+
+  # Terms per target point.
+  (L1, sin_U1, cos_U1, sin_alpha1, cos_alpha1, sigma1,
+   sinalpha, sqsinalpha, A, B, C) = [
+       v[path_idx] for v in (L1, sin_U1, cos_U1, sin_alpha1, cos_alpha1, sigma1,
+                             sinalpha, sqsinalpha, A, B, C)]
+  s = np.asarray(dist_km, dtype=float)
+
+  s_bA = s/(b*A)
+  sigma = s_bA.copy()
+  twosigmam = np.zeros(len(s))
+  # Iteration on the subset of points not yet converged, for equivalence with
+  # the scalar version. The terms of this subset are kept in compact arrays.
+  idxs = np.arange(len(s))
+  sigma_i, sigma1_i, B_i, s_bA_i = sigma, sigma1, B, s_bA
+  while len(idxs):
+    twosigmam_i = 2.*sigma1_i + sigma_i
+    cos_twosigmam = np.cos(twosigmam_i)
+    sin_sigma = np.sin(sigma_i)
+    cos_sigma = np.cos(sigma_i)
+    dsigma = (B_i * sin_sigma
+              *(cos_twosigmam + 0.25*B_i
+                *(cos_sigma
+                  *(-1. + 2. * np.square(cos_twosigmam))
+                  - (1./6.) * B_i * cos_twosigmam
+                  * (-3. + 4. * np.square(sin_sigma))
+                  * (-3. + 4. * np.square(cos_twosigmam)))))
+    next_sigma_i = s_bA_i + dsigma
+    active = np.abs(next_sigma_i - sigma_i) > accuracy
+    twosigmam[idxs] = twosigmam_i
+    sigma[idxs] = next_sigma_i
+    idxs = idxs[active]
+    sigma_i, sigma1_i, B_i, s_bA_i = (
+        next_sigma_i[active], sigma1_i[active], B_i[active], s_bA_i[active])
+
+  cos_sigma = np.cos(sigma)
+  sin_sigma = np.sin(sigma)
+  cos_twosigmam = np.cos(twosigmam)
+
+  num = sin_U1 * cos_sigma + cos_U1 * sin_sigma * cos_alpha1
+  den = ((1.-f) * np.sqrt(
+      sqsinalpha +
+      np.square(sin_U1 * sin_sigma - cos_U1 * cos_sigma * cos_alpha1)))
+  phi2 = np.arctan2(num, den)
+
+  num = sin_sigma * sin_alpha1
+  den = cos_U1 * cos_sigma - sin_U1 * sin_sigma * cos_alpha1
+  lmbda = np.arctan2(num, den)
+
+  L = (lmbda - (1. - C) * f * sinalpha
+       * (sigma + C * sin_sigma
+          * (cos_twosigmam + C * cos_sigma
+             * (-1. + 2. * np.square(cos_twosigmam)))))
+  L2 = L + L1
+
+  num = sinalpha
+  den = -sin_U1 * sin_sigma + cos_U1 * cos_sigma * cos_alpha1
+  alpha2 = np.arctan2(num, den)
+  alpha2 = (alpha2 + 3.*pi) % (2.*pi)
+
+  return np.degrees(phi2), np.degrees(L2), np.degrees(alpha2)
+
+
+def GeodesicSamplings(lat1s, lon1s, lat2s, lon2s, num_points,
+                      dists_km=None, bearings=None):
+  """Returns several geodesics between pairs of points, as equally spaced points.
+
+  This is the multi-path version of `GeodesicSampling`, where the points of all
+  geodesics are computed in a single vectorized operation. The results are
+  equal to `GeodesicSampling` up to floating point rounding.
+
+  Inputs:
+    lat1s, lon1s : the initial points coordinates (sequence or ndarray).
+    lat2s, lon2s : the final points coordinates (sequence or ndarray).
+    num_points : number of points to use for each geodesic (must be >=2), as
+      a scalar or a sequence with one value per geodesic.
+    dists_km, bearings: the distances (km) and bearings (degrees) of the
+      geodesics, as obtained by `GeodesicDistanceBearingArrays`. If not
+      specified, they are computed.
+
+  Returns:
+    A tuple (lats, longs) of ndarray defining the points of all geodesics,
+    concatenated in the input order. The points of geodesic k are at indices
+    `sum(num_points[:k]) + [0..num_points[k]-1]`. The two input locations of
+    each geodesic are its first and last points.
+  """
+  lat1s = np.atleast_1d(np.asarray(lat1s, dtype=float))
+  lon1s = np.atleast_1d(np.asarray(lon1s, dtype=float))
+  lat2s = np.atleast_1d(np.asarray(lat2s, dtype=float))
+  lon2s = np.atleast_1d(np.asarray(lon2s, dtype=float))
+  num_paths = len(lat1s)
+  num_points = np.broadcast_to(np.asarray(num_points, dtype=int), (num_paths,))
+
+  if dists_km is None or bearings is None:
+    dists_km, bearings, _ = GeodesicDistanceBearingArrays(lat1s, lon1s,
+                                                          lat2s, lon2s)
+
+  # Flatten all the points of all geodesics.
+  path_idx = np.repeat(np.arange(num_paths), num_points)
+  ends = np.cumsum(num_points)
+  starts = ends - num_points
+  point_idx = np.arange(len(path_idx)) - starts[path_idx]
+  step_km = np.asarray(dists_km) / (num_points - 1.)
+  lats, lons, _ = _GeodesicPointsArrays(lat1s, lon1s, bearings,
+                                        step_km[path_idx] * point_idx, path_idx)
+  lats[starts], lons[starts] = lat1s, lon1s
+  lats[ends-1], lons[ends-1] = lat2s, lon2s
+  return lats, lons
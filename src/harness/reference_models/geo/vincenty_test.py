@@ -124,5 +124,72 @@ class TestVincenty(unittest.TestCase):
     self.assertAlmostEqual(np.max(lat_diffs), -0.02, 5)
     self.assertAlmostEqual(np.min(lat_diffs), -0.02, 5)
 
+  def test_distance_bearing_arrays(self):
+    random.seed(69)
+    lat1s = [random.uniform(-70, 70) for _ in range(200)]
+    lon1s = [random.uniform(-170, 170) for _ in range(200)]
+    lat2s = [lat + random.uniform(-10, 10) for lat in lat1s]
+    lon2s = [lon + random.uniform(-10, 10) for lon in lon1s]
+    # Include degenerate and very short paths.
+    lat2s[5], lon2s[5] = lat1s[5], lon1s[5]
+    lat2s[6], lon2s[6] = lat1s[6] + 1e-9, lon1s[6]
+
+    dists, bearings, rev_bearings = vincenty.GeodesicDistanceBearingArrays(
+        lat1s, lon1s, lat2s, lon2s)
+    self.assertEqual(dists.shape, (200,))
+    for k in range(200):
+      exp_dist, exp_bearing, exp_rev_bearing = vincenty.GeodesicDistanceBearing(
+          lat1s[k], lon1s[k], lat2s[k], lon2s[k])
+      self.assertAlmostEqual(dists[k], exp_dist, 9)
+      self.assertAlmostEqual(bearings[k], exp_bearing, 7)
+      self.assertAlmostEqual(rev_bearings[k], exp_rev_bearing, 7)
+    self.assertEqual(dists[5], 0)
+
+    # Broadcasting of a single point.
+    dists, _, _ = vincenty.GeodesicDistanceBearingArrays(
+        lat1s[0], lon1s[0], np.array(lat2s[:3]), np.array(lon2s[:3]))
+    for k in range(3):
+      self.assertAlmostEqual(dists[k], vincenty.GeodesicDistanceBearing(
+          lat1s[0], lon1s[0], lat2s[k], lon2s[k])[0], 9)
+    dists, _, _ = vincenty.GeodesicDistanceBearingArrays(37, -122, [], [])
+    self.assertEqual(dists.shape, (0,))
+
+  def test_points_arrays(self):
+    random.seed(69)
+    lats = [random.uniform(-70, 70) for _ in range(100)]
+    lons = [random.uniform(-170, 170) for _ in range(100)]
+    dists = [random.uniform(0, 300) for _ in range(100)]
+    bearings = [random.uniform(0, 360) for _ in range(100)]
+    res = vincenty.GeodesicPointsArrays(np.array(lats), np.array(lons),
+                                        np.array(dists), np.array(bearings))
+    for k in range(100):
+      exp_res = vincenty.GeodesicPoint(lats[k], lons[k], dists[k], bearings[k])
+      for v, exp_v in zip(res, exp_res):
+        self.assertAlmostEqual(v[k], exp_v, 9)
+
+  def test_samplings(self):
+    random.seed(69)
+    lat1s = [random.uniform(-70, 70) for _ in range(20)]
+    lon1s = [random.uniform(-170, 170) for _ in range(20)]
+    lat2s = [lat + random.uniform(-1, 1) for lat in lat1s]
+    lon2s = [lon + random.uniform(-1, 1) for lon in lon1s]
+    num_points = [random.randint(2, 300) for _ in range(20)]
+    # Include a degenerate path.
+    lat2s[5], lon2s[5] = lat1s[5], lon1s[5]
+
+    lats, lons = vincenty.GeodesicSamplings(lat1s, lon1s, lat2s, lon2s,
+                                            num_points)
+    self.assertEqual(len(lats), sum(num_points))
+    start = 0
+    for k in range(20):
+      exp_lats, exp_lons = vincenty.GeodesicSampling(
+          lat1s[k], lon1s[k], lat2s[k], lon2s[k], num_points[k])
+      end = start + num_points[k]
+      self.assertTrue(np.allclose(lats[start:end], exp_lats, rtol=0, atol=1e-11))
+      self.assertTrue(np.allclose(lons[start:end], exp_lons, rtol=0, atol=1e-11))
+      self.assertEqual(lats[start], lat1s[k])
+      self.assertEqual(lons[end-1], lon2s[k])
+      start = end
+
 if __name__ == '__main__':
   unittest.main()
@@ -27,6 +27,7 @@
     performIapForPpa
     performIapForFssCochannel
     performIapForFssBlocking
+    performIapOnPoints
     calculatePostIapAggregateInterference
 
   The routines return a nested dictionary containing in the format of
@@ -42,7 +43,11 @@ from __future__ import print_function
 
 from collections import namedtuple
 from functools import partial
+import itertools
 import logging
+import os
+import pickle
+import tempfile
 
 import numpy as np
 from six.moves import zip
@@ -50,6 +55,8 @@ from six.moves import zip
 from reference_models.common import cache
 from reference_models.common import data
 from reference_models.common import mpool
+from reference_models.geo import drive
+from reference_models.geo import spatial_index
 from reference_models.geo import utils
 from reference_models.interference import interference as interf
 from reference_models.propagation import wf_hybrid
@@ -96,16 +103,30 @@ THRESH_ESC_DBM_PER_IAPBW = (THRESH_ESC_DBM_PER_RBW +
 GWPZ_GRID_RES_ARCSEC = 2
 PPA_GRID_RES_ARCSEC = 2
 
+# The grants, and their spatial index, used by `performIapOnPoints` in each
+# process, keyed by the id of the calculation. The grants are loaded, and their
+# spatial index built, once per process and calculation, instead of for every
+# protection point.
+_iap_call_ids = itertools.count()
+_iap_call_id = None
+_iap_grants = None
+_iap_grant_index = None
+
 
 def iapPointConstraint(protection_point, channels, low_freq, high_freq,
                        grants, fss_info, esc_antenna_info,
-                       region_type, threshold, protection_ent_type):
+                       region_type, threshold, protection_ent_type,
+                       grant_index=None):
   """Computes aggregate interference(Ap and ASASp) from authorized grants.
 
   This routine is applicable for FSS Co-Channel and ESC Sensor protection points,
   and PPA/GWPZ protection areas. It calculates aggregate interference over all
   5MHz channels, and feeds post-IAP assessment of allowed interference margins.
 
+  The interference of each grant over each channel is linear in its EIRP, so
+  its other terms are computed only once. The fair-share rounds then operate
+  on (grants x channels) matrices.
+
   Args:
     protection_point: A protection point as a tuple (longitude, latitude).
     channels: The 5MHz channels as a list of (low_freq, high_freq) tuples.
@@ -117,6 +138,7 @@ def iapPointConstraint(protection_point, channels, low_freq, high_freq,
     region_type: Region type of the protection point: 'URBAN', 'SUBURBAN' or 'RURAL'.
     threshold: The protection threshold (mW).
     protection_ent_type: The entity type (|data.ProtectedEntityType|).
+    grant_index: An optional |spatial_index.SpatialIndex| of the `grants` list.
 
   Returns:
     A tuple (latitude, longitude, asas_interference, agg_interference) where:
@@ -130,7 +152,7 @@ def iapPointConstraint(protection_point, channels, low_freq, high_freq,
 
   # Get all the grants inside neighborhood of the protection entity
   grants_inside = interf.findGrantsInsideNeighborhood(
-      grants, protection_point, protection_ent_type)
+      grants, protection_point, protection_ent_type, grant_index)
 
   # Get all the grants inside neighborhood of the protection entity, and
   # with frequency overlap to the protection point.
@@ -138,145 +160,259 @@ def iapPointConstraint(protection_point, channels, low_freq, high_freq,
       grants_inside,
       protection_constraint)
 
+  neighbor_grants = list(neighbor_grants)
   if not neighbor_grants:
     return (protection_point[1], protection_point[0],
             [0] * len(channels), [0] * len(channels))
 
-  # Get number of grants, IAP protection threshold and fairshare per channel.
-  num_unsatisfied_grants = len(neighbor_grants)
+  # Load in background the terrain tiles of the upcoming propagation paths.
+  drive.terrain_driver.PrefetchForPaths(
+      [grant.latitude for grant in neighbor_grants],
+      [grant.longitude for grant in neighbor_grants],
+      protection_point[1], protection_point[0])
 
-  # Initialize list of aggregate interference from all the grants
-  # (including grants from managing and peer SAS )
-  aggr_interf = [0] * len(channels)
-  # Initialize list of aggregate interference from managing SAS grants.
-  asas_interf = [0] * len(channels)
+  # Overlap of each grant with each channel, as a (grants x channels) matrix.
+  overlaps = np.array([[interf.grantFrequencyOverlapCheck(
+      grant, channel[0], channel[1], protection_ent_type)
+                        for channel in channels]
+                       for grant in neighbor_grants])
+
+  # The interference is linear in the grant EIRP: its other terms are computed
+  # only once per grant and channel, as (grants x channels) matrices.
+  with cache.CacheManager(wf_hybrid.CalcHybridPropagationLoss):
+    # Using memoizing cache manager only for lengthy calculation (hybrid on PPA/GWPZ).
+    terms = _computeInterferenceTermsMatrix(
+        neighbor_grants, channels, overlaps, protection_point, fss_info,
+        esc_antenna_info, region_type, protection_ent_type)
+  ant_gains = np.array([grant.antenna_gain for grant in neighbor_grants],
+                       dtype=float)
+  is_managed = np.array([grant.is_managed_grant for grant in neighbor_grants],
+                        dtype=bool)
 
-  # Algorithm to calculate interference within IAPBW using EIRP obtained for all
-  # the grants through application of IAP
-  num_unsatisfied_grants_channels = []
-  iap_threshold_channels = []
-  fairshare_channels = []
+  # List of grants initialized with max EIRP
+  grants_eirp = np.array([grant.max_eirp for grant in neighbor_grants],
+                         dtype=float)
+
+  # Grants overlapping none of the channels would never be satisfied: they
+  # are discarded from the start.
+  grants_satisfied = ~np.any(overlaps, axis=1)
+
+  # Per channel: number of unsatisfied grants, remaining IAP threshold and
+  # fair share of interference.
+  num_unsatisfied_grants_channels = np.sum(overlaps, axis=0)
+  iap_threshold_channels = np.full(len(channels), float(threshold))
+  fairshare_channels = np.zeros(len(channels))
+  has_unsatisfied = num_unsatisfied_grants_channels > 0
+  fairshare_channels[has_unsatisfied] = (
+      iap_threshold_channels[has_unsatisfied] /
+      num_unsatisfied_grants_channels[has_unsatisfied])
+
+  # Aggregate interference from all the grants (including grants from managing
+  # and peer SAS), and from managing SAS grants.
+  aggr_interf = np.zeros(len(channels))
+  asas_interf = np.zeros(len(channels))
+
+  while not np.all(grants_satisfied):
+    unsatisfied_idxs = np.nonzero(~grants_satisfied)[0]
+    unsatisfied_overlaps = overlaps[unsatisfied_idxs]
+
+    # Compute interference that the unsatisfied grants cause to protection
+    # point over each channel.
+    interference = np.zeros(unsatisfied_overlaps.shape)
+    interference[unsatisfied_overlaps] = _dbToLinearPerElement(
+        interf.getInterferenceFromTerms(
+            grants_eirp[unsatisfied_idxs, np.newaxis],
+            ant_gains[unsatisfied_idxs, np.newaxis],
+            interf.InterferenceTerms(
+                terms.effective_ant_gain[unsatisfied_idxs],
+                terms.bandwidth_db[unsatisfied_idxs],
+                tuple(loss[unsatisfied_idxs] for loss in terms.losses)))[
+                    unsatisfied_overlaps])
+
+    # A grant is satisfied if its interference is less than the fair share
+    # over all the channels it overlaps.
+    is_satisfied = np.all(
+        (interference < fairshare_channels) | ~unsatisfied_overlaps, axis=1)
+    if not np.any(is_satisfied):
+      # Reduce power level of all the unsatisfied grants
+      grants_eirp[unsatisfied_idxs] -= 1
+      continue
+
+    # Remove the satisfied grants from future consideration, and update the
+    # channels remaining thresholds and fair shares. The interference of the
+    # grants is accumulated sequentially in the grant order with a cumulative
+    # sum, so that all results are exactly the ones of the reference loop.
+    grants_satisfied[unsatisfied_idxs[is_satisfied]] = True
+    satisfied_interference = interference[is_satisfied]
+    satisfied_overlaps = unsatisfied_overlaps[is_satisfied]
+    iap_threshold_channels = np.cumsum(
+        np.vstack((iap_threshold_channels, -satisfied_interference)), axis=0)[-1]
+    aggr_interf = np.cumsum(
+        np.vstack((aggr_interf, satisfied_interference)), axis=0)[-1]
+    asas_interf = np.cumsum(
+        np.vstack((asas_interf, satisfied_interference[
+            is_managed[unsatisfied_idxs[is_satisfied]]])), axis=0)[-1]
+    num_unsatisfied_grants_channels -= np.sum(satisfied_overlaps, axis=0)
+    # Re-calculate fairshare for the modified channels
+    modified = (np.any(satisfied_overlaps, axis=0) &
+                (num_unsatisfied_grants_channels > 0))
+    fairshare_channels[modified] = (iap_threshold_channels[modified] /
+                                    num_unsatisfied_grants_channels[modified])
+
+  asas_interf = list(asas_interf)
+  aggr_interf = list(aggr_interf)
+  logging.debug('IAP point_constraint @ point %s: %s',
+                (protection_point[1], protection_point[0]),
+                list(zip(asas_interf, aggr_interf)))
 
-  for index, channel in enumerate(channels):
+  # Return the computed data
+  return protection_point[1], protection_point[0], asas_interf, aggr_interf
+
+
+def _computeInterferenceTermsMatrix(grants, channels, overlaps,
+                                    protection_point, fss_info,
+                                    esc_antenna_info, region_type,
+                                    protection_ent_type):
+  """Computes the interference terms of grants over channels.
+
+  Args:
+    grants: A list of |data.CbsdGrantInfo| grants.
+    channels: The 5MHz channels as a list of (low_freq, high_freq) tuples.
+    overlaps: A (grants x channels) boolean ndarray of the grant overlaps with
+      the channels. The terms are only computed for overlapping grants.
+    Others: see `iapPointConstraint`.
+
+  Returns:
+    The |interference.InterferenceTerms| whose fields are (grants x channels)
+    ndarrays (set to 0 for non overlapping grants).
+  """
+  effective_ant_gain = np.zeros(overlaps.shape)
+  bandwidth_db = np.zeros(overlaps.shape)
+  losses = None
+  for g_idx, ch_idx in zip(*np.nonzero(overlaps)):
+    channel = channels[ch_idx]
     # Get protection constraint over 5MHz channel range
     channel_constraint = data.ProtectionConstraint(
         latitude=protection_point[1], longitude=protection_point[0],
         low_frequency=channel[0], high_frequency=channel[1],
         entity_type=protection_ent_type)
+    terms = interf.computeInterferenceTerms(
+        grants[g_idx], channel_constraint, fss_info, esc_antenna_info,
+        region_type)
+    if losses is None:
+      losses = np.zeros((len(terms.losses),) + overlaps.shape)
+    effective_ant_gain[g_idx, ch_idx] = terms.effective_ant_gain
+    bandwidth_db[g_idx, ch_idx] = terms.bandwidth_db
+    losses[:, g_idx, ch_idx] = terms.losses
+  if losses is None:
+    losses = np.zeros((0,) + overlaps.shape)
+  return interf.InterferenceTerms(effective_ant_gain, bandwidth_db,
+                                  tuple(losses))
+
+
+def _dbToLinearPerElement(x):
+  """Converts a ndarray of dBm to mW, element by element.
+
+  The power function of numpy on arrays may differ in the last bit from its
+  scalar version (because of SIMD implementations). Converting per element
+  keeps the IAP decisions and results exactly identical to the ones obtained
+  with the scalar `interference.dbToLinear`.
+  """
+  return np.array([interf.dbToLinear(v) for v in x], dtype=float)
 
-    # Identify CBSD grants overlapping with frequency range of the protection entity
-    # in the neighborhood of the protection point and channel
-    channel_neighbor_grants = interf.findOverlappingGrants(neighbor_grants,
-                                                           channel_constraint)
-    num_unsatisfied_grants_channel = len(channel_neighbor_grants)
 
-    # Computes interference quota for this protection_point and channel.
-    iap_threshold = threshold
+def _configureIapGrants(call_id, grants):
+  """Sets the grants used by IAP in the current process (None to release).
 
-    # Calculate the fair share per channel based on unsatisfied grants
-    fairshare_channel = 0
-    if num_unsatisfied_grants_channel > 0:
-      fairshare_channel = float(iap_threshold) / num_unsatisfied_grants_channel
+  The spatial index of the grants is built on first use.
+  """
+  global _iap_call_id
+  global _iap_grants
+  global _iap_grant_index
+  _iap_call_id = call_id
+  _iap_grants = grants
+  _iap_grant_index = None
 
-    num_unsatisfied_grants_channels.append(num_unsatisfied_grants_channel)
-    iap_threshold_channels.append(iap_threshold)
-    fairshare_channels.append(fairshare_channel)
 
-  # List of grants initialized with max EIRP
-  grants_eirp = [grant.max_eirp for grant in neighbor_grants]
+def _iapPointConstraintOnGrants(protection_point, call_id, grants_file,
+                                **kwargs):
+  """Runs `iapPointConstraint` with the grants of a given IAP calculation.
 
-  # Initialize list of grants_satisfied to False
-  grants_satisfied = [False] * num_unsatisfied_grants
+  The grants of the calculation identified by `call_id` are loaded from the
+  pickle file `grants_file` by the first point processed in the process, and
+  kept with their spatial index for all the other points.
 
-  # Initialize list of grants_removed to False
-  grants_removed = [False] * num_unsatisfied_grants
+  Returns:
+    The (asas_interference, agg_interference) per channel as a ndarray of
+    shape (2, num_channels).
+  """
+  global _iap_grant_index
+  if call_id != _iap_call_id:
+    # Releases the grants of a previous calculation before loading the new ones.
+    _configureIapGrants(None, None)
+    with open(grants_file, 'rb') as fd:
+      _configureIapGrants(call_id, pickle.load(fd))
+  if _iap_grant_index is None:
+    _iap_grant_index = spatial_index.GrantsIndex(_iap_grants)
+  _, _, asas_interf, aggr_interf = iapPointConstraint(
+      protection_point, grants=_iap_grants, grant_index=_iap_grant_index,
+      **kwargs)
+  return np.array([asas_interf, aggr_interf], dtype=float)
+
+
+def performIapOnPoints(protection_points, channels, low_freq, high_freq,
+                       grants, fss_info, esc_antenna_info,
+                       region_type, threshold, protection_ent_type):
+  """Computes aggregate interference(Ap and ASASp) on many protection points.
 
-  # Initialize grant overlap and interference per channel dictionary
-  # Values will be stored in the format of key as tuple (grant_id, channel_id)
-  # and respective value as:
-  #   overlap_flag: True/False based on grant overlaps with channel
-  #   interference: respective interference value for the key
-  grants_overlap_flag = {}
-  grants_interference = {}
+  Runs `iapPointConstraint` on all protection points, with the pool of worker
+  processes (see `mpool`). The grants are shared with the workers through a
+  temporary file, so that each worker loads them, and builds their spatial
+  index, only once. The workers only return the interference arrays of each
+  point, and release the grants at the end of the calculation.
 
-  with cache.CacheManager(wf_hybrid.CalcHybridPropagationLoss):
-    # Using memoizing cache manager only for lengthy calculation (hybrid on PPA/GWPZ).
-    while num_unsatisfied_grants > 0:
-      for g_idx, grant in enumerate(neighbor_grants):
-
-        if grants_satisfied[g_idx]:
-          continue
-
-        for idx, channel in enumerate(channels):
-          # Check if grant overlaps with protection point, channel
-          grant_overlap_check = interf.grantFrequencyOverlapCheck(
-              grant, channel[0], channel[1], protection_ent_type)
-
-          grants_overlap_flag[(g_idx, idx)] = grant_overlap_check
-          if not grant_overlap_check:
-            continue
-          # Get protection constraint over 5MHz channel range
-          channel_constraint = data.ProtectionConstraint(
-              latitude=protection_point[1], longitude=protection_point[0],
-              low_frequency=channel[0], high_frequency=channel[1],
-              entity_type=protection_ent_type)
-
-          # Compute interference that grant causes to protection point over channel
-          interference = interf.dbToLinear(interf.computeInterference(
-              grant, grants_eirp[g_idx], channel_constraint, fss_info,
-              esc_antenna_info, region_type))
-
-          # If calculated interference is more than fair share of interference
-          # to which the grants are entitled then grant is considered unsatisfied
-          if interference < fairshare_channels[idx]:
-            # Add the interference caused by all the grants in a 5MHz channel
-            grants_interference[(g_idx, idx)] = interference
-            grants_satisfied[g_idx] = True
-          else:
-            grants_satisfied[g_idx] = False
-            break
-
-      num_grants_good_overall_channels = 0
-
-      for gr_idx, grant in enumerate(neighbor_grants):
-        if grants_removed[gr_idx]:
-          continue
-        if not grants_satisfied[gr_idx]:
-          continue
-        if num_unsatisfied_grants > 0:
-          num_unsatisfied_grants -= 1
-        for ch_idx, channel in enumerate(channels):
-          # Grant interferes with protection point over channel
-          if grants_overlap_flag[(gr_idx, ch_idx)]:
-            iap_threshold_channels[ch_idx] = (iap_threshold_channels[ch_idx] -
-                                              grants_interference[(gr_idx, ch_idx)])
-            num_unsatisfied_grants_channels[ch_idx] -= 1
-            # Re-calculate fairshare for a channel
-            if num_unsatisfied_grants_channels[ch_idx] > 0:
-              fairshare_channels[ch_idx] = (float(iap_threshold_channels[ch_idx]) /
-                                            num_unsatisfied_grants_channels[ch_idx])
-            aggr_interf[ch_idx] += grants_interference[(gr_idx, ch_idx)]
-            if grant.is_managed_grant:
-              asas_interf[ch_idx] += grants_interference[(gr_idx, ch_idx)]
-
-          # Removing grants from future consideration
-          grants_removed[gr_idx] = True
-
-          # Increase number of grants good over all channels
-          num_grants_good_overall_channels += 1
-
-      if num_grants_good_overall_channels == 0:
-        for grant_idx, grant in enumerate(neighbor_grants):
-          # Reduce power level of all the unsatisfied grants
-          if not grants_satisfied[grant_idx]:
-            grants_eirp[grant_idx] -= 1
-
-  logging.debug('IAP point_constraint @ point %s: %s',
-                (protection_point[1], protection_point[0]),
-                list(zip(asas_interf, aggr_interf)))
+  Args:
+    protection_points: A sequence of protection points (longitude, latitude).
+    grants: A list of |data.CbsdGrantInfo| grants.
+    Others: see `iapPointConstraint`.
 
-  # Return the computed data
-  return protection_point[1], protection_point[0], asas_interf, aggr_interf
+  Returns:
+    A list of tuple (latitude, longitude, asas_interference, agg_interference)
+    as returned by `iapPointConstraint`, except that the interference per channel
+    are ndarrays.
+  """
+  # A unique id of the calculation, so that the workers never use the grants
+  # of a previous calculation.
+  call_id = (os.getpid(), next(_iap_call_ids))
+  fd, grants_file = tempfile.mkstemp(prefix='iap_grants_', suffix='.pkl')
+  with os.fdopen(fd, 'wb') as grants_fd:
+    pickle.dump(grants, grants_fd, protocol=pickle.HIGHEST_PROTOCOL)
+  # The grants are directly available when the points are processed in this
+  # process (dummy pool).
+  _configureIapGrants(call_id, grants)
+  iapPoint = partial(_iapPointConstraintOnGrants,
+                     call_id=call_id,
+                     grants_file=grants_file,
+                     channels=channels,
+                     low_freq=low_freq,
+                     high_freq=high_freq,
+                     fss_info=fss_info,
+                     esc_antenna_info=esc_antenna_info,
+                     region_type=region_type,
+                     threshold=threshold,
+                     protection_ent_type=protection_ent_type)
+  try:
+    point_interfs = mpool.MapByLocation(
+        iapPoint, protection_points,
+        [point[1] for point in protection_points],
+        [point[0] for point in protection_points])
+  finally:
+    _configureIapGrants(None, None)
+    mpool.RunOnEachWorkerProcess(_configureIapGrants, None, None)
+    os.remove(grants_file)
+
+  return [(point[1], point[0], interfs[0], interfs[1])
+          for point, interfs in zip(protection_points, point_interfs)]
 
 
 def performIapForEsc(esc_record, sas_uut_fad_object, sas_th_fad_objects):
@@ -365,19 +501,10 @@ def performIapForGwpz(gwpz_record, sas_uut_fad_object, sas_th_fad_objects):
   protection_channels = interf.getProtectedChannels(gwpz_low_freq, gwpz_high_freq)
 
   logging.debug('$$$$ Calling GWPZ Protection $$$$')
-  iapPoint = partial(iapPointConstraint,
-                     channels=protection_channels,
-                     low_freq=gwpz_low_freq,
-                     high_freq=gwpz_high_freq,
-                     grants=grants,
-                     fss_info=None,
-                     esc_antenna_info=None,
-                     region_type=gwpz_region,
-                     threshold=gwpz_iap_threshold,
-                     protection_ent_type=data.ProtectedEntityType.GWPZ_AREA)
-
-  pool = mpool.Pool()
-  iap_interfs = pool.map(iapPoint, protection_points)
+  iap_interfs = performIapOnPoints(
+      protection_points, protection_channels, gwpz_low_freq, gwpz_high_freq,
+      grants, None, None, gwpz_region, gwpz_iap_threshold,
+      data.ProtectedEntityType.GWPZ_AREA)
 
   ap_iap_ref = calculatePostIapAggregateInterference(
       interf.dbToLinear(gwpz_thresh_q), num_sas, iap_interfs)
@@ -443,19 +570,10 @@ def performIapForPpa(ppa_record, sas_uut_fad_object, sas_th_fad_objects,
   # Apply IAP for each protection constraint with a pool of parallel
   # processes.
   logging.debug('$$$$ Calling PPA Protection $$$$')
-  iapPoint = partial(iapPointConstraint,
-                     channels=protection_channels,
-                     low_freq=ppa_low_freq,
-                     high_freq=ppa_high_freq,
-                     grants=grants,
-                     fss_info=None,
-                     esc_antenna_info=None,
-                     region_type=ppa_region,
-                     threshold=ppa_iap_threshold,
-                     protection_ent_type=data.ProtectedEntityType.PPA_AREA)
-
-  pool = mpool.Pool()
-  iap_interfs = pool.map(iapPoint, protection_points)
+  iap_interfs = performIapOnPoints(
+      protection_points, protection_channels, ppa_low_freq, ppa_high_freq,
+      grants, None, None, ppa_region, ppa_iap_threshold,
+      data.ProtectedEntityType.PPA_AREA)
 
   ap_iap_ref = calculatePostIapAggregateInterference(
       interf.dbToLinear(ppa_thresh_q), num_sas, iap_interfs)
@@ -601,8 +719,8 @@ def calculatePostIapAggregateInterference(q_p, num_sas, iap_interfs):
   ap_iap_ref = {}
   for lat, lon, asas_interfs, agg_interfs in iap_interfs:
     if lat not in ap_iap_ref: ap_iap_ref[lat] = {}
-    ap_iap_ref[lat][lon] = [
-        (float(q_p - aggr_interf) / num_sas + asas_interf)
-        for asas_interf, aggr_interf in zip(asas_interfs, agg_interfs)]
+    ap_iap_ref[lat][lon] = list(
+        (float(q_p) - np.asarray(agg_interfs, dtype=float)) / num_sas
+        + np.asarray(asas_interfs, dtype=float))
 
   return ap_iap_ref
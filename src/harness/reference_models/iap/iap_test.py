@@ -0,0 +1,266 @@
+#    Copyright 2018 SAS Project Authors. All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import multiprocessing
+import unittest
+
+import numpy as np
+
+from reference_models.antenna import antenna
+from reference_models.common import data
+from reference_models.common import mpool
+from reference_models.geo import vincenty
+from reference_models.iap import iap
+from reference_models.interference import interference as interf
+from reference_models.propagation import wf_hybrid
+from reference_models.propagation import wf_itm
+from reference_models.tools import testutils
+
+
+def _ReferenceIapPointConstraint(protection_point, channels, low_freq, high_freq,
+                                 grants, fss_info, esc_antenna_info,
+                                 region_type, threshold, protection_ent_type):
+  """Straightforward IAP on a point, computing each interference when needed."""
+  protection_constraint = data.ProtectionConstraint(
+      latitude=protection_point[1], longitude=protection_point[0],
+      low_frequency=low_freq, high_frequency=high_freq,
+      entity_type=protection_ent_type)
+  neighbor_grants = interf.findOverlappingGrants(
+      interf.findGrantsInsideNeighborhood(grants, protection_point,
+                                          protection_ent_type),
+      protection_constraint)
+  channel_constraints = [
+      data.ProtectionConstraint(
+          latitude=protection_point[1], longitude=protection_point[0],
+          low_frequency=channel[0], high_frequency=channel[1],
+          entity_type=protection_ent_type)
+      for channel in channels]
+  overlaps = [[interf.grantFrequencyOverlapCheck(
+      grant, channel[0], channel[1], protection_ent_type)
+               for channel in channels] for grant in neighbor_grants]
+
+  num_unsatisfied_grants = len(neighbor_grants)
+  num_unsatisfied_channels = [sum(overlap[ch] for overlap in overlaps)
+                              for ch in range(len(channels))]
+  thresholds = [threshold] * len(channels)
+  fairshares = [float(threshold) / num if num else 0
+                for num in num_unsatisfied_channels]
+  aggr_interf = [0] * len(channels)
+  asas_interf = [0] * len(channels)
+  eirps = [grant.max_eirp for grant in neighbor_grants]
+  satisfied = [False] * len(neighbor_grants)
+  interferences = {}
+
+  while num_unsatisfied_grants > 0:
+    newly_satisfied = []
+    for g, grant in enumerate(neighbor_grants):
+      if satisfied[g]:
+        continue
+      for ch in range(len(channels)):
+        if not overlaps[g][ch]:
+          continue
+        interferences[(g, ch)] = interf.dbToLinear(interf.computeInterference(
+            grant, eirps[g], channel_constraints[ch], fss_info,
+            esc_antenna_info, region_type))
+        satisfied[g] = interferences[(g, ch)] < fairshares[ch]
+        if not satisfied[g]:
+          break
+      if satisfied[g]:
+        newly_satisfied.append(g)
+
+    for g in newly_satisfied:
+      num_unsatisfied_grants -= 1
+      for ch in range(len(channels)):
+        if overlaps[g][ch]:
+          thresholds[ch] -= interferences[(g, ch)]
+          num_unsatisfied_channels[ch] -= 1
+          if num_unsatisfied_channels[ch] > 0:
+            fairshares[ch] = (float(thresholds[ch]) /
+                              num_unsatisfied_channels[ch])
+          aggr_interf[ch] += interferences[(g, ch)]
+          if neighbor_grants[g].is_managed_grant:
+            asas_interf[ch] += interferences[(g, ch)]
+
+    if not newly_satisfied:
+      for g in range(len(neighbor_grants)):
+        if not satisfied[g]:
+          eirps[g] -= 1
+
+  return protection_point[1], protection_point[0], asas_interf, aggr_interf
+
+
+def _GetIapGrants():
+  return iap._iap_grants
+
+
+def _MakeGrants(num_grants, lat, lon, max_dist_km):
+  np.random.seed(12345)
+  grants = []
+  for k in range(num_grants):
+    is_cat_b = bool(k % 3 == 0)
+    low_freq = 3550e6 + 5e6 * np.random.randint(0, 28)
+    grant_lat, grant_lon, _ = vincenty.GeodesicPoint(
+        lat, lon, np.random.uniform(1, max_dist_km), np.random.uniform(0, 360))
+    grants.append(data.CbsdGrantInfo(
+        latitude=grant_lat,
+        longitude=grant_lon,
+        height_agl=np.random.randint(3, 30),
+        indoor_deployment=bool(k % 2),
+        cbsd_category='B' if is_cat_b else 'A',
+        antenna_azimuth=np.random.uniform(0, 360) if is_cat_b else None,
+        antenna_gain=np.random.uniform(0, 15),
+        antenna_beamwidth=60 if is_cat_b else None,
+        max_eirp=20 + np.random.randint(0, 10),
+        low_frequency=low_freq,
+        high_frequency=min(low_freq + 5e6 * np.random.randint(1, 5), 3700e6),
+        is_managed_grant=bool(k % 4 == 0),
+        cbsd_id='cbsd_%d' % k,
+        grant_id='grant_%d' % k))
+  return grants
+
+
+def _FakeHybridPropagationLoss(*args, **kwargs):
+  return testutils.FakePropagationPredictor(
+      dist_type='REAL', factor=1.0, offset=80)(*args, **kwargs)
+
+
+class TestIap(unittest.TestCase):
+
+  def setUp(self):
+    self.original_itm = wf_itm.CalcItmPropagationLoss
+    self.original_hybrid = wf_hybrid.CalcHybridPropagationLoss
+    self.original_fss_gains = antenna.GetFssAntennaGains
+    wf_itm.CalcItmPropagationLoss = testutils.FakePropagationPredictor(
+        dist_type='REAL', factor=1.0, offset=100)
+    wf_hybrid.CalcHybridPropagationLoss = _FakeHybridPropagationLoss
+    antenna.GetFssAntennaGains = lambda *args: 2.8
+
+  def tearDown(self):
+    wf_itm.CalcItmPropagationLoss = self.original_itm
+    wf_hybrid.CalcHybridPropagationLoss = self.original_hybrid
+    antenna.GetFssAntennaGains = self.original_fss_gains
+
+  def _checkSameAsReference(self, protection_point, channels, low_freq,
+                            high_freq, grants, fss_info, esc_antenna_info,
+                            region_type, threshold, protection_ent_type):
+    expected = _ReferenceIapPointConstraint(
+        protection_point, channels, low_freq, high_freq, grants, fss_info,
+        esc_antenna_info, region_type, threshold, protection_ent_type)
+    result = iap.iapPointConstraint(
+        protection_point, channels, low_freq, high_freq, grants, fss_info,
+        esc_antenna_info, region_type, threshold, protection_ent_type)
+    # Results shall be exactly identical.
+    self.assertEqual(result, expected)
+    # And some grants shall have been reduced.
+    self.assertGreater(sum(expected[3]), 0)
+    self.assertLess(max(expected[3]), threshold)
+
+  def test_esc_same_as_reference(self):
+    esc_antenna_info = data.EscInformation(
+        antenna_height=50, antenna_azimuth=30,
+        antenna_gain_pattern=np.linspace(-10, 5, 360))
+    grants = _MakeGrants(300, 37.5, -122, 80)
+    self._checkSameAsReference(
+        (-122, 37.5),
+        interf.getProtectedChannels(interf.ESC_LOW_FREQ_HZ,
+                                    interf.ESC_HIGH_FREQ_HZ),
+        interf.ESC_LOW_FREQ_HZ, interf.ESC_HIGH_FREQ_HZ, grants, None,
+        esc_antenna_info, None,
+        interf.dbToLinear(iap.THRESH_ESC_DBM_PER_IAPBW - iap.MARGIN_ESC_DB),
+        data.ProtectedEntityType.ESC)
+
+  def test_fss_cochannel_same_as_reference(self):
+    fss_info = data.FssInformation(height_agl=10, max_gain_dbi=40,
+                                   pointing_azimuth=60, pointing_elevation=20)
+    grants = _MakeGrants(200, 37.5, -122, 150)
+    self._checkSameAsReference(
+        (-122, 37.5), interf.getProtectedChannels(3600e6, 3700e6),
+        3600e6, 3700e6, grants, fss_info, None, None,
+        interf.dbToLinear(iap.THRESH_FSS_CO_CHANNEL_DBM_PER_IAPBW
+                          - iap.MARGIN_FSS_CO_CHANNEL_DB),
+        data.ProtectedEntityType.FSS_CO_CHANNEL)
+
+  def test_ppa_same_as_reference(self):
+    grants = _MakeGrants(100, 37.5, -122, 40)
+    self._checkSameAsReference(
+        (-122, 37.5), interf.getProtectedChannels(3550e6, 3570e6),
+        3550e6, 3570e6, grants, None, None, 'SUBURBAN',
+        interf.dbToLinear(iap.THRESH_PPA_DBM_PER_IAPBW - iap.MARGIN_PPA_DB),
+        data.ProtectedEntityType.PPA_AREA)
+
+  def test_iap_on_points(self):
+    grants = _MakeGrants(100, 37.5, -122, 40)
+    channels = interf.getProtectedChannels(3550e6, 3570e6)
+    threshold = interf.dbToLinear(iap.THRESH_PPA_DBM_PER_IAPBW - iap.MARGIN_PPA_DB)
+    points = [(-122, 37.5), (-122.1, 37.45), (-121.9, 37.6)]
+    results = iap.performIapOnPoints(
+        points, channels, 3550e6, 3570e6, grants, None, None, 'SUBURBAN',
+        threshold, data.ProtectedEntityType.PPA_AREA)
+    self.assertEqual(len(results), len(points))
+    for point, (lat, lon, asas_interf, aggr_interf) in zip(points, results):
+      expected = iap.iapPointConstraint(
+          point, channels, 3550e6, 3570e6, grants, None, None, 'SUBURBAN',
+          threshold, data.ProtectedEntityType.PPA_AREA)
+      self.assertEqual((lat, lon), expected[:2])
+      self.assertListEqual(list(asas_interf), expected[2])
+      self.assertListEqual(list(aggr_interf), expected[3])
+    # The grants are released after use.
+    self.assertIsNone(iap._iap_grants)
+
+  def test_iap_on_points_with_pool(self):
+    channels = interf.getProtectedChannels(3550e6, 3570e6)
+    threshold = interf.dbToLinear(iap.THRESH_PPA_DBM_PER_IAPBW - iap.MARGIN_PPA_DB)
+    points = [(-122, 37.5), (-122.1, 37.45), (-121.9, 37.6), (-122, 37.4)]
+    all_grants = _MakeGrants(100, 37.5, -122, 40)
+    original_pool = mpool._pool
+    original_num_workers = mpool._num_workers
+    pool = multiprocessing.Pool(2)
+    mpool.Configure(pool=pool)
+    mpool._num_workers = 2
+    try:
+      # Successive calculations never use the grants of a previous one.
+      for grants in [all_grants[:50], all_grants[50:]]:
+        results = iap.performIapOnPoints(
+            points, channels, 3550e6, 3570e6, grants, None, None, 'SUBURBAN',
+            threshold, data.ProtectedEntityType.PPA_AREA)
+        for point, (_, _, asas_interf, aggr_interf) in zip(points, results):
+          expected = iap.iapPointConstraint(
+              point, channels, 3550e6, 3570e6, grants, None, None, 'SUBURBAN',
+              threshold, data.ProtectedEntityType.PPA_AREA)
+          self.assertListEqual(list(asas_interf), expected[2])
+          self.assertListEqual(list(aggr_interf), expected[3])
+        # The workers release the grants after use.
+        self.assertListEqual(mpool.RunOnEachWorkerProcess(_GetIapGrants),
+                             [None, None])
+    finally:
+      mpool.Configure(pool=original_pool)
+      mpool._num_workers = original_num_workers
+      pool.close()
+      pool.join()
+
+  def test_no_neighbor_grants(self):
+    channels = interf.getProtectedChannels(3550e6, 3570e6)
+    self.assertEqual(
+        iap.iapPointConstraint(
+            (-100, 37.5), channels, 3550e6, 3570e6,
+            _MakeGrants(10, 37.5, -122, 40), None, None, 'SUBURBAN',
+            1e-10, data.ProtectedEntityType.PPA_AREA),
+        (37.5, -100, [0] * 4, [0] * 4))
+
+
+if __name__ == '__main__':
+  unittest.main()
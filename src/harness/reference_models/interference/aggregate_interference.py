@@ -28,6 +28,10 @@
     calculateAggregateInterferenceForGwpz
     calculateAggregateInterferenceForPpa
 
+  For GWPZ and PPA, a grant-major evaluation mode is also available, where the
+  interference of each grant is computed on all the grid points of its
+  neighborhood at once (see `aggregateInterferenceForPointsByGrant`).
+
   The routines returns a nested dictionary in the format of
   {latitude : {longitude : [interference1, interference2]}}. interference
   is the aggregate interference value in mW for each of the protection constraint.
@@ -45,7 +49,9 @@ import numpy as np
 from reference_models.common import cache
 from reference_models.common import data
 from reference_models.common import mpool
+from reference_models.geo import spatial_index
 from reference_models.geo import utils
+from reference_models.geo import vincenty
 from reference_models.interference import interference as interf
 from reference_models.propagation import wf_hybrid
 
@@ -74,7 +80,8 @@ def convertAndSumInterference(cbsd_interference_list):
 
 def aggregateInterferenceForPoint(protection_point, channels, grants,
                                   fss_info, esc_antenna_info,
-                                  protection_ent_type, region_type):
+                                  protection_ent_type, region_type,
+                                  grant_index=None):
   """Computes the aggregate interference for a protection point.
 
   This routine is invoked to calculate aggregate interference for ESC sensor,
@@ -88,6 +95,7 @@ def aggregateInterferenceForPoint(protection_point, channels, grants,
     esc_antenna_info: ESC antenna information of type |data.EscInformation| (optional).
     protection_ent_type: The entity type (|data.ProtectedEntityType|).
     region: Region type of the protection point: 'URBAN', 'SUBURBAN' or 'RURAL'.
+    grant_index: An optional |spatial_index.SpatialIndex| of the `grants` list.
 
   Returns:
     A tuple (latitude, longitude, interferences) where interferences is a list
@@ -96,7 +104,7 @@ def aggregateInterferenceForPoint(protection_point, channels, grants,
 
   # Get all the grants inside neighborhood of the protection entity
   grants_inside = interf.findGrantsInsideNeighborhood(
-      grants, protection_point, protection_ent_type)
+      grants, protection_point, protection_ent_type, grant_index)
 
   if not grants_inside:
     # We need one entry per channel, even if they're all zero.
@@ -133,6 +141,88 @@ def aggregateInterferenceForPoint(protection_point, channels, grants,
   return protection_point[1], protection_point[0], interferences
 
 
+def interferenceOfGrantOnPoints(grant, lats, lons, channels,
+                                protection_ent_type, region_type):
+  """Computes the interference of a grant on the points of a GWPZ or PPA.
+
+  Args:
+    grant: A CBSD grant of type |data.CbsdGrantInfo|.
+    lats, lons: The protection points coordinates (degrees), as ndarrays.
+    channels: A sequence of channels as tuple (low_freq_hz, high_freq_hz).
+    protection_ent_type: The entity type (|data.ProtectedEntityType|), either
+      GWPZ_AREA or PPA_AREA.
+    region_type: Region type of the area: 'URBAN', 'SUBURBAN' or 'RURAL'.
+
+  Returns:
+    A tuple (point_idxs, interferences) where:
+      point_idxs: the indices of the points in the grant neighborhood.
+      interferences: the interference (mW) on these points, as a ndarray of
+        shape (len(point_idxs), len(channels)).
+  """
+  channel_idxs = [k for k, channel in enumerate(channels)
+                  if interf.grantFrequencyOverlapCheck(
+                      grant, channel[0], channel[1], protection_ent_type)]
+  if not channel_idxs:
+    return np.zeros(0, dtype=int), np.zeros((0, len(channels)))
+
+  dists_km, _, _ = vincenty.GeodesicDistanceBearingArrays(
+      grant.latitude, grant.longitude, lats, lons)
+  point_idxs = np.flatnonzero(
+      dists_km <= interf.getNeighborhoodDistance(grant.cbsd_category,
+                                                 protection_ent_type))
+  interferences = np.zeros((len(point_idxs), len(channels)))
+  if len(point_idxs):
+    interferences[:, channel_idxs] = interf.dbToLinear(
+        interf.computeInterferencePpaGwpzPoints(
+            grant, lats[point_idxs], lons[point_idxs],
+            [channels[k] for k in channel_idxs], protection_ent_type,
+            interf.GWPZ_PPA_HEIGHT, grant.max_eirp, region_type))
+  return point_idxs, interferences
+
+
+def aggregateInterferenceForPointsByGrant(protection_points, channels, grants,
+                                          protection_ent_type, region_type):
+  """Computes the aggregate interference on GWPZ or PPA points, grant by grant.
+
+  This is the grant-major version of mapping `aggregateInterferenceForPoint`
+  over the protection points: the interference of each grant is computed on
+  all the points of its neighborhood in one batch (see
+  `interferenceOfGrantOnPoints`), and accumulated into a (points x channels)
+  array. All the paths from a same CBSD are thus evaluated together, which
+  allows to share their terrain data (for example the CBSD radial fan, see
+  |terrain.TerrainDriver.SetRadialFanMode|).
+  The grants are processed in parallel with the pool of processes, scheduled
+  by location.
+
+  Args:
+    protection_points: A list of protection points as (longitude, latitude).
+    channels: A sequence of channels as tuple (low_freq_hz, high_freq_hz).
+    grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|.
+    protection_ent_type: The entity type (|data.ProtectedEntityType|), either
+      GWPZ_AREA or PPA_AREA.
+    region_type: Region type of the area: 'URBAN', 'SUBURBAN' or 'RURAL'.
+
+  Returns:
+    A list of tuple (latitude, longitude, interferences), one per protection
+    point, where interferences is a list of interference (mW) per channel.
+  """
+  lons = np.array([point[0] for point in protection_points], dtype=float)
+  lats = np.array([point[1] for point in protection_points], dtype=float)
+  interfCalculator = partial(interferenceOfGrantOnPoints,
+                             lats=lats, lons=lons, channels=channels,
+                             protection_ent_type=protection_ent_type,
+                             region_type=region_type)
+  grants = list(grants)
+  aggr_interf = np.zeros((len(protection_points), len(channels)))
+  for point_idxs, interferences in mpool.MapByLocation(
+      interfCalculator, grants, [grant.latitude for grant in grants],
+      [grant.longitude for grant in grants]):
+    aggr_interf[point_idxs] += interferences
+
+  return [(point[1], point[0], list(point_interf))
+          for point, point_interf in zip(protection_points, aggr_interf)]
+
+
 def calculateAggregateInterferenceForFssCochannel(fss_record, grants):
   """Calculates per-channel aggregate interference for FSS co-channel.
 
@@ -247,12 +337,16 @@ def calculateAggregateInterferenceForEsc(esc_record, grants):
   return InterferenceDict(interferences)
 
 
-def calculateAggregateInterferenceForGwpz(gwpz_record, grants):
+def calculateAggregateInterferenceForGwpz(gwpz_record, grants,
+                                          grant_major=False):
   """Calculates per-channel aggregate interference for GWPZ.
 
   Args:
     gwpz_record: A GWPZ record dict.
     grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|.
+    grant_major: If True, uses the grant-major evaluation (see
+      `aggregateInterferenceForPointsByGrant`), otherwise the interference is
+      computed point by point.
 
   Returns:
     Aggregate interference to GWPZ in the nested dictionary format.
@@ -279,27 +373,40 @@ def calculateAggregateInterferenceForGwpz(gwpz_record, grants):
                gwpz_record, protection_channels, len(protection_points), grants, gwpz_region)
   logging.debug('  points: %s', protection_points)
 
+  grants = list(grants)
+  if grant_major:
+    return InterferenceDict(aggregateInterferenceForPointsByGrant(
+        protection_points, protection_channels, grants,
+        data.ProtectedEntityType.GWPZ_AREA, gwpz_region))
+
   interfCalculator = partial(aggregateInterferenceForPoint,
                              channels=protection_channels,
                              grants=grants,
                              fss_info=None,
                              esc_antenna_info=None,
                              protection_ent_type=data.ProtectedEntityType.GWPZ_AREA,
-                             region_type=gwpz_region)
+                             region_type=gwpz_region,
+                             grant_index=spatial_index.GrantsIndex(grants))
 
-  pool = mpool.Pool()
-  interferences = pool.map(interfCalculator, protection_points)
+  interferences = mpool.MapByLocation(
+      interfCalculator, protection_points,
+      [point[1] for point in protection_points],
+      [point[0] for point in protection_points])
   return InterferenceDict(interferences)
 
 
 
-def calculateAggregateInterferenceForPpa(ppa_record, pal_records, grants):
+def calculateAggregateInterferenceForPpa(ppa_record, pal_records, grants,
+                                         grant_major=False):
   """Calculates per-channel aggregate interference for PPA.
 
   Args:
     ppa_record: A PPA record dict.
     pal_records: PAL records associated with a PPA protection area
     grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|.
+    grant_major: If True, uses the grant-major evaluation (see
+      `aggregateInterferenceForPointsByGrant`), otherwise the interference is
+      computed point by point.
 
   Returns:
     Aggregate interference to PPA in the nested dictionary format.
@@ -337,14 +444,23 @@ def calculateAggregateInterferenceForPpa(ppa_record, pal_records, grants):
 
   # Calculate aggregate interference from each protection constraint with a
   # pool of parallel processes.
+  grants = list(grants)
+  if grant_major:
+    return InterferenceDict(aggregateInterferenceForPointsByGrant(
+        protection_points, protection_channels, grants,
+        data.ProtectedEntityType.PPA_AREA, ppa_region))
+
   interfCalculator = partial(aggregateInterferenceForPoint,
                              channels=protection_channels,
                              grants=grants,
                              fss_info=None,
                              esc_antenna_info=None,
                              protection_ent_type=data.ProtectedEntityType.PPA_AREA,
-                             region_type=ppa_region)
+                             region_type=ppa_region,
+                             grant_index=spatial_index.GrantsIndex(grants))
 
-  pool = mpool.Pool()
-  interferences = pool.map(interfCalculator, protection_points)
+  interferences = mpool.MapByLocation(
+      interfCalculator, protection_points,
+      [point[1] for point in protection_points],
+      [point[0] for point in protection_points])
   return InterferenceDict(interferences)
@@ -20,9 +20,16 @@ from __future__ import print_function
 
 import json
 import os
+import shutil
+import tempfile
 import unittest
 
+import numpy as np
+
 from reference_models.common import data
+from reference_models.geo import drive
+from reference_models.geo import terrain
+from reference_models.geo import vincenty
 from reference_models.interference import aggregate_interference
 from reference_models.interference import interference as interf
 from reference_models.tools import testutils
@@ -118,5 +125,78 @@ class TestAggregateInterference(unittest.TestCase):
     return self.assertEqual(expected_interference, allowed_interference)
 
 
+class TestAggregateInterferenceByGrant(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # Smooth synthetic terrain tile, so that the test does not depend on the
+    # real NED data.
+    cls.tile_dir = tempfile.mkdtemp()
+    x = np.arange(terrain._TILE_DIM) / float(terrain._TILE_DIM)
+    tile = (300 + 200 * np.sin(20 * x)[:, np.newaxis] * np.cos(13 * x)
+            + 50 * np.sin(150 * x)[np.newaxis, :])
+    tile.astype(np.float32).tofile(
+        os.path.join(cls.tile_dir, 'floatn38w123_1_std.flt'))
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tile_dir)
+
+  def setUp(self):
+    self.original_terrain_driver = drive.terrain_driver
+    drive.terrain_driver = terrain.TerrainDriver(self.tile_dir)
+
+  def tearDown(self):
+    drive.terrain_driver = self.original_terrain_driver
+
+  def _makeGrants(self, num_grants):
+    np.random.seed(4321)
+    grants = []
+    for k in range(num_grants):
+      is_cat_b = bool(k % 3 == 0)
+      low_freq = 3550e6 + 5e6 * np.random.randint(0, 8)
+      lat, lon, _ = vincenty.GeodesicPoint(37.5, -122.5,
+                                           np.random.uniform(0.1, 30),
+                                           np.random.uniform(0, 360))
+      grants.append(data.CbsdGrantInfo(
+          latitude=lat, longitude=lon,
+          height_agl=np.random.randint(3, 30),
+          indoor_deployment=bool(k % 2),
+          cbsd_category='B' if is_cat_b else 'A',
+          antenna_azimuth=np.random.uniform(0, 360) if is_cat_b else None,
+          antenna_gain=np.random.uniform(0, 15),
+          antenna_beamwidth=60 if is_cat_b else None,
+          max_eirp=20 + np.random.uniform(0, 10),
+          low_frequency=low_freq,
+          high_frequency=low_freq + 10e6,
+          is_managed_grant=True,
+          cbsd_id='cbsd_%d' % k,
+          grant_id='grant_%d' % k))
+    return grants
+
+  def test_same_as_per_point(self):
+    grants = self._makeGrants(30)
+    points = [(lon, lat) for lat in np.linspace(37.4, 37.6, 4)
+              for lon in np.linspace(-122.7, -122.3, 5)]
+    channels = interf.getProtectedChannels(3550e6, 3580e6)
+    for entity_type, region in [(data.ProtectedEntityType.PPA_AREA, 'SUBURBAN'),
+                                (data.ProtectedEntityType.GWPZ_AREA, 'RURAL')]:
+      results = aggregate_interference.aggregateInterferenceForPointsByGrant(
+          points, channels, grants, entity_type, region)
+      self.assertEqual(len(results), len(points))
+      for point, (lat, lon, interferences) in zip(points, results):
+        exp_lat, exp_lon, exp_interferences = (
+            aggregate_interference.aggregateInterferenceForPoint(
+                point, channels, grants, None, None, entity_type, region))
+        self.assertEqual((lat, lon), (exp_lat, exp_lon))
+        self.assertEqual(len(interferences), len(channels))
+        self.assertGreater(max(exp_interferences), 0)
+        for value, exp_value in zip(interferences, exp_interferences):
+          if not exp_value:
+            self.assertEqual(value, 0)
+            continue
+          self.assertAlmostEqual(value / exp_value, 1, delta=1e-9)
+
+
 if __name__ == '__main__':
   unittest.main()
@@ -19,14 +19,18 @@
 
     computeInterference
     computeInterferencePpaGwpzPoint
+    computeInterferencePpaGwpzPoints
     computeInterferenceEsc
     computeInterferenceFssCochannel
     computeInterferenceFssBlocking
+    computeInterferenceTerms
     getEffectiveSystemEirp
+    getInterferenceFromTerms
 
   The common utility APIs are:
 
     findOverlappingGrantsInsideNeighborhood
+    getNeighborhoodDistance
     getProtectedChannels
 
   The routines return a interference caused by a grant in the neighborhood of
@@ -112,6 +116,15 @@ _DISTANCE_PER_PROTECTION_TYPE = {
     data.ProtectedEntityType.ESC: (ESC_NEIGHBORHOOD_DIST_A, ESC_NEIGHBORHOOD_DIST_B)
 }
 
+# Define the terms of the interference caused by a grant, which do not depend
+# on its EIRP, i.e. a tuple with named fields of:
+#   'effective_ant_gain': the total antenna gain, at CBSD and incumbent (dBi).
+#   'bandwidth_db': the reference bandwidth correction 10*log10(BW/1MHz) (dB).
+#   'losses': a tuple of losses (dB), such as path loss and mask losses, applied
+#     in that order.
+InterferenceTerms = namedtuple('InterferenceTerms',
+                               ['effective_ant_gain', 'bandwidth_db', 'losses'])
+
 
 def dbToLinear(x):
   """This function returns dBm to mW converted value"""
@@ -144,34 +157,59 @@ def getProtectedChannels(low_freq_hz, high_freq_hz):
   return [(low, high) for low, high in zip(channels, channels+5*MHZ)]
 
 
-def findGrantsInsideNeighborhood(grants, protection_point, entity_type):
+def findGrantsInsideNeighborhood(grants, protection_point, entity_type,
+                                 grant_index=None):
   """Finds grants inside protection entity neighborhood.
 
   Args:
-    grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|.
+    grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|, or a
+      |data.GrantTable|.
     protection_point: The location of a protected entity as (longitude, latitude) tuple.
     entity_type: The entity type (|data.ProtectedEntityType|).
+    grant_index: An optional |spatial_index.SpatialIndex| of the `grants`
+      locations, used for prefiltering the grants (in which case `grants` shall
+      be a list).
   Returns:
     grants_inside: a list of grants, each one being a namedtuple of type
                    |data.CbsdGrantInfo|, of all CBSDs inside the neighborhood
-                   of the protection constraint.
+                   of the protection constraint. If `grants` is a |data.GrantTable|,
+                   a |data.GrantTable| of these grants is returned instead.
   """
+  if isinstance(grants, data.GrantTable):
+    return grants[grants.neighborhoodMask(
+        protection_point[1], protection_point[0],
+        *_DISTANCE_PER_PROTECTION_TYPE[entity_type])]
+
   # Initialize an empty list
   grants_inside = []
 
-  # Loop over each CBSD grant
-  for grant in grants:
-    # Compute distance from CBSD location to protection constraint location
-    dist_km, _, _ = vincenty.GeodesicDistanceBearing(grant.latitude,
-                      grant.longitude, protection_point[1], protection_point[0])
+  if grant_index is not None:
+    # Keep only the grants potentially in the neighborhood.
+    max_dist_km = max(_DISTANCE_PER_PROTECTION_TYPE[entity_type])
+    grants = [grants[k] for k in grant_index.Candidates(
+        protection_point[1], protection_point[0], max_dist_km)]
+
+  # Compute distance from CBSD locations to protection constraint location
+  grants = list(grants)
+  dists_km, _, _ = vincenty.GeodesicDistanceBearingArrays(
+      [grant.latitude for grant in grants], [grant.longitude for grant in grants],
+      protection_point[1], protection_point[0])
 
+  # Loop over each CBSD grant
+  for grant, dist_km in zip(grants, dists_km):
     # Check if CBSD is inside the neighborhood of protection constraint
-    if dist_km <= _DISTANCE_PER_PROTECTION_TYPE[entity_type][grant.cbsd_category == 'B']:
+    if dist_km <= getNeighborhoodDistance(grant.cbsd_category, entity_type):
       grants_inside.append(grant)
 
   return grants_inside
 
 
+def getNeighborhoodDistance(cbsd_category, entity_type):
+  """Returns the neighborhood distance (km) of a CBSD category ('A' or 'B')
+  for a protection entity type (|data.ProtectedEntityType|)."""
+  return _DISTANCE_PER_PROTECTION_TYPE[entity_type][cbsd_category == 'B']
+
+
 def grantFrequencyOverlapCheck(grant, ch_low_freq, ch_high_freq, protection_ent_type):
   """Checks if grant frequency overlaps with protection constraint frequency range.
 
@@ -206,12 +244,26 @@ def findOverlappingGrants(grants, constraint):
   considered as overlapping grants.
 
   Args:
-    grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|.
+    grants: An iterable of CBSD grants of type |data.CbsdGrantInfo|, or a
+      |data.GrantTable|.
     constraint: A protection constraint of type |data.ProtectionConstraint|.
   Returns:
     grants_overlap: a list of |data.CbsdGrantInfo| grants of all CBSDs inside
-      the neighborhood of the protection constraint.
+      the neighborhood of the protection constraint. If `grants` is a
+      |data.GrantTable|, a |data.GrantTable| of these grants is returned instead.
   """
+  if isinstance(grants, data.GrantTable):
+    mask = grants.frequencyOverlapMask(constraint.low_frequency,
+                                       constraint.high_frequency)
+    # Special case of ESC (see `grantFrequencyOverlapCheck`)
+    if constraint.entity_type == data.ProtectedEntityType.ESC:
+      if constraint.low_frequency >= ESC_CAT_A_HIGH_FREQ_HZ:
+        mask &= ~grants.categoryMask('A')
+      else:
+        mask &= ~(grants.categoryMask('A') &
+                  (grants.columns['low_frequency'] >= ESC_CAT_A_HIGH_FREQ_HZ))
+    return grants[mask]
+
   grants_overlap = [grant for grant in grants
                     if grantFrequencyOverlapCheck(
                         grant, constraint.low_frequency ,
@@ -236,6 +288,15 @@ def computeInterferencePpaGwpzPoint(cbsd_grant, constraint, h_inc_ant,
   Returns:
     The interference contribution (dBm).
   """
+  return getInterferenceFromTerms(
+      max_eirp, cbsd_grant.antenna_gain,
+      _getInterferenceTermsPpaGwpzPoint(cbsd_grant, constraint, h_inc_ant,
+                                        region_type))
+
+
+def _getInterferenceTermsPpaGwpzPoint(cbsd_grant, constraint, h_inc_ant,
+                                      region_type):
+  """Returns the |InterferenceTerms| of `computeInterferencePpaGwpzPoint`."""
   # Get the propagation loss and incident angles for area entity
   db_loss, incidence_angles, _ = wf_hybrid.CalcHybridPropagationLoss(
                                      cbsd_grant.latitude, cbsd_grant.longitude,
@@ -258,12 +319,66 @@ def computeInterferencePpaGwpzPoint(cbsd_grant, constraint, h_inc_ant,
   else:
     grant_overlap_bandwidth = RBW_HZ
 
-  # Get the interference value for area entity
-  eirp = getEffectiveSystemEirp(max_eirp, cbsd_grant.antenna_gain,
-                   ant_gain, grant_overlap_bandwidth)
+  # Get the interference terms for area entity
+  return InterferenceTerms(effective_ant_gain=ant_gain,
+                           bandwidth_db=_getBandwidthDb(grant_overlap_bandwidth),
+                           losses=(db_loss,))
 
-  interference = eirp - db_loss
-  return interference
+
+def computeInterferencePpaGwpzPoints(cbsd_grant, lats, lons, channels,
+                                     entity_type, h_inc_ant, max_eirp,
+                                     region_type='SUBURBAN'):
+  """Computes interference that a grant causes to many GWPZ or PPA points.
+
+  Batch version of `computeInterferencePpaGwpzPoint`, over several points and
+  channels of a protection area: the propagation losses from the grant to all
+  the points are computed in a single call to the batch hybrid model.
+
+  Args:
+    cbsd_grant: A CBSD grant of type |data.CbsdGrantInfo|.
+    lats, lons: The protection points coordinates (degrees), as arrays.
+    channels: A sequence of channels as tuple (low_freq_hz, high_freq_hz),
+      all overlapping the grant frequency range.
+    entity_type: The entity type (|data.ProtectedEntityType|), either
+      GWPZ_AREA or PPA_AREA.
+    h_inc_ant: The reference incumbent antenna height (in meters).
+    max_eirp: The maximum EIRP allocated to the grant during IAP procedure
+    region_type: Region type of the GWPZ or PPA area:
+                    'URBAN', 'SUBURBAN' or 'RURAL'.
+  Returns:
+    The interference contributions (dBm), as a ndarray of shape
+    (num_points, num_channels).
+  """
+  lats = np.asarray(lats, dtype=float)
+  lons = np.asarray(lons, dtype=float)
+  db_loss, incidence_angles, _ = wf_hybrid.CalcHybridPropagationLossBatch(
+      np.full(len(lats), cbsd_grant.latitude),
+      np.full(len(lats), cbsd_grant.longitude),
+      cbsd_grant.height_agl, lats, lons, h_inc_ant,
+      cbsd_grant.indoor_deployment,
+      reliability=-1,
+      freq_mhz=FREQ_PROP_MODEL_MHZ,
+      region=region_type)
+
+  ant_gain = antenna.GetStandardAntennaGainsBatch(
+      incidence_angles.hor_cbsd, cbsd_grant.antenna_azimuth,
+      cbsd_grant.antenna_beamwidth, cbsd_grant.antenna_gain)
+
+  # Get the exact overlap of the grant over the GWPZ area channels
+  if entity_type == data.ProtectedEntityType.GWPZ_AREA:
+    grant_overlap_bandwidths = [
+        min(cbsd_grant.high_frequency, channel[1]) -
+        max(cbsd_grant.low_frequency, channel[0])
+        for channel in channels]
+  else:
+    grant_overlap_bandwidths = [RBW_HZ] * len(channels)
+
+  terms = InterferenceTerms(
+      effective_ant_gain=ant_gain[:, np.newaxis],
+      bandwidth_db=np.array([_getBandwidthDb(bw)
+                             for bw in grant_overlap_bandwidths]),
+      losses=(db_loss[:, np.newaxis],))
+  return getInterferenceFromTerms(max_eirp, cbsd_grant.antenna_gain, terms)
 
 
 def getEscMaskLoss(constraint):
@@ -300,6 +415,13 @@ def computeInterferenceEsc(cbsd_grant, constraint, esc_antenna_info, max_eirp):
   Returns:
     The interference contribution(dBm).
   """
+  return getInterferenceFromTerms(
+      max_eirp, cbsd_grant.antenna_gain,
+      _getInterferenceTermsEsc(cbsd_grant, constraint, esc_antenna_info))
+
+
+def _getInterferenceTermsEsc(cbsd_grant, constraint, esc_antenna_info):
+  """Returns the |InterferenceTerms| of `computeInterferenceEsc`."""
   # Get the propagation loss and incident angles for ESC entity
   db_loss, incidence_angles, _ = wf_itm.CalcItmPropagationLoss(
       cbsd_grant.latitude, cbsd_grant.longitude, cbsd_grant.height_agl,
@@ -322,11 +444,10 @@ def computeInterferenceEsc(cbsd_grant, constraint, esc_antenna_info, max_eirp):
   # and ESC to CBSD
   effective_ant_gain = ant_gain + esc_ant_gain
 
-  # Compute the interference value for ESC entity
-  eirp = getEffectiveSystemEirp(max_eirp, cbsd_grant.antenna_gain,
-                                effective_ant_gain)
-  interference = eirp - db_loss - getEscMaskLoss(constraint)
-  return interference
+  # Get the interference terms for ESC entity
+  return InterferenceTerms(effective_ant_gain=effective_ant_gain,
+                           bandwidth_db=_getBandwidthDb(RBW_HZ),
+                           losses=(db_loss, getEscMaskLoss(constraint)))
 
 
 def computeInterferenceFssCochannel(cbsd_grant, constraint, fss_info, max_eirp):
@@ -343,6 +464,13 @@ def computeInterferenceFssCochannel(cbsd_grant, constraint, fss_info, max_eirp):
   Returns:
     The interference contribution(dBm).
   """
+  return getInterferenceFromTerms(
+      max_eirp, cbsd_grant.antenna_gain,
+      _getInterferenceTermsFssCochannel(cbsd_grant, constraint, fss_info))
+
+
+def _getInterferenceTermsFssCochannel(cbsd_grant, constraint, fss_info):
+  """Returns the |InterferenceTerms| of `computeInterferenceFssCochannel`."""
   # Get the propagation loss and incident angles for FSS entity_type
   db_loss, incidence_angles, _ = wf_itm.CalcItmPropagationLoss(cbsd_grant.latitude,
                                    cbsd_grant.longitude, cbsd_grant.height_agl,
@@ -370,10 +498,9 @@ def computeInterferenceFssCochannel(cbsd_grant, constraint, fss_info, max_eirp):
   if eff_bandwidth <= 0:
     raise ValueError('Computing FSS co-channel on grant fully outside FSS passband')
 
-  eirp = getEffectiveSystemEirp(max_eirp, cbsd_grant.antenna_gain,
-                                effective_ant_gain, eff_bandwidth)
-  interference = eirp - db_loss - IN_BAND_INSERTION_LOSS
-  return interference
+  return InterferenceTerms(effective_ant_gain=effective_ant_gain,
+                           bandwidth_db=_getBandwidthDb(eff_bandwidth),
+                           losses=(db_loss, IN_BAND_INSERTION_LOSS))
 
 
 def getFssMaskLoss(cbsd_grant, constraint):
@@ -425,6 +552,13 @@ def computeInterferenceFssBlocking(cbsd_grant, constraint, fss_info, max_eirp):
   Returns:
     The interference contribution(dBm).
   """
+  return getInterferenceFromTerms(
+      max_eirp, cbsd_grant.antenna_gain,
+      _getInterferenceTermsFssBlocking(cbsd_grant, constraint, fss_info))
+
+
+def _getInterferenceTermsFssBlocking(cbsd_grant, constraint, fss_info):
+  """Returns the |InterferenceTerms| of `computeInterferenceFssBlocking`."""
   # Get the propagation loss and incident angles for FSS entity
   # blocking channels
   db_loss, incidence_angles, _ = wf_itm.CalcItmPropagationLoss(
@@ -454,12 +588,9 @@ def computeInterferenceFssBlocking(cbsd_grant, constraint, fss_info, max_eirp):
                    - cbsd_grant.low_frequency)
   if eff_bandwidth <= 0:
     raise ValueError('Computing FSS blocking on grant fully inside FSS passband')
-  eirp = getEffectiveSystemEirp(max_eirp, cbsd_grant.antenna_gain,
-                                effective_ant_gain, eff_bandwidth)
-  # Calculate the interference contribution
-  interference = eirp - getFssMaskLoss(cbsd_grant, constraint) - db_loss
-
-  return interference
+  return InterferenceTerms(effective_ant_gain=effective_ant_gain,
+                           bandwidth_db=_getBandwidthDb(eff_bandwidth),
+                           losses=(getFssMaskLoss(cbsd_grant, constraint), db_loss))
 
 
 def getEffectiveSystemEirp(max_eirp, cbsd_max_ant_gain, effective_ant_gain,
@@ -480,11 +611,63 @@ def getEffectiveSystemEirp(max_eirp, cbsd_max_ant_gain, effective_ant_gain,
   """
 
   eirp_cbsd = ((max_eirp - cbsd_max_ant_gain) + effective_ant_gain +
-               linearToDb(reference_bandwidth / MHZ))
+               _getBandwidthDb(reference_bandwidth))
 
   return eirp_cbsd
 
 
+def _getBandwidthDb(reference_bandwidth):
+  """Returns the bandwidth correction of the effective EIRP (dB)."""
+  return linearToDb(reference_bandwidth / MHZ)
+
+
+def getInterferenceFromTerms(eirp, cbsd_max_ant_gain, terms):
+  """Calculates the interference caused by a grant from its interference terms.
+
+  The result is exactly the one of `computeInterference` for the same EIRP:
+  the terms are combined in the same order.
+
+  Args:
+    eirp: The EIRP of the grant, or a ndarray of EIRPs.
+    cbsd_max_ant_gain: The nominal antenna gain of the CBSD.
+    terms: The |InterferenceTerms| of the grant, as returned by
+      `computeInterferenceTerms`. Its fields can also be ndarrays, in which
+      case all the `losses` shall have the same number of elements.
+  Returns:
+    The interference (dBm), with the broadcast shape of the inputs.
+  """
+  interference = ((eirp - cbsd_max_ant_gain) + terms.effective_ant_gain +
+                  terms.bandwidth_db)
+  for loss in terms.losses:
+    interference = interference - loss
+  return interference
+
+
+def computeInterferenceTerms(grant, constraint,
+                             fss_info=None, esc_antenna_info=None,
+                             region_type=None):
+  """Calculates the terms of the interference caused by a grant.
+
+  The interference is linear in the grant EIRP: the terms do not depend on
+  the EIRP, so that they can be computed only once for evaluating the
+  interference at several EIRPs (see `getInterferenceFromTerms`).
+
+  Args:
+    Same as `computeInterference`, without the EIRP.
+  Returns:
+    The |InterferenceTerms| of the interference caused by the grant.
+  """
+  if constraint.entity_type is data.ProtectedEntityType.FSS_CO_CHANNEL:
+    return _getInterferenceTermsFssCochannel(grant, constraint, fss_info)
+  elif constraint.entity_type is data.ProtectedEntityType.FSS_BLOCKING:
+    return _getInterferenceTermsFssBlocking(grant, constraint, fss_info)
+  elif constraint.entity_type is data.ProtectedEntityType.ESC:
+    return _getInterferenceTermsEsc(grant, constraint, esc_antenna_info)
+  else:
+    return _getInterferenceTermsPpaGwpzPoint(grant, constraint, GWPZ_PPA_HEIGHT,
+                                             region_type)
+
+
 def computeInterference(grant, eirp, constraint,
                         fss_info=None, esc_antenna_info=None, region_type=None):
   """Calculates interference caused by a grant.
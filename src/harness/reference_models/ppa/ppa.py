@@ -16,6 +16,7 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import functools
 import json
 import logging
 
@@ -39,27 +40,21 @@ MAX_ALLOWABLE_EIRP_PER_10_MHZ_CAT_A = 30.
 MAX_ALLOWABLE_EIRP_PER_10_MHZ_CAT_B = 47.
 
 
-def _CalculateDbLossForEachPointAndGetContour(install_param, eirp_capability, antenna_gain,
-                                              cbsd_region_type, latitudes, longitudes):
+def _CalculateContourDistances(install_param, eirp_capability, antenna_gains,
+                               db_losses):
   """Returns Vertex Point Distance for each azimuth with signal strength greater
-  than or equal to Threshold"""
-  db_loss = np.zeros(len(latitudes), dtype=np.float64)
-  lat_cbsd, lon_cbsd  = install_param['latitude'], install_param['longitude']
-  height_cbsd = install_param['height']
-  for index, lat_lon in enumerate(zip(latitudes, longitudes)):
-    lat, lon = lat_lon
-    db_loss[index] = wf_hybrid.CalcHybridPropagationLoss(
-        lat_cbsd, lon_cbsd, height_cbsd,
-        lat, lon, RX_HEIGHT,
-        cbsd_indoor=install_param['indoorDeployment'],
-        reliability=0.5,
-        region=cbsd_region_type,
-        is_height_cbsd_amsl=(install_param['heightType'] == 'AMSL')).db_loss
-
-  index_cond, = np.where(
-    (eirp_capability - install_param['antennaGain'] + antenna_gain) - db_loss
-    >= THRESHOLD_PER_10MHZ)
-  return index_cond.shape[0] * 0.2
+  than or equal to Threshold.
+
+  Inputs:
+    install_param: The CBSD installation parameters.
+    eirp_capability: The CBSD EIRP capability (dBm/10MHz).
+    antenna_gains: A ndarray of the CBSD antenna gains per azimuth (dBi).
+    db_losses: A ndarray of the path losses per azimuth and distance, as
+      a matrix of shape (num_azimuths, num_distances).
+  """
+  signals = ((eirp_capability - install_param['antennaGain']
+              + np.asarray(antenna_gains)[:, np.newaxis]) - db_losses)
+  return np.sum(signals >= THRESHOLD_PER_10MHZ, axis=1) * 0.2
 
 
 def _HammingFilter(x, window_len=15):
@@ -70,8 +65,16 @@ def _HammingFilter(x, window_len=15):
   return y
 
 
-def _GetPolygon(device):
-  """Returns the PPA contour for a single CBSD device, as a shapely polygon."""
+def _GetPolygon(device, use_radials=False):
+  """Returns the PPA contour for a single CBSD device, as a shapely polygon.
+
+  Inputs:
+    device: A CBSD record (schema |CbsdRecordData|).
+    use_radials: If True, the path losses are computed with the faster
+      `wf_hybrid.CalcHybridPropagationLossRadials`, which derives the terrain
+      profiles from a single high resolution terrain radial per azimuth. The
+      resulting contour may slightly differ from the reference one.
+  """
   install_param = device['installationParam']
   eirp_capability = install_param.get('eirpCapability',
                                       MAX_ALLOWABLE_EIRP_PER_10_MHZ_CAT_A
@@ -81,12 +84,6 @@ def _GetPolygon(device):
   # Compute all the Points in 0-359 every 200m up to 40km
   distances = np.arange(0.2, 40.1, 0.2)
   azimuths = np.arange(0.0, 360.0)
-  latitudes, longitudes, _ = list(
-      zip(*[
-          vincenty.GeodesicPoints(install_param['latitude'],
-                                  install_param['longitude'], distances,
-                                  azimuth) for azimuth in azimuths
-      ]))
   # Compute the Gain for all Direction
   # Note: some parameters are optional for catA, so falling back to None (omni) then
   antenna_gains = antenna.GetStandardAntennaGains(
@@ -98,16 +95,37 @@ def _GetPolygon(device):
   cbsd_region_code = drive.nlcd_driver.GetLandCoverCodes(install_param['latitude'],
                                                          install_param['longitude'])
   cbsd_region_type = nlcd.GetRegionType(cbsd_region_code)
-  # Compute the Path Loss, and contour based on Gain and Path Loss Comparing with Threshold
+  if use_radials:
+    # Compute the Path Loss along all radials, using one terrain radial per azimuth
+    db_losses = wf_hybrid.CalcHybridPropagationLossRadials(
+        install_param['latitude'], install_param['longitude'],
+        install_param['height'],
+        azimuths, distances, RX_HEIGHT,
+        cbsd_indoor=install_param['indoorDeployment'],
+        reliability=0.5,
+        region=cbsd_region_type,
+        is_height_cbsd_amsl=(install_param['heightType'] == 'AMSL')).db_loss
+  else:
+    # Compute the Path Loss for each point
+    db_losses = np.zeros((len(azimuths), len(distances)), dtype=np.float64)
+    for i, azimuth in enumerate(azimuths):
+      latitudes, longitudes, _ = vincenty.GeodesicPoints(
+          install_param['latitude'], install_param['longitude'],
+          distances, azimuth)
+      for j, (lat, lon) in enumerate(zip(latitudes, longitudes)):
+        db_losses[i, j] = wf_hybrid.CalcHybridPropagationLoss(
+            install_param['latitude'], install_param['longitude'],
+            install_param['height'],
+            lat, lon, RX_HEIGHT,
+            cbsd_indoor=install_param['indoorDeployment'],
+            reliability=0.5,
+            region=cbsd_region_type,
+            is_height_cbsd_amsl=(install_param['heightType'] == 'AMSL')).db_loss
+  # Compute the contour based on Gain and Path Loss Comparing with Threshold
   # Smoothing Contour using Hamming Filter
   contour_dists_km = _HammingFilter(
-      [_CalculateDbLossForEachPointAndGetContour(install_param,
-                                                 eirp_capability, ant_gain,
-                                                 cbsd_region_type,
-                                                 radial_lats, radial_lons)
-       for radial_lats, radial_lons, ant_gain in zip(latitudes,
-                                                     longitudes,
-                                                     antenna_gains)])
+      _CalculateContourDistances(install_param, eirp_capability,
+                                 antenna_gains, db_losses))
   # Generating lat, lon for Contour
   contour_lats, contour_lons, _ = list(
       zip(*[
@@ -131,11 +149,13 @@ def _ClipPpaByCounty(contour_union, pal_records):
   return contour_union.intersection(counties_union)
 
 
-def PpaCreationModel(devices, pal_records):
+def PpaCreationModel(devices, pal_records, use_radials=False):
   """Creates a PPA Polygon based on the PAL Records and Device Information
   Args:
     devices: A list of CBSD records (schema |CbsdRecordData|).
     pal_records: A list of pal records.
+    use_radials: If True, uses the faster radial propagation engine, which
+      may give slightly different contours (see `_GetPolygon`).
   Returns:
     The PPA polygon in GeoJSON format (string).
   """
@@ -149,7 +169,8 @@ def PpaCreationModel(devices, pal_records):
 
   # Create Contour for each CBSD
   pool = mpool.Pool()
-  device_polygon = pool.map(_GetPolygon, devices)
+  device_polygon = pool.map(
+      functools.partial(_GetPolygon, use_radials=use_radials), devices)
 
   # Create Union of all the CBSD Contours and Check for hole
   # after County Clipping
@@ -60,9 +60,11 @@ class TestPpa(unittest.TestCase):
 
   def setUp(self):
     self.original_hybrid = wf_hybrid.CalcHybridPropagationLoss
+    self.original_hybrid_radials = wf_hybrid.CalcHybridPropagationLossRadials
 
   def tearDown(self):
     wf_hybrid.CalcHybridPropagationLoss = self.original_hybrid
+    wf_hybrid.CalcHybridPropagationLossRadials = self.original_hybrid_radials
 
   def assertAlmostSamePolygon(self, poly1, poly2, tol_km2=0.001):
     self.assertTrue(utils.GeometryArea(poly1.difference(poly2)) < tol_km2)
@@ -87,6 +89,26 @@ class TestPpa(unittest.TestCase):
     self.assertAlmostSamePolygon(
         utils.ToShapely(ppa_zone), expected_ppa, 0.001)
 
+  def test_SimplePpaCircleRadials(self):
+    # Configuring for -96dBm circle at 16km includes
+    wf_hybrid.CalcHybridPropagationLossRadials = testutils.FakeRadialPropagationPredictor(
+        dist_type='REAL', factor=1.0, offset=(96+30-0.1) - 16.0)
+    expected_ppa = sgeo.Polygon([
+        vincenty.GeodesicPoint(
+            TestPpa.devices[0]['installationParam']['latitude'],
+            TestPpa.devices[0]['installationParam']['longitude'],
+            dist_km=16.0,
+            bearing=angle)[1::-1]  # reverse to lng,lat
+        for angle in range(360)
+    ])
+
+    ppa_zone = ppa.PpaCreationModel(TestPpa.devices[0:1], TestPpa.pal_records[0:1],
+                                    use_radials=True)
+    ppa_zone = json.loads(ppa_zone)
+
+    self.assertAlmostSamePolygon(
+        utils.ToShapely(ppa_zone), expected_ppa, 0.001)
+
   def test_ClippedPpaByCounty(self):
     # Configuring for -96dBm circle above 40km
     wf_hybrid.CalcHybridPropagationLoss = testutils.FakePropagationPredictor(
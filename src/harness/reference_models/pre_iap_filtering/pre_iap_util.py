@@ -140,19 +140,15 @@ def getFssNeighboringCbsdsWithGrants(cbsds, fss_point,
     fss_point: A tuple (longitude, latitude) of the FSS location.
     distance_km: The neighboring distance (km).
   """
-  neighboring_cbsds_with_grants = []
-  for cbsd in cbsds:
-    if not cbsd['grants']:
-      continue
-    distance, _, _ = vincenty.GeodesicDistanceBearing(
-        fss_point[1],
-        fss_point[0],
-        cbsd['registration']['installationParam']['latitude'],
-        cbsd['registration']['installationParam']['longitude'])
-    # Get the list of cbsds that are within 150kms from the FSS entity
-    if distance <= distance_km and cbsd['grants']:
-      neighboring_cbsds_with_grants.append(cbsd)
-  return neighboring_cbsds_with_grants
+  cbsds = [cbsd for cbsd in cbsds if cbsd['grants']]
+  distances, _, _ = vincenty.GeodesicDistanceBearingArrays(
+      fss_point[1],
+      fss_point[0],
+      [cbsd['registration']['installationParam']['latitude'] for cbsd in cbsds],
+      [cbsd['registration']['installationParam']['longitude'] for cbsd in cbsds])
+  # Get the list of cbsds that are within 150kms from the FSS entity
+  return [cbsd for cbsd, distance in zip(cbsds, distances)
+          if distance <= distance_km]
 
 
 def getFssNeighboringGwbl(gwbl_records, fss_records):
@@ -20,6 +20,8 @@ from __future__ import print_function
 
 import math
 
+import numpy as np
+
 try:
   from reference_models.propagation.ehata import ehata_its
 except:
@@ -54,6 +56,37 @@ def ExtendedHata(its_elev, freq_mhz, height_tx, height_rx, region_code):
   return ehata_its.ExtendedHata(its_elev, freq_mhz, height_tx, height_rx, region_code)
 
 
+def ExtendedHataBatch(its_elevs, freq_mhz, heights_tx, height_rx, region_code):
+  """Computes the E-Hata propagation path loss over many paths in one call.
+
+  This is the batch version of `ExtendedHata`: all the paths are processed by a
+  single call to the E-Hata extension module, avoiding the per path Python
+  overhead.
+
+  Inputs:
+    its_elevs: Terrain profiles in ITS format as a 2D array, one profile per
+               row (see `ExtendedHata`). Rows can be padded beyond the profile
+               points, for example as returned by
+               |terrain.TerrainDriver.TerrainProfiles|.
+    freq_mhz:  frequency (MHz).
+    heights_tx: heights of transmitters (meters), scalar or one per path.
+    height_rx: height of receiver (meters).
+    region_code: environment code (see `ExtendedHata`).
+
+  Returns:
+    the path losses in dB, as a ndarray.
+  """
+  its_elevs = np.ascontiguousarray(np.atleast_2d(its_elevs), dtype=np.float64)
+  num_paths, profile_size = its_elevs.shape
+  heights_tx = np.ascontiguousarray(
+      np.broadcast_to(heights_tx, (num_paths,)), dtype=np.float64)
+  db_loss = np.zeros(num_paths)
+  ehata_its.ExtendedHataBatch(num_paths, profile_size, its_elevs,
+                              freq_mhz, heights_tx, height_rx, region_code,
+                              db_loss)
+  return db_loss
+
+
 def MedianBasicPropLoss(freq_mhz, height_tx, height_rx, dist_km, region_code):
   """Computes the Median Basic propagation loss.
 
@@ -109,3 +142,51 @@ def CbsdEffectiveHeights(height_cbsd, its_elev):
     eff_height = 20
 
   return eff_height
+
+
+def CbsdEffectiveHeightsBatch(heights_cbsd, its_elevs):
+  """Get the CBSD effective heights 'h_b' of many paths.
+
+  Vectorized version of `CbsdEffectiveHeights`, giving identical results.
+
+  Inputs:
+    heights_cbsd: heights of the CBSD above terrain (meters), scalar or one
+                  per path.
+    its_elevs:  terrain profiles in ITS format as a 2D array, one profile per
+                row (padded beyond the profile points).
+
+  Returns:
+    the CBSD effective heights as a ndarray.
+  """
+  its_elevs = np.atleast_2d(np.asarray(its_elevs, dtype=float))
+  num_paths = its_elevs.shape[0]
+  eff_heights = np.array(np.broadcast_to(heights_cbsd, (num_paths,)),
+                         dtype=float)
+  npts = its_elevs[:, 0].astype(int)
+  xi = its_elevs[:, 1] / 1000.   # step size of the profile points, in km
+  dist_km = npts * xi
+
+  idxs = np.where(dist_km >= 3.0)[0]
+  if len(idxs):
+    xi = xi[idxs]
+    dist_km = dist_km[idxs]
+    i_start = 2 + np.ceil(3.0 / xi).astype(int)
+    i_end = npts[idxs] + 2
+    is_over15km = dist_km > 15
+    i_end[is_over15km] = 2 + np.floor(15.0 / xi[is_over15km]).astype(int)
+    dist_km[is_over15km] = 15.0
+
+    # Sum along the first axis of a transposed masked profile array, so that
+    # the elevations are accumulated in sequence, as in the scalar version.
+    num_cols = min(np.max(i_end) + 1, its_elevs.shape[1])
+    cols = np.arange(num_cols)
+    in_range = ((cols >= i_start[:, np.newaxis]) &
+                (cols <= i_end[:, np.newaxis]))
+    sum_heights = np.ascontiguousarray(
+        np.where(in_range, its_elevs[idxs, :num_cols], 0.).T).sum(axis=0)
+    avg_height = sum_heights / (i_end - i_start + 1).astype(float)
+    eff_heights[idxs] += ((dist_km - 3.0) / 12.0 *
+                          (its_elevs[idxs, 2] - avg_height))
+
+  eff_heights[eff_heights < 20] = 20
+  return eff_heights
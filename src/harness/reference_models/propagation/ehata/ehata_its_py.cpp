@@ -13,6 +13,7 @@
 // limitations under the License.
 
 #include <Python.h>
+#include <cstring>
 #include <iostream>
 
 #include "its/ehata.h"
@@ -120,6 +121,99 @@ static PyObject* MedianBasicPropLoss(PyObject* self, PyObject* args) {
 
 }
 
+// Gets a C-contiguous float64 buffer of an object, with at least min_size
+// elements. On failure, sets the Python error and returns false.
+static bool GetDoubleBuffer(PyObject* obj, Py_buffer* view, bool writable,
+                            Py_ssize_t min_size, const char* name) {
+  int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+  if (writable) flags |= PyBUF_WRITABLE;
+  if (PyObject_GetBuffer(obj, view, flags) != 0) {
+    return false;
+  }
+  if (view->itemsize != sizeof(double) || view->format == NULL ||
+      strcmp(view->format, "d") != 0) {
+    PyBuffer_Release(view);
+    PyErr_Format(PyExc_ValueError, "%s should be a contiguous float64 buffer.", name);
+    return false;
+  }
+  if (view->len / (Py_ssize_t)sizeof(double) < min_size) {
+    PyBuffer_Release(view);
+    PyErr_Format(PyExc_ValueError, "%s buffer too small.", name);
+    return false;
+  }
+  return true;
+}
+
+static PyObject* ExtendedHataBatch(PyObject* self, PyObject* args) {
+  PyObject* elevs_obj = NULL;
+  PyObject* hb_obj = NULL;
+  PyObject* loss_obj = NULL;
+  int num_paths, profile_size;
+  double frq_mhz;
+  double hm_m;
+  int environment;
+  if (!PyArg_ParseTuple(args, "iiOdOdiO:ehata_its_ExtendedHataBatch",
+                        &num_paths, &profile_size, &elevs_obj,
+                        &frq_mhz, &hb_obj, &hm_m, &environment, &loss_obj)) {
+    return NULL;
+  }
+  if (num_paths < 0 || profile_size < 4) {
+    PyErr_SetString(PyExc_ValueError, "Invalid profile size. Should be >= 4.");
+    return NULL;
+  }
+
+  // Get all the input and output buffers
+  const int kNumBuffers = 3;
+  PyObject* objs[kNumBuffers] = {elevs_obj, hb_obj, loss_obj};
+  const char* names[kNumBuffers] = {"Profiles", "Tx heights", "Losses"};
+  Py_ssize_t sizes[kNumBuffers] = {
+    (Py_ssize_t)num_paths * profile_size, num_paths, num_paths};
+  Py_buffer views[kNumBuffers];
+  int num_views = 0;
+  for (; num_views < kNumBuffers; num_views++) {
+    if (!GetDoubleBuffer(objs[num_views], &views[num_views], num_views >= 2,
+                         sizes[num_views], names[num_views])) {
+      break;
+    }
+  }
+  if (num_views < kNumBuffers) {
+    for (int i = 0; i < num_views; i++) PyBuffer_Release(&views[i]);
+    return NULL;
+  }
+  const double* elevs = (const double*)views[0].buf;
+  const double* hb_m = (const double*)views[1].buf;
+  double* db_losses = (double*)views[2].buf;
+
+  // Run the E-Hata over all paths, with the profiles reversed from Rx to Tx
+  // as in `ExtendedHata`.
+  double* elev = new double[profile_size];
+  bool valid = true;
+  for (int k = 0; k < num_paths; k++) {
+    const double* path_elev = elevs + (Py_ssize_t)k * profile_size;
+    if (path_elev[0] < 1 || path_elev[0] > profile_size-3) {
+      valid = false;
+      break;
+    }
+    int size = (int)path_elev[0] + 3;
+    elev[0] = path_elev[0];
+    elev[1] = path_elev[1];
+    for (int i = 2; i < size; i++) {
+      elev[i] = path_elev[size+1-i];
+    }
+    InterValues dbg_vals;
+    ExtendedHata_DBG(elev, frq_mhz, hb_m[k], hm_m, environment,
+                     db_losses + k, &dbg_vals);
+  }
+  delete[] elev;
+  for (int i = 0; i < kNumBuffers; i++) PyBuffer_Release(&views[i]);
+
+  if (!valid) {
+    PyErr_SetString(PyExc_ValueError, "Invalid Profile. Size in slot 0 bigger than actual profile size.");
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
 static PyObject* SetWinnForumExtensions(PyObject* self, PyObject* args) {
 
   PyObject *val = NULL;
@@ -138,6 +232,7 @@ static PyObject* SetWinnForumExtensions(PyObject* self, PyObject* args) {
 static PyMethodDef EHATAMethods[] = {
   {"ExtendedHata", ExtendedHata, METH_VARARGS, "eHata Point-to-point model"},
   {"MedianBasicPropLoss", MedianBasicPropLoss, METH_VARARGS, "Median Basic propagation loss"},
+  {"ExtendedHataBatch", ExtendedHataBatch, METH_VARARGS, "eHata Point-to-point model over many paths"},
   {"SetWinnForumExtensions", SetWinnForumExtensions, METH_VARARGS, "Set WinnForum Extensions"},
   {NULL, NULL, 0, NULL}
 };
@@ -82,6 +82,24 @@ class TestEHata(unittest.TestCase):
       #print("%s: %f vs %f" % (scenario, ploss, exp_ploss))
       self.assertAlmostEqual(ploss, exp_ploss, 4)
 
+  def test_batch_vs_single(self):
+    profiles = [ReadProfileFile(os.path.join(
+        self.test_profile_dir, test[self.columns.index('pfl file name')]))[0]
+                for test in self.tests]
+    its_elevs = np.zeros((len(profiles), max(len(p) for p in profiles)))
+    for k, profile in enumerate(profiles):
+      its_elevs[k, :len(profile)] = profile
+    heights = np.linspace(10, 250, len(profiles))
+    for env_code in [22, 23]:
+      losses = ehata.ExtendedHataBatch(its_elevs, 3625., heights, 1.5, env_code)
+      for k, profile in enumerate(profiles):
+        self.assertEqual(losses[k], ehata.ExtendedHata(profile, 3625., heights[k],
+                                                       1.5, env_code))
+    eff_heights = ehata.CbsdEffectiveHeightsBatch(heights, its_elevs)
+    for k, profile in enumerate(profiles):
+      self.assertEqual(eff_heights[k],
+                       ehata.CbsdEffectiveHeights(heights[k], profile))
+
   def test_eff_height_within3km(self):
     profile = [4, 500, 1, 2, 3, 4, 5]
     eff_tx_m = ehata.CbsdEffectiveHeights(50, profile)
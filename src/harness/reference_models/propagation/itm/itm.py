@@ -103,3 +103,72 @@ def point_to_point(its_elev, height_tx, height_rx,
                                        freq_mhz, climate, polarization,
                                        confidence, reliabilities,
                                        mdvar, refract_is_final)
+
+
+def point_to_point_batch(its_elevs, heights_tx, heights_rx,
+                         dielectric, conductivity,
+                         refractivities, freq_mhz,
+                         climates, polarization,
+                         confidence, reliabilities,
+                         mdvar=12, refract_is_final=False):
+  """Computes the ITM propagation path loss over many paths in one call.
+
+  This is the batch version of `point_to_point`: all the paths are processed
+  by a single call to the ITM extension module, avoiding the per path Python
+  overhead.
+
+  Inputs:
+    its_elevs:  Terrain profiles in ITS format as a 2D array, one profile per
+                row (see `point_to_point`). Rows can be padded beyond the
+                profile points, for example as returned by
+                |terrain.TerrainDriver.TerrainProfiles|.
+    heights_tx: Heights of transmitters (meters), one per path.
+    heights_rx: Heights of receivers (meters), one per path.
+    dielectric: Dielectric constant (relative permittivity) of the ground.
+    conductivity: Conductivity of the ground (S/m).
+    refractivities: Refractivities of the atmosphere, one per path.
+    freq_mhz:   Frequency (MHz).
+    climates:   Climate codes, one per path (see `point_to_point`).
+    polarization: Signal polarization (0: horizontal, 1: vertical).
+    confidence: Confidence factor [0.01..0.99].
+    reliabilities: Reliability factor [0.001..0.999], as a scalar or a sequence.
+    mdvar:      Mode of variability.
+    refract_is_final: boolean - If True, do not correct the refractivity
+                      with average altitude.
+
+  Returns:
+     a tuple of ndarray:
+       path_loss: the path losses in dB, as a matrix of shape
+                  (num_paths, num_reliabilities), or a vector of size num_paths
+                  if `reliabilities` is a scalar.
+       ver_cbsd: the vertical departure angles at CBSD.
+       ver_rx: the vertical incidence angles at Rx.
+       err_num:  the 'error' codes (see `point_to_point`).
+  """
+  its_elevs = np.ascontiguousarray(np.atleast_2d(its_elevs), dtype=np.float64)
+  num_paths, profile_size = its_elevs.shape
+  heights_tx = np.ascontiguousarray(
+      np.broadcast_to(heights_tx, (num_paths,)), dtype=np.float64)
+  heights_rx = np.ascontiguousarray(
+      np.broadcast_to(heights_rx, (num_paths,)), dtype=np.float64)
+  refractivities = np.ascontiguousarray(
+      np.broadcast_to(refractivities, (num_paths,)), dtype=np.float64)
+  climates = np.ascontiguousarray(
+      np.broadcast_to(climates, (num_paths,)), dtype=np.float64)
+  is_scalar_rel = np.isscalar(reliabilities)
+  reliabilities = [float(rel) for rel in np.atleast_1d(reliabilities)]
+
+  path_loss = np.zeros((num_paths, len(reliabilities)))
+  ver_cbsd = np.zeros(num_paths)
+  ver_rx = np.zeros(num_paths)
+  err_num = np.zeros(num_paths)
+  itm_its.point_to_point_batch(num_paths, profile_size, its_elevs,
+                               heights_tx, heights_rx,
+                               dielectric, conductivity, refractivities,
+                               freq_mhz, climates, polarization,
+                               confidence, reliabilities,
+                               path_loss, ver_cbsd, ver_rx, err_num,
+                               mdvar, refract_is_final)
+  if is_scalar_rel:
+    path_loss = path_loss[:, 0]
+  return path_loss, ver_cbsd, ver_rx, err_num.astype(int)
@@ -13,6 +13,7 @@
 // limitations under the License.
 
 #include <Python.h>
+#include <cstring>
 #include <iostream>
 
 #include "its/itm.h"
@@ -163,9 +164,148 @@ static PyObject* itm_point_to_point_rels(PyObject* self, PyObject* args) {
   return Py_BuildValue("Nddsi", loss_obj, ver0, ver1, strmode, errnum);
 }
 
+// Gets a C-contiguous buffer of doubles from a Python object supporting
+// the buffer protocol (for example a float64 numpy array).
+static bool GetDoubleBuffer(PyObject* obj, Py_buffer* view, bool writable,
+                            Py_ssize_t min_size, const char* name) {
+  int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+  if (writable) flags |= PyBUF_WRITABLE;
+  if (PyObject_GetBuffer(obj, view, flags) != 0) {
+    return false;
+  }
+  if (view->itemsize != sizeof(double) || view->format == NULL ||
+      strcmp(view->format, "d") != 0) {
+    PyBuffer_Release(view);
+    PyErr_Format(PyExc_ValueError, "%s should be a contiguous float64 buffer.", name);
+    return false;
+  }
+  if (view->len / (Py_ssize_t)sizeof(double) < min_size) {
+    PyBuffer_Release(view);
+    PyErr_Format(PyExc_ValueError, "%s buffer too small.", name);
+    return false;
+  }
+  return true;
+}
+
+static PyObject* itm_point_to_point_batch(PyObject* self, PyObject* args) {
+  PyObject* elevs_obj = NULL;
+  PyObject* tht_obj = NULL;
+  PyObject* rht_obj = NULL;
+  PyObject* eno_obj = NULL;
+  PyObject* climate_obj = NULL;
+  PyObject* rels_obj = NULL;
+  PyObject* loss_obj = NULL;
+  PyObject* ver0_obj = NULL;
+  PyObject* ver1_obj = NULL;
+  PyObject* err_obj = NULL;
+  double eps_dielect, sgm_conductivity;
+  double frq_mhz;
+  int pol;
+  double conf;
+  int num_paths, profile_size;
+  int mdvar = 12;  // Default arguments
+  int eno_final = 0;
+  if (!PyArg_ParseTuple(args, "iiOOOddOdOidOOOOO|ii:point_to_point_batch",
+                        &num_paths, &profile_size,
+                        &elevs_obj, &tht_obj, &rht_obj,
+                        &eps_dielect, &sgm_conductivity, &eno_obj,
+                        &frq_mhz, &climate_obj, &pol, &conf, &rels_obj,
+                        &loss_obj, &ver0_obj, &ver1_obj, &err_obj,
+                        &mdvar, &eno_final)) {
+    return NULL;
+  }
+  if (num_paths < 0 || profile_size < 4) {
+    PyErr_SetString(PyExc_ValueError, "Invalid profile size. Should be >= 4.");
+    return NULL;
+  }
+  if (!PyList_Check(rels_obj)) {
+    return NULL;
+  }
+
+  // Get the reliability list
+  Py_ssize_t num_rels = PyList_Size(rels_obj);
+  if (num_rels <= 0) {
+    PyErr_SetString(PyExc_ValueError, "Reliabilities list empty.");
+    return NULL;
+  }
+  double* rels = new double[num_rels];
+  for (Py_ssize_t i = 0; i < num_rels; i++) {
+    rels[i] = PyFloat_AsDouble(PyList_GetItem(rels_obj, i));
+  }
+  if (PyErr_Occurred()) {
+    delete[] rels;
+    PyErr_SetString(PyExc_ValueError, "Reliabilities list should only contain numerical values.");
+    return NULL;
+  }
+
+  // Get all the input and output buffers
+  const int kNumBuffers = 9;
+  PyObject* objs[kNumBuffers] = {elevs_obj, tht_obj, rht_obj, eno_obj, climate_obj,
+                                 loss_obj, ver0_obj, ver1_obj, err_obj};
+  const char* names[kNumBuffers] = {"Profiles", "Tx heights", "Rx heights",
+                                    "Refractivities", "Climates",
+                                    "Losses", "Tx angles", "Rx angles", "Errors"};
+  Py_ssize_t sizes[kNumBuffers] = {
+    (Py_ssize_t)num_paths * profile_size, num_paths, num_paths, num_paths, num_paths,
+    (Py_ssize_t)num_paths * num_rels, num_paths, num_paths, num_paths};
+  Py_buffer views[kNumBuffers];
+  int num_views = 0;
+  for (; num_views < kNumBuffers; num_views++) {
+    if (!GetDoubleBuffer(objs[num_views], &views[num_views], num_views >= 5,
+                         sizes[num_views], names[num_views])) {
+      break;
+    }
+  }
+  if (num_views < kNumBuffers) {
+    for (int i = 0; i < num_views; i++) PyBuffer_Release(&views[i]);
+    delete[] rels;
+    return NULL;
+  }
+  const double* elevs = (const double*)views[0].buf;
+  const double* tht_m = (const double*)views[1].buf;
+  const double* rht_m = (const double*)views[2].buf;
+  const double* eno_ns_surfref = (const double*)views[3].buf;
+  const double* climates = (const double*)views[4].buf;
+  double* db_losses = (double*)views[5].buf;
+  double* ver0 = (double*)views[6].buf;
+  double* ver1 = (double*)views[7].buf;
+  double* errnums = (double*)views[8].buf;
+
+  // Run the ITM over all paths
+  double* elev = new double[profile_size];
+  char strmode[100];
+  bool valid = true;
+  for (int k = 0; k < num_paths; k++) {
+    const double* path_elev = elevs + (Py_ssize_t)k * profile_size;
+    if (path_elev[0] > profile_size-3) {
+      valid = false;
+      break;
+    }
+    memcpy(elev, path_elev, profile_size * sizeof(double));
+    int errnum;
+    point_to_point_rels(elev, tht_m[k], rht_m[k], eps_dielect, sgm_conductivity,
+                        eno_ns_surfref[k], frq_mhz, (int)climates[k], pol, conf,
+                        rels, num_rels,
+                        mdvar, !!eno_final,
+                        db_losses + (Py_ssize_t)k * num_rels, strmode, errnum,
+                        ver0[k], ver1[k]);
+    errnums[k] = errnum;
+  }
+  delete[] elev;
+  delete[] rels;
+  for (int i = 0; i < kNumBuffers; i++) PyBuffer_Release(&views[i]);
+
+  if (!valid) {
+    PyErr_SetString(PyExc_ValueError, "Invalid Profile. Size in slot 0 bigger than actual profile size.");
+    return NULL;
+  }
+  Py_RETURN_NONE;
+}
+
 static PyMethodDef ITMMethods[] = {
   {"point_to_point", itm_point_to_point, METH_VARARGS, "Point-to-point model"},
   {"point_to_point_rels", itm_point_to_point_rels, METH_VARARGS, "Point-to-point-Rels model"},
+  {"point_to_point_batch", itm_point_to_point_batch, METH_VARARGS, "Point-to-point model over many paths"},
   {NULL, NULL, 0, NULL}
 };
 
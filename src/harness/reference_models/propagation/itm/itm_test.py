@@ -290,6 +290,65 @@ class TestItm(unittest.TestCase):
                                       confidence, rel)
       self.assertEqual(loss, exp_loss)
 
+  def test_batch(self):
+    frequency = 573.3
+    refractivity = 314.0  # Typical
+    dielectric = 15  # Typical for ground
+    conductivity = 0.005  # Typical for ground
+    polarization = 0  # Vertical
+    confidence = 0.5
+    # Build several paths by truncating the profile, with padded rows.
+    num_points = [PROFILE[0] + 1, 100, 50, 2]
+    heights1 = [194.0, 100., 50., 10.]
+    heights2 = [9.1, 20., 1.5, 3.]
+    climates = [5, 1, 7, 3]
+    refractivities = [refractivity, 300., 320., 350.]
+    profiles = np.zeros((len(num_points), PROFILE[0] + 3))
+    for k, npts in enumerate(num_points):
+      profiles[k, :npts+2] = [npts - 1, PROFILE[1]] + PROFILE[2:npts+2]
+    reliabilities = [0.01, 0.5, 0.95]
+
+    losses, v0s, v1s, errs = itm.point_to_point_batch(
+        profiles, heights1, heights2,
+        dielectric, conductivity, refractivities,
+        frequency, climates, polarization,
+        confidence, reliabilities, 13)
+    self.assertEqual(losses.shape, (len(num_points), len(reliabilities)))
+    for k, npts in enumerate(num_points):
+      profile = list(profiles[k, :npts+2])
+      exp_losses, v0, v1, _, err = itm.point_to_point(
+          profile, heights1[k], heights2[k],
+          dielectric, conductivity, refractivities[k],
+          frequency, climates[k], polarization,
+          confidence, reliabilities, 13)
+      self.assertListEqual(list(losses[k]), exp_losses)
+      self.assertEqual(v0s[k], v0)
+      self.assertEqual(v1s[k], v1)
+      self.assertEqual(errs[k], err)
+      exp_loss, _, _, _, _ = itm.point_to_point(
+          profile, heights1[k], heights2[k],
+          dielectric, conductivity, refractivities[k],
+          frequency, climates[k], polarization,
+          confidence, 0.5, 13)
+      self.assertEqual(losses[k, 1], exp_loss)
+
+    # Scalar reliability.
+    losses, _, _, _ = itm.point_to_point_batch(
+        profiles, heights1, heights2,
+        dielectric, conductivity, refractivities,
+        frequency, climates, polarization,
+        confidence, 0.5, 13)
+    self.assertEqual(losses.shape, (len(num_points),))
+
+    # Invalid profile size.
+    profiles[1, 0] = PROFILE[0] + 1
+    with self.assertRaises(ValueError):
+      itm.point_to_point_batch(
+          profiles, heights1, heights2,
+          dielectric, conductivity, refractivities,
+          frequency, climates, polarization,
+          confidence, 0.5, 13)
+
   def test_horizon_angles(self):
     refractivity = 314.
     a0, a1, d0, d1 = _GetHorizonAnglesLegacy(PROFILE, 143.9, 8.5, refractivity)
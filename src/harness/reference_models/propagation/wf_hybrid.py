@@ -31,6 +31,23 @@ Typical usage:
               reliability=0.5,
               freq_mhz=3625.,
               region='URBAN')
+
+  # Get the path losses of many paths at once, for example from all CBSDs
+  # toward a protection point
+  db_losses, incidence_angles, internals = CalcHybridPropagationLossBatch(
+              lat_cbsds, lon_cbsds, height_cbsds,
+              lat_rxs, lon_rxs, height_rx,
+              cbsd_indoors=cbsd_indoors,
+              reliability=-1,
+              region='SUBURBAN')
+
+  # Get the path losses toward points along radials, for example for the
+  # PPA contour, with one terrain radial per azimuth
+  db_losses, incidence_angles, internals = CalcHybridPropagationLossRadials(
+              lat_cbsd, lon_cbsd, height_cbsd,
+              azimuths, dists_km,
+              reliability=0.5,
+              region='URBAN')
 """
 from __future__ import absolute_import
 from __future__ import division
@@ -39,6 +56,8 @@ from __future__ import print_function
 from collections import namedtuple
 import math
 
+import numpy as np
+
 from reference_models.geo import drive
 from reference_models.geo import vincenty
 from reference_models.propagation import wf_itm
@@ -52,6 +71,13 @@ _ALPHA_U = 4.0976291
 _BETA_U = -1.2255656
 _GAMMA_U = 0.68350345
 
+# Terrain profiles parameters, per WinnForum standard
+_PROFILE_RES_METER = 30.
+_PROFILE_MAX_POINTS = 1501
+
+# The eHata environment codes (rural regions use the ITM only)
+_REGION_CODES = {'URBAN': 23, 'SUBURBAN': 22}
+
 
 # Hybrid mode Application Information
 class HybridMode:
@@ -214,8 +240,9 @@ def CalcHybridPropagationLoss(lat_cbsd, lon_cbsd, height_cbsd,
   # standard (bilinear interp; 1501 pts for all distances over 45 km)
   its_elev = drive.terrain_driver.TerrainProfile(lat1=lat_cbsd, lon1=lon_cbsd,
                                                  lat2=lat_rx, lon2=lon_rx,
-                                                 target_res_meter=30.,
-                                                 do_interp=True, max_points=1501)
+                                                 target_res_meter=_PROFILE_RES_METER,
+                                                 do_interp=True,
+                                                 max_points=_PROFILE_MAX_POINTS)
 
   # Structural CBSD and mobile height corrections
   height_cbsd = max(height_cbsd, 20.)
@@ -318,18 +345,480 @@ def CalcHybridPropagationLoss(lat_cbsd, lon_cbsd, height_cbsd,
                         HybridMode.ITM_CORRECTED, cbsd_indoor)
 
 
+def CalcHybridPropagationLossBatch(lat_cbsds, lon_cbsds, height_cbsds,
+                                   lat_rxs, lon_rxs, height_rx=1.5,
+                                   cbsd_indoors=False,
+                                   reliability=-1,
+                                   freq_mhz=3625.,
+                                   region='RURAL',
+                                   is_height_cbsd_amsl=False,
+                                   return_internals=False):
+  """Implements the Hybrid ITM/eHata NTIA propagation model over many paths.
+
+  This is the batch version of `CalcHybridPropagationLoss`, giving the same
+  results up to floating point rounding of the geodesics:
+    - the terrain profiles of all paths are extracted in one batch, with the
+      same path lengths as the single path version (see
+      |terrain.TerrainDriver.TerrainProfiles|),
+    - the ITM and eHata models are run over all paths in single calls to their
+      extension modules,
+    - the hybrid mode of each path is selected with array masks.
+  The eHata correction of the paths beyond 80km, which only depends on the CBSD
+  and the bearing of the path, is computed once for the paths sharing the same
+  CBSD and bearing.
+
+  Inputs:
+    lat_cbsds, lon_cbsds, height_cbsds: Lat/lon (deg) and heights AGL (m) of
+                        CBSDs, one per path (or scalar for the heights).
+    lat_rxs, lon_rxs:   Lat/lon (deg) of Rx points, one per path.
+    height_rx:          Height AGL (m) of Rx points.
+    cbsd_indoors:       CBSD indoor status, scalar or one per path.
+    reliability, freq_mhz, region, is_height_cbsd_amsl:
+                        See `CalcHybridPropagationLoss`.
+    return_internals:   If True, returns internal variables.
+
+  Returns:
+    A namedtuple of:
+      db_loss:          Path Losses in dB, as a ndarray of size num_paths.
+
+      incidence_angles: A namedtuple of ndarray of angles (degrees):
+                          hor_cbsd, ver_cbsd, hor_rx, ver_rx
+                        (see `CalcHybridPropagationLoss`).
+
+      internals:        A dictionary of internal data for advanced analysis
+                        (only if return_internals=True), as ndarray:
+          hybrid_opcode:  Opcode from HybridCode - See GetInfoOnHybridCodes()
+          effective_height_cbsd: Effective CBSD antenna height
+          itm_db_loss:    Loss in dB for the ITM model.
+          itm_err_num:    ITM error code (see wf_itm module).
+          dist_km:        Distance between end points (km)
+
+  Raises:
+    Exception if input parameters invalid or out of range.
+  """
+  lat_cbsds = np.atleast_1d(np.asarray(lat_cbsds, dtype=float))
+  lon_cbsds = np.atleast_1d(np.asarray(lon_cbsds, dtype=float))
+  lat_rxs = np.atleast_1d(np.asarray(lat_rxs, dtype=float))
+  lon_rxs = np.atleast_1d(np.asarray(lon_rxs, dtype=float))
+  num_paths = len(lat_cbsds)
+  height_cbsds = np.array(np.broadcast_to(height_cbsds, (num_paths,)),
+                          dtype=float)
+  cbsd_indoors = np.broadcast_to(cbsd_indoors, (num_paths,)).astype(bool)
+
+  # Sanity checks on input parameters
+  if freq_mhz < 40 or freq_mhz > 10000:
+    raise Exception('Frequency outside range [40MHz - 10GHz].')
+  if region not in ['RURAL', 'URBAN', 'SUBURBAN']:
+    raise Exception('Region %s not allowed' % region)
+  if reliability not in (-1, 0.5):
+    raise Exception('Hybrid model only computes the median or the mean.')
+
+  if is_height_cbsd_amsl:
+    altitude_cbsds = drive.terrain_driver.GetTerrainElevation(lat_cbsds,
+                                                              lon_cbsds)
+    height_cbsds = height_cbsds - altitude_cbsds
+
+  # Structural CBSD and mobile height corrections
+  height_cbsds = np.maximum(height_cbsds, 20.)
+  height_rx = 1.5
+
+  db_loss = np.zeros(num_paths)
+  itm_db_loss = np.zeros(num_paths)
+  hybrid_opcode = np.zeros(num_paths, dtype=int)
+  eff_heights = np.zeros(num_paths)
+  itm_err_num = np.zeros(num_paths, dtype=int)
+  dists_km = np.zeros(num_paths)
+  angles = [np.zeros(num_paths) for _ in _IncidenceAngles._fields]
+
+  # The same points have a zero path loss
+  idxs = np.where((lat_cbsds != lat_rxs) | (lon_cbsds != lon_rxs))[0]
+  if len(idxs):
+    lat_cbsds, lon_cbsds = lat_cbsds[idxs], lon_cbsds[idxs]
+    lat_rxs, lon_rxs = lat_rxs[idxs], lon_rxs[idxs]
+    heights = height_cbsds[idxs]
+    its_elevs, _ = drive.terrain_driver.TerrainProfiles(
+        lat_cbsds, lon_cbsds, lat_rxs, lon_rxs,
+        target_res_meter=_PROFILE_RES_METER,
+        do_interp=True, max_points=_PROFILE_MAX_POINTS)
+
+    # Calculate the predicted ITM loss
+    res_itm = wf_itm.CalcItmPropagationLossBatch(
+        lat_cbsds, lon_cbsds, heights,
+        lat_rxs, lon_rxs, height_rx,
+        False, reliability, freq_mhz, its_elevs, return_internals=True)
+    for angle, res_angle in zip(angles, res_itm.incidence_angles):
+      angle[idxs] = res_angle
+    itm_db_loss[idxs] = res_itm.db_loss
+    itm_err_num[idxs] = res_itm.internals['itm_err_num']
+    dists_km[idxs] = res_itm.internals['dist_km']
+
+    def _ItmMedianLosses(path_idxs):
+      return wf_itm.CalcItmPropagationLossBatch(
+          lat_cbsds[path_idxs], lon_cbsds[path_idxs], heights[path_idxs],
+          lat_rxs[path_idxs], lon_rxs[path_idxs], height_rx,
+          False, 0.5, freq_mhz, its_elevs[path_idxs]).db_loss
+
+    def _Corrections80km(path_idxs):
+      return _GetCorrections80km(
+          lat_cbsds[path_idxs], lon_cbsds[path_idxs], heights[path_idxs],
+          res_itm.incidence_angles.hor_cbsd[path_idxs],
+          height_rx, freq_mhz, _REGION_CODES[region])
+
+    loss, opcode, eff_height = _CalcHybridLosses(
+        res_itm.db_loss, res_itm.internals['dist_km'], its_elevs,
+        heights, height_rx, reliability, freq_mhz, region,
+        _ItmMedianLosses, _Corrections80km)
+    loss[cbsd_indoors[idxs]] += 15
+    db_loss[idxs] = loss
+    hybrid_opcode[idxs] = opcode
+    eff_heights[idxs] = eff_height
+
+  internals = None
+  if return_internals:
+    internals = {
+        'hybrid_opcode': hybrid_opcode,
+        'effective_height_cbsd': eff_heights,
+        'itm_db_loss': itm_db_loss,
+        'itm_err_num': itm_err_num,
+        'dist_km': dists_km
+    }
+  return _PropagResult(
+      db_loss = db_loss,
+      incidence_angles = _IncidenceAngles(*angles),
+      internals = internals)
+
+
+def _CalcHybridLosses(itm_db_loss, dist_km, its_elevs, height_cbsds, height_rx,
+                      reliability, freq_mhz, region,
+                      ItmMedianLosses, Corrections80km):
+  """Selects the hybrid mode of many paths, and computes their path loss.
+
+  This is the vectorized core of `CalcHybridPropagationLoss`, excluding the
+  indoor losses.
+
+  Inputs:
+    itm_db_loss:  ndarray of the ITM losses of the paths (dB).
+    dist_km:      ndarray of the distances of the paths (km).
+    its_elevs:    Terrain profiles of the paths in ITS format, as a 2D array
+                  with one (padded) profile per row.
+    height_cbsds: Heights of the CBSDs (m), scalar or one per path.
+    height_rx, reliability, freq_mhz, region:
+                  See `CalcHybridPropagationLoss`.
+    ItmMedianLosses: A function returning the ITM median losses of the paths of
+                  given indices (only called for the mean path loss).
+    Corrections80km: A function returning the eHata correction terms of the
+                  paths of given indices beyond 80km.
+
+  Returns:
+    a tuple of ndarray (db_loss, hybrid_opcode, effective_height_cbsd).
+  """
+  num_paths = len(dist_km)
+  height_cbsds = np.broadcast_to(height_cbsds, (num_paths,))
+  loss = np.array(itm_db_loss, dtype=float)
+
+  # Calculate the effective heights of the tx
+  eff_height = ehata.CbsdEffectiveHeightsBatch(height_cbsds, its_elevs)
+
+  # Process the different cases, all other paths using ITM
+  opcode = np.full(num_paths, HybridMode.ITM_HIGH_HEIGHT)
+  is_low = eff_height < 200
+  region_code = _REGION_CODES.get(region)
+  if region_code is None:
+    opcode[is_low] = HybridMode.ITM_RURAL
+    return loss, opcode, eff_height
+  offset_median_to_mean = _GetMedianToMeanOffsetDb(freq_mhz, region == 'URBAN')
+
+  # Use Free Space Loss
+  idxs = np.where(is_low & (dist_km <= 0.1))[0]
+  loss[idxs] = CalcFreeSpaceLoss(dist_km[idxs], freq_mhz,
+                                 height_cbsds[idxs], height_rx)
+  opcode[idxs] = HybridMode.FSL
+
+  # Use E-Hata Median Basic Prop Loss
+  idxs = np.where(is_low & (dist_km > 0.1) & (dist_km < 1))[0]
+  if len(idxs):
+    heights = height_cbsds[idxs]
+    fsl_100m = CalcFreeSpaceLoss(np.full(len(idxs), 0.1), freq_mhz,
+                                 heights, height_rx)
+    median_basic_loss = np.zeros(len(idxs))
+    for height in np.unique(heights):
+      median_basic_loss[heights == height] = ehata.MedianBasicPropLoss(
+          freq_mhz, height, height_rx, 1, region_code)
+    alpha = 1. + np.log10(dist_km[idxs])
+    loss[idxs] = fsl_100m + alpha * (median_basic_loss - fsl_100m)
+    if reliability == -1:
+      loss[idxs] += alpha * offset_median_to_mean
+    opcode[idxs] = HybridMode.EHATA_FSL_INTERP
+
+  # Use best of E-Hata / ITM
+  idxs = np.where(is_low & (dist_km >= 1) & (dist_km <= 80))[0]
+  if len(idxs):
+    ehata_loss_med = ehata.ExtendedHataBatch(its_elevs[idxs], freq_mhz,
+                                             height_cbsds[idxs], height_rx,
+                                             region_code)
+    if reliability == 0.5:
+      ehata_loss = ehata_loss_med
+      itm_loss_med = itm_db_loss[idxs]
+    else:
+      ehata_loss = ehata_loss_med + offset_median_to_mean
+      itm_loss_med = ItmMedianLosses(idxs)
+    is_itm = itm_loss_med >= ehata_loss_med
+    opcode[idxs] = np.where(is_itm, HybridMode.ITM_DOMINANT,
+                            HybridMode.EHATA_DOMINANT)
+    loss[idxs[~is_itm]] = ehata_loss[~is_itm]
+
+  # Use the ITM with correction from E-Hata @ 80km
+  idxs = np.where(is_low & (dist_km > 80))[0]
+  if len(idxs):
+    loss[idxs] += Corrections80km(idxs)
+    opcode[idxs] = HybridMode.ITM_CORRECTED
+
+  return loss, opcode, eff_height
+
+
+def _Corrections80kmFromProfiles(lat_cbsds, lon_cbsds, height_cbsds,
+                                 lat_80kms, lon_80kms, height_rx,
+                                 freq_mhz, region_code, its_elevs_80km):
+  """Computes the eHata corrections of the ITM from the 80km profiles."""
+  ehata_loss_80km = ehata.ExtendedHataBatch(its_elevs_80km, freq_mhz,
+                                            height_cbsds, height_rx,
+                                            region_code)
+  itm_loss_80km = wf_itm.CalcItmPropagationLossBatch(
+      lat_cbsds, lon_cbsds, height_cbsds, lat_80kms, lon_80kms, height_rx,
+      False, 0.5, freq_mhz, its_elevs_80km).db_loss
+  return np.maximum(ehata_loss_80km - itm_loss_80km, 0)
+
+
+def _GetCorrections80km(lat_cbsds, lon_cbsds, height_cbsds, bearings,
+                        height_rx, freq_mhz, region_code):
+  """Returns the eHata corrections of the ITM for paths beyond 80km.
+
+  The correction terms are computed at 80km along the path bearing, once per
+  distinct CBSD and bearing.
+  """
+  keys = np.array([lat_cbsds, lon_cbsds, height_cbsds, bearings]).T
+  keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+  lats, lons, heights, bearings_80km = keys.T
+  lat_80kms, lon_80kms, _ = vincenty.GeodesicPointsArrays(
+      lats, lons, np.full(len(lats), 80.), bearings_80km)
+  its_elevs_80km, _ = drive.terrain_driver.TerrainProfiles(
+      lats, lons, lat_80kms, lon_80kms,
+      target_res_meter=30., do_interp=True, max_points=1501)
+  corrections = _Corrections80kmFromProfiles(
+      lats, lons, heights, lat_80kms, lon_80kms, height_rx,
+      freq_mhz, region_code, its_elevs_80km)
+  return corrections[inverse.ravel()]
+
+
+def _SubProfiles(radial_dists_km, radial_elevs, dists_km):
+  """Returns the terrain profiles of paths derived from a terrain radial.
+
+  The profiles have the same number of points and resolution as the ones
+  returned by `drive.terrain_driver.TerrainProfile`, and their elevations are
+  linearly interpolated from the radial samples.
+
+  Inputs:
+    radial_dists_km: ndarray of the distances of the radial samples (km).
+    radial_elevs:    ndarray of the terrain elevation of the radial samples (m).
+    dists_km:        ndarray of the path distances along the radial (km).
+
+  Returns:
+    a tuple (profiles, num_points) of padded profiles and their number of
+    points (see |terrain.TerrainDriver.TerrainProfiles|).
+  """
+  dists_m = 1000. * dists_km
+  num_points = np.ceil(dists_m / _PROFILE_RES_METER) + 1
+  num_points = np.clip(num_points, 2, _PROFILE_MAX_POINTS).astype(int)
+  resolutions = dists_m / (num_points - 1.)
+
+  profiles = np.zeros((len(num_points), np.max(num_points) + 2))
+  profiles[:, 0] = num_points - 1
+  profiles[:, 1] = resolutions
+  path_idx = np.repeat(np.arange(len(num_points)), num_points)
+  starts = np.cumsum(num_points) - num_points
+  point_idx = np.arange(len(path_idx)) - starts[path_idx]
+  profiles[path_idx, point_idx + 2] = np.interp(
+      point_idx * resolutions[path_idx], 1000. * radial_dists_km, radial_elevs)
+  return profiles, num_points
+
+
+def CalcHybridPropagationLossRadials(lat_cbsd, lon_cbsd, height_cbsd,
+                                     azimuths, dists_km,
+                                     height_rx=1.5,
+                                     cbsd_indoor=False,
+                                     reliability=-1,
+                                     freq_mhz=3625.,
+                                     region='RURAL',
+                                     is_height_cbsd_amsl=False,
+                                     radial_res_meter=5.,
+                                     return_internals=False):
+  """Implements the Hybrid model from a CBSD toward points along radials.
+
+  This is the radial version of `CalcHybridPropagationLoss`, for Rx points
+  located at the same distances along several azimuths (as used for example
+  for building the PPA contours). For each azimuth:
+    - a single high resolution terrain radial is extracted,
+    - the terrain profiles of all the paths are derived from that radial,
+    - the ITM model is run in batch over all the paths.
+
+  The results are the same as `CalcHybridPropagationLoss`, except for the
+  linear interpolation of the terrain profiles between the radial samples,
+  which has a negligible impact with the default radial resolution.
+
+  Inputs:
+    lat_cbsd, lon_cbsd, height_cbsd: Lat/lon (deg) and height AGL (m) of CBSD
+    azimuths:           Sequence of the radials azimuths (degrees).
+    dists_km:           Sequence of distances of the Rx points along each
+                        radial (km).
+    height_rx:          Height AGL (m) of Rx points.
+    cbsd_indoor, reliability, freq_mhz, region, is_height_cbsd_amsl:
+                        See `CalcHybridPropagationLoss`.
+    radial_res_meter:   Resolution of the terrain radials (m).
+    return_internals:   If True, returns internal variables.
+
+  Returns:
+    A namedtuple of:
+      db_loss:          Path Losses in dB, as a ndarray of shape
+                        (num_azimuths, num_distances).
+
+      incidence_angles: A namedtuple of ndarray of angles (degrees) of shape
+                        (num_azimuths, num_distances):
+                          hor_cbsd, ver_cbsd, hor_rx, ver_rx
+                        (see `CalcHybridPropagationLoss`).
+
+      internals:        A dictionary of internal data for advanced analysis
+                        (only if return_internals=True), as ndarray of shape
+                        (num_azimuths, num_distances):
+          hybrid_opcode:  Opcode from HybridCode - See GetInfoOnHybridCodes()
+          effective_height_cbsd: Effective CBSD antenna height
+          itm_db_loss:    Loss in dB for the ITM model.
+
+  Raises:
+    Exception if input parameters invalid or out of range.
+  """
+  azimuths = np.atleast_1d(np.asarray(azimuths, dtype=float))
+  dists_km = np.atleast_1d(np.asarray(dists_km, dtype=float))
+
+  # Sanity checks on input parameters
+  if freq_mhz < 40 or freq_mhz > 10000:
+    raise Exception('Frequency outside range [40MHz - 10GHz].')
+  if region not in ['RURAL', 'URBAN', 'SUBURBAN']:
+    raise Exception('Region %s not allowed' % region)
+  if reliability not in (-1, 0.5):
+    raise Exception('Hybrid model only computes the median or the mean.')
+
+  if is_height_cbsd_amsl:
+    altitude_cbsd = drive.terrain_driver.GetTerrainElevation(lat_cbsd, lon_cbsd)
+    height_cbsd = height_cbsd - altitude_cbsd
+
+  # Structural CBSD and mobile height corrections
+  height_cbsd = max(height_cbsd, 20.)
+  height_rx = 1.5
+
+  # Set the environment code number (None for rural)
+  region_code = _REGION_CODES.get(region)
+
+  shape = (len(azimuths), len(dists_km))
+  db_loss = np.zeros(shape)
+  itm_db_loss = np.zeros(shape)
+  hybrid_opcode = np.zeros(shape, dtype=int)
+  eff_heights = np.zeros(shape)
+  angles = [np.zeros(shape) for _ in _IncidenceAngles._fields]
+
+  # The same points have a zero path loss
+  is_path = dists_km > 0
+  path_dists_km = dists_km[is_path]
+  num_paths = len(path_dists_km)
+  if not num_paths:
+    return _PropagResult(
+        db_loss = db_loss,
+        incidence_angles = _IncidenceAngles(*angles),
+        internals = None)
+
+  # The radials cover all the paths, including the 80km correction paths
+  radial_len_km = np.max(path_dists_km)
+  num_radial_points = int(np.ceil(1000. * radial_len_km / radial_res_meter)) + 1
+  radial_dists_km = np.linspace(0, radial_len_km, num_radial_points)
+  lat_cbsds = np.full(num_paths, lat_cbsd)
+  lon_cbsds = np.full(num_paths, lon_cbsd)
+
+  for k, azimuth in enumerate(azimuths):
+    # Extract the terrain radial and the profiles of all paths
+    radial_lats, radial_lons, _ = vincenty.GeodesicPoints(
+        lat_cbsd, lon_cbsd, radial_dists_km, azimuth)
+    radial_lats[0], radial_lons[0] = lat_cbsd, lon_cbsd
+    radial_elevs = drive.terrain_driver.GetTerrainElevation(
+        radial_lats, radial_lons, do_interp=True)
+    lat_rxs, lon_rxs, _ = vincenty.GeodesicPoints(
+        lat_cbsd, lon_cbsd, path_dists_km, azimuth)
+    its_elevs, num_points = _SubProfiles(radial_dists_km, radial_elevs,
+                                         path_dists_km)
+
+    # Calculate the predicted ITM loss
+    res_itm = wf_itm.CalcItmPropagationLossBatch(
+        lat_cbsds, lon_cbsds, height_cbsd,
+        lat_rxs, lon_rxs, height_rx,
+        False, reliability, freq_mhz, its_elevs, return_internals=True)
+    for angle, res_angle in zip(angles, res_itm.incidence_angles):
+      angle[k, is_path] = res_angle
+    itm_db_loss[k, is_path] = res_itm.db_loss
+
+    def _ItmMedianLosses(idxs):
+      return wf_itm.CalcItmPropagationLossBatch(
+          lat_cbsds[idxs], lon_cbsds[idxs], height_cbsd,
+          lat_rxs[idxs], lon_rxs[idxs], height_rx,
+          False, 0.5, freq_mhz, its_elevs[idxs]).db_loss
+
+    def _Corrections80km(idxs):
+      # All the paths of the radial have the same correction.
+      lat_80km, lon_80km, _ = vincenty.GeodesicPoint(lat_cbsd, lon_cbsd,
+                                                     80., azimuth)
+      its_elevs_80km, _ = _SubProfiles(radial_dists_km, radial_elevs,
+                                       np.array([80.]))
+      correction = _Corrections80kmFromProfiles(
+          lat_cbsds[:1], lon_cbsds[:1], height_cbsd, [lat_80km], [lon_80km],
+          height_rx, freq_mhz, region_code, its_elevs_80km)[0]
+      return np.full(len(idxs), correction)
+
+    loss, opcode, eff_height = _CalcHybridLosses(
+        res_itm.db_loss, res_itm.internals['dist_km'], its_elevs,
+        height_cbsd, height_rx, reliability, freq_mhz, region,
+        _ItmMedianLosses, _Corrections80km)
+    eff_heights[k, is_path] = eff_height
+
+    if cbsd_indoor:
+      loss += 15
+    db_loss[k, is_path] = loss
+    hybrid_opcode[k, is_path] = opcode
+
+  internals = None
+  if return_internals:
+    internals = {
+        'hybrid_opcode': hybrid_opcode,
+        'effective_height_cbsd': eff_heights,
+        'itm_db_loss': itm_db_loss
+    }
+  return _PropagResult(
+      db_loss = db_loss,
+      incidence_angles = _IncidenceAngles(*angles),
+      internals = internals)
+
+
 def CalcFreeSpaceLoss(dist_km, freq_mhz, height_cbsd, height_rx):
   """Computes the free space loss.
 
   Inputs:
-    dist_km:  the distance (km)
+    dist_km:  the distance (km), as a scalar or ndarray
     freq_mhz: the frequency (MHz)
     height_cbsd: the height of the CBSD
     height_rx: the height of the receive point
 
   Returns:
-    the free space path loss in dB
+    the free space path loss in dB, as a scalar or ndarray
   """
+  if not np.isscalar(dist_km):
+    r = np.sqrt((1000. * np.asarray(dist_km))**2 + (height_cbsd - height_rx)**2)
+    return 20. * np.log10(r) + 20. * math.log10(freq_mhz) - 27.56
   r = math.sqrt((1000. * dist_km)**2 + (height_cbsd - height_rx)**2)
   db_loss = 20. * math.log10(r) + 20. * math.log10(freq_mhz) - 27.56
   return db_loss
@@ -18,10 +18,14 @@ from __future__ import print_function
 import os
 import logging
 import numpy as np
+import shutil
+import tempfile
 import unittest
 
 from reference_models.tools import testutils
 from reference_models.geo import drive
+from reference_models.geo import terrain
+from reference_models.geo import vincenty
 from reference_models.propagation import wf_hybrid
 from reference_models.propagation import wf_itm
 
@@ -39,6 +43,9 @@ class TestWfHybrid(unittest.TestCase):
     # Mocking the ITU drivers to always return fixed values
     drive.climate_driver.TropoClim = lambda lat, lon: 5
     drive.refract_driver.Refractivity = lambda lat, lon: 314
+    drive.climate_driver.TropoClims = lambda lats, lons: np.full(len(lats), 5)
+    drive.refract_driver.Refractivities = (
+        lambda lats, lons: np.full(len(lats), 314.))
 
   @classmethod
   def tearDownClass(cls):
@@ -224,5 +231,103 @@ class TestWfHybrid(unittest.TestCase):
     self.assertTupleEqual(result.incidence_angles, (0, 0, 0, 0))
 
 
+class TestWfHybridRadials(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    # Smooth synthetic terrain tile, so that the test does not depend on the
+    # real NED data.
+    cls.tile_dir = tempfile.mkdtemp()
+    x = np.arange(terrain._TILE_DIM) / float(terrain._TILE_DIM)
+    tile = (300 + 200 * np.sin(20 * x)[:, np.newaxis] * np.cos(13 * x)
+            + 50 * np.sin(150 * x)[np.newaxis, :])
+    tile.astype(np.float32).tofile(
+        os.path.join(cls.tile_dir, 'floatn38w123_1_std.flt'))
+
+  @classmethod
+  def tearDownClass(cls):
+    shutil.rmtree(cls.tile_dir)
+
+  def setUp(self):
+    self.original_terrain_driver = drive.terrain_driver
+    drive.terrain_driver = terrain.TerrainDriver(self.tile_dir)
+
+  def tearDown(self):
+    drive.terrain_driver = self.original_terrain_driver
+
+  def test_radials_vs_single(self):
+    lat, lon = 37.5, -122.5
+    azimuths = [0, 45, 190.5]
+    dists_km = np.array([0, 0.05, 0.2, 0.7, 3.1, 12.2, 27.35, 40.01])
+    for height, region, reliability, indoor in [(10, 'SUBURBAN', 0.5, False),
+                                                (30, 'URBAN', -1, True),
+                                                (10, 'RURAL', 0.5, False),
+                                                (250, 'URBAN', 0.5, False)]:
+      res = wf_hybrid.CalcHybridPropagationLossRadials(
+          lat, lon, height, azimuths, dists_km,
+          cbsd_indoor=indoor, reliability=reliability, region=region,
+          return_internals=True)
+      self.assertEqual(res.db_loss.shape, (3, 8))
+      for i, azimuth in enumerate(azimuths):
+        lat_rxs, lon_rxs, _ = vincenty.GeodesicPoints(lat, lon, dists_km, azimuth)
+        lat_rxs[0], lon_rxs[0] = lat, lon
+        for j in range(len(dists_km)):
+          exp_res = wf_hybrid.CalcHybridPropagationLoss(
+              lat, lon, height, lat_rxs[j], lon_rxs[j], 1.5,
+              cbsd_indoor=indoor, reliability=reliability, region=region,
+              return_internals=True)
+          # ITM is sensitive to the last bits of the profile resolution, which
+          # are affected by the rounding of the path distance.
+          self.assertAlmostEqual(res.db_loss[i, j], exp_res.db_loss, delta=0.05)
+          if j:
+            self.assertEqual(res.internals['hybrid_opcode'][i, j],
+                             exp_res.internals['hybrid_opcode'])
+            for angle, exp_angle in zip(res.incidence_angles,
+                                        exp_res.incidence_angles):
+              self.assertAlmostEqual(angle[i, j], exp_angle, 2)
+
+  def test_batch_vs_single(self):
+    np.random.seed(1234)
+    num_paths = 40
+    lat_cbsds = np.random.uniform(37.05, 37.3, num_paths)
+    lon_cbsds = np.random.uniform(-122.95, -122.8, num_paths)
+    lat_rxs = lat_cbsds + np.random.uniform(0, 0.65, num_paths)
+    lon_rxs = lon_cbsds + np.random.uniform(0, 0.75, num_paths)
+    # Short paths, a same location path and a repeated >80km path.
+    lat_rxs[:4] = lat_cbsds[:4] + [0.0005, 0.003, 0.007, 0]
+    lon_rxs[:4] = lon_cbsds[:4] + [0, 0.002, 0, 0]
+    lat_cbsds[-1], lon_cbsds[-1] = 37.05, -122.95
+    lat_cbsds[-2], lon_cbsds[-2] = 37.05, -122.95
+    lat_rxs[-1], lon_rxs[-1] = 37.9, -122.1
+    lat_rxs[-2], lon_rxs[-2] = 37.9, -122.1
+    heights = np.random.uniform(3, 40, num_paths)
+    heights[5] = 250
+    indoors = np.arange(num_paths) % 3 == 0
+    for region, reliability in [('SUBURBAN', 0.5), ('URBAN', -1),
+                                ('RURAL', -1)]:
+      res = wf_hybrid.CalcHybridPropagationLossBatch(
+          lat_cbsds, lon_cbsds, heights, lat_rxs, lon_rxs, 1.5,
+          cbsd_indoors=indoors, reliability=reliability, region=region,
+          return_internals=True)
+      self.assertEqual(res.db_loss.shape, (num_paths,))
+      for k in range(num_paths):
+        exp_res = wf_hybrid.CalcHybridPropagationLoss(
+            lat_cbsds[k], lon_cbsds[k], heights[k], lat_rxs[k], lon_rxs[k], 1.5,
+            cbsd_indoor=indoors[k], reliability=reliability, region=region,
+            return_internals=True)
+        self.assertAlmostEqual(res.db_loss[k], exp_res.db_loss, 9)
+        if k != 3:
+          self.assertEqual(res.internals['hybrid_opcode'][k],
+                           exp_res.internals['hybrid_opcode'])
+          self.assertAlmostEqual(res.internals['effective_height_cbsd'][k],
+                                 exp_res.internals['effective_height_cbsd'], 9)
+        for angle, exp_angle in zip(res.incidence_angles,
+                                    exp_res.incidence_angles):
+          self.assertAlmostEqual(angle[k], exp_angle, 8)
+      if region != 'RURAL':
+        self.assertIn(wf_hybrid.HybridMode.ITM_CORRECTED,
+                      res.internals['hybrid_opcode'])
+
+
 if __name__ == '__main__':
   unittest.main()
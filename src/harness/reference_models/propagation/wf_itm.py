@@ -26,6 +26,14 @@ Typical usage:
               cbsd_indoor=False,
               reliability=0.5,
               freq_mhz=3625.)
+
+  # Get the path losses of many paths in one batch
+  db_losses, incidence_angles, internals = CalcItmPropagationLossBatch(
+              lat_cbsds, lon_cbsds, height_cbsds,
+              lat_rxs, lon_rxs, height_rxs,
+              cbsd_indoors=False,
+              reliability=0.5,
+              freq_mhz=3625.)
 """
 from __future__ import absolute_import
 from __future__ import division
@@ -234,6 +242,157 @@ def CalcItmPropagationLoss(lat_cbsd, lon_cbsd, height_cbsd,
   )
 
 
+def CalcItmPropagationLossBatch(lat_cbsds, lon_cbsds, height_cbsds,
+                                lat_rxs, lon_rxs, height_rxs,
+                                cbsd_indoors=False,
+                                reliability=0.5,
+                                freq_mhz=3625.,
+                                its_elevs=None,
+                                is_height_cbsd_amsl=False,
+                                return_internals=False):
+  """Implements the WinnForum-compliant ITM model over many paths at once.
+
+  This is the batch version of `CalcItmPropagationLoss`, giving the same
+  results up to floating point rounding of the geodesics: the terrain profiles
+  of all paths are extracted in one batch, and the ITM core is run over all
+  paths in a single call to the ITM extension.
+
+  Inputs:
+    lat_cbsds, lon_cbsds, height_cbsds: Lat/lon (deg) and heights AGL (m) of CBSDs
+    lat_rxs, lon_rxs, height_rxs:       Lat/lon (deg) and heights AGL (m) of Rx points
+    cbsd_indoors:        CBSD indoor status, scalar or one per path - Default=False.
+    reliability:         Reliability. Default is 0.5 (median value)
+                         Different options:
+                           value in [0,1]: returns the CDF quantile
+                           -1: returns the mean path loss
+                           iterable sequence: returns a matrix of path losses
+    freq_mhz:            Frequency (MHz). Default is mid-point of band.
+    its_elevs:           Optional profiles to use, as a 2D array with one ITM
+                         profile per row (see |terrain.TerrainProfiles|).
+                           If not specified, they are extracted from the terrain.
+    is_height_cbsd_amsl: If True, the CBSD heights shall be considered as AMSL.
+    return_internals: If True, returns internal variables.
+
+  Returns:
+    A namedtuple of:
+      db_loss            Path Losses in dB, as a ndarray of size num_paths if
+                           reliability is scalar, or a matrix of shape
+                           (num_paths, num_reliabilities) if reliability is an
+                           iterable.
+
+      incidence_angles:  A namedtuple of ndarray (see `CalcItmPropagationLoss`):
+          hor_cbsd, ver_cbsd, hor_rx, ver_rx
+
+      internals:         A dictionary of internal data for advanced analysis
+                         (only if return_internals=True):
+          itm_err_num:     ndarray of ITM error codes.
+          dist_km:         ndarray of distances between end points (km).
+
+  Raises:
+    Exception if input parameters invalid or out of range.
+  """
+  lat_cbsds = np.atleast_1d(np.asarray(lat_cbsds, dtype=float))
+  lon_cbsds = np.atleast_1d(np.asarray(lon_cbsds, dtype=float))
+  lat_rxs = np.atleast_1d(np.asarray(lat_rxs, dtype=float))
+  lon_rxs = np.atleast_1d(np.asarray(lon_rxs, dtype=float))
+  num_paths = len(lat_cbsds)
+  height_cbsds = np.array(np.broadcast_to(height_cbsds, (num_paths,)), dtype=float)
+  height_rxs = np.array(np.broadcast_to(height_rxs, (num_paths,)), dtype=float)
+  cbsd_indoors = np.broadcast_to(cbsd_indoors, (num_paths,)).astype(bool)
+
+  # Sanity checks on input parameters
+  if freq_mhz < 40.0 or freq_mhz > 10000:
+    raise Exception('Frequency outside range [40MHz - 10GHz]')
+
+  if is_height_cbsd_amsl:
+    altitude_cbsds = drive.terrain_driver.GetTerrainElevation(lat_cbsds, lon_cbsds)
+    height_cbsds = height_cbsds - altitude_cbsds
+
+  # Ensure minimum height of 1 meter
+  height_cbsds[height_cbsds < 1] = 1
+  height_rxs[height_rxs < 1] = 1
+
+  # Internal ITM parameters are always set to following values in WF version:
+  confidence = 0.5     # Confidence (always 0.5)
+  dielec = 25.         # Dielectric constant (always 25.)
+  conductivity = 0.02  # Conductivity (always 0.02)
+  polarization = 1     # Polarization (always vertical = 1)
+  mdvar = 13
+
+  # Get the terrain profiles, using Vincenty great circle route, and WF
+  # standard (bilinear interp; 1500 pts for all distances over 45 km)
+  if its_elevs is None:
+    its_elevs, _ = drive.terrain_driver.TerrainProfiles(
+        lat1s=lat_cbsds, lon1s=lon_cbsds,
+        lat2s=lat_rxs, lon2s=lon_rxs,
+        target_res_meter=30.,
+        do_interp=True, max_points=1501)
+
+  # Find the midpoint of the great circle paths, and the climate and
+  # refractivity values (see `CalcItmPropagationLoss`).
+  dists_km, bearing_cbsds, bearing_rxs = vincenty.GeodesicDistanceBearingArrays(
+      lat_cbsds, lon_cbsds, lat_rxs, lon_rxs)
+  latmids, lonmids, _ = vincenty.GeodesicPointsArrays(
+      lat_cbsds, lon_cbsds, dists_km/2., bearing_cbsds)
+  climates = drive.climate_driver.TropoClims(latmids, lonmids)
+  sea_mids = climates == 7
+  if np.any(sea_mids):
+    climates[sea_mids] = np.minimum(
+        drive.climate_driver.TropoClims(lat_cbsds[sea_mids], lon_cbsds[sea_mids]),
+        drive.climate_driver.TropoClims(lat_rxs[sea_mids], lon_rxs[sea_mids]))
+  refractivities = drive.refract_driver.Refractivities(latmids, lonmids)
+
+  # Call ITM prop loss, on all paths except the ones with same end points.
+  reliabilities = reliability
+  do_avg = False
+  if np.isscalar(reliabilities) and reliability == -1:
+    # Pathloss mean: average the value for 1% to 99% included
+    reliabilities = np.arange(0.01, 1.0, 0.01)
+    do_avg = True
+
+  same_points = (lat_cbsds == lat_rxs) & (lon_cbsds == lon_rxs)
+  idxs = np.where(~same_points)[0]
+  bearing_cbsds[same_points] = 0
+  bearing_rxs[same_points] = 0
+  db_loss = np.zeros((num_paths,) if np.isscalar(reliabilities)
+                     else (num_paths, len(reliabilities)))
+  ver_cbsds = np.zeros(num_paths)
+  ver_rxs = np.zeros(num_paths)
+  err_nums = np.zeros(num_paths, dtype=int)
+  if len(idxs):
+    (db_loss[idxs], ver_cbsds[idxs],
+     ver_rxs[idxs], err_nums[idxs]) = itm.point_to_point_batch(
+         its_elevs[idxs], height_cbsds[idxs], height_rxs[idxs],
+         dielec, conductivity,
+         refractivities[idxs], freq_mhz,
+         climates[idxs], polarization,
+         confidence, reliabilities,
+         mdvar, False)
+  if do_avg:
+    db_loss = -10*np.log10(np.mean(10**(-db_loss/10.), axis=1))
+    db_loss[same_points] = 0
+
+  # Add indoor losses
+  db_loss[cbsd_indoors & ~same_points] += 15
+
+  internals = None
+  if return_internals:
+    internals = {
+        'itm_err_num': err_nums,
+        'dist_km': dists_km
+    }
+
+  return _PropagResult(
+      db_loss = db_loss,
+      incidence_angles = _IncidenceAngles(
+          hor_cbsd = bearing_cbsds,
+          ver_cbsd = ver_cbsds,
+          hor_rx = bearing_rxs,
+          ver_rx = ver_rxs),
+      internals = internals
+  )
+
+
 # Utility function to compute the HAAT for a CBSD
 def ComputeHaat(lat_cbsd, lon_cbsd, height_cbsd, height_is_agl=True):
   """Computes a CBSD HAAT (Height above average terrain).
@@ -40,6 +40,9 @@ class TestWfItm(unittest.TestCase):
     # Mocking the ITU drivers to always return fixed values
     drive.climate_driver.TropoClim = lambda lat, lon: 5
     drive.refract_driver.Refractivity = lambda lat, lon: 314
+    drive.climate_driver.TropoClims = lambda lats, lons: np.full(len(lats), 5)
+    drive.refract_driver.Refractivities = (
+        lambda lats, lons: np.full(len(lats), 314.))
 
   @classmethod
   def tearDownClass(cls):
@@ -171,10 +174,42 @@ class TestWfItm(unittest.TestCase):
       self.assertAlmostEqual(inc_angles.ver_cbsd, a_tx, 14)
       self.assertAlmostEqual(inc_angles.ver_rx, a_rx, 14)
 
+  def test_batch_vs_single(self):
+    np.random.seed(12345)
+    pairs = testutils.MakeLatLngPairs(
+        20, 10, 50000,
+        lat_min=37, lat_max=38,
+        lng_min=-123, lng_max=-122)
+    lat1s, lon1s, lat2s, lon2s = [np.array(v) for v in zip(*pairs)]
+    lat2s[3], lon2s[3] = lat1s[3], lon1s[3]
+    height_cbsds = np.linspace(0.5, 50, 20)
+    height_rxs = np.linspace(100, 1.5, 20)
+    indoors = np.arange(20) % 2 == 1
+    for reliability in [0.5, -1, [0.1, 0.5, 0.9]]:
+      res = wf_itm.CalcItmPropagationLossBatch(
+          lat1s, lon1s, height_cbsds, lat2s, lon2s, height_rxs,
+          cbsd_indoors=indoors, reliability=reliability)
+      for k in range(20):
+        exp_res = wf_itm.CalcItmPropagationLoss(
+            lat1s[k], lon1s[k], height_cbsds[k],
+            lat2s[k], lon2s[k], height_rxs[k],
+            cbsd_indoor=indoors[k], reliability=reliability)
+        self.assertTrue(np.allclose(res.db_loss[k], exp_res.db_loss,
+                                    rtol=1e-9, atol=0))
+        self.assertTrue(np.allclose(
+            [angles[k] for angles in res.incidence_angles],
+            exp_res.incidence_angles, rtol=0, atol=1e-8))
+
   def test_same_location(self):
     result = wf_itm.CalcItmPropagationLoss(45, -80, 10, 45, -80, 10)
     self.assertEqual(result.db_loss, 0)
     self.assertTupleEqual(result.incidence_angles, (0, 0, 0, 0))
+    result = wf_itm.CalcItmPropagationLossBatch(
+        [45, 45.1], [-80, -80], 10, [45, 45.1], [-80, -80], 10,
+        its_elevs=np.zeros((2, 3)))
+    self.assertListEqual(list(result.db_loss), [0, 0])
+    for angles in result.incidence_angles:
+      self.assertListEqual(list(angles), [0, 0])
 
 
 if __name__ == '__main__':
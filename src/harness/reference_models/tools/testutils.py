@@ -97,6 +97,48 @@ class FakePropagationPredictor(object):
           hor_cbsd=bearing_cbsd, ver_cbsd=0, hor_rx=bearing_rx, ver_rx=0),
           internals={})
 
+class FakeRadialPropagationPredictor(FakePropagationPredictor):
+  """Fake propagation model along radials for testing.
+
+  Same as |FakePropagationPredictor|, but as a fake replacement for
+  `CalcHybridPropagationLossRadials()`, as following:
+    wf_hybrid.CalcHybridPropagationLossRadials = FakeRadialPropagationPredictor()
+  """
+
+  def __call__(self,
+               lat_cbsd,
+               lon_cbsd,
+               height_cbsd,
+               azimuths,
+               dists_km,
+               height_rx=1.5,
+               cbsd_indoor=False,
+               reliability=0.5,
+               freq_mhz=3625.,
+               region=None,
+               is_height_cbsd_amsl=False,
+               radial_res_meter=None,
+               return_internals=False):
+    """See `CalcHybridPropagationLossRadials()` for specification."""
+    results = []
+    for azimuth in azimuths:
+      lats, lons, _ = vincenty.GeodesicPoints(lat_cbsd, lon_cbsd,
+                                              np.asarray(dists_km), azimuth)
+      results.append([
+          super(FakeRadialPropagationPredictor, self).__call__(
+              lat_cbsd, lon_cbsd, height_cbsd, lat, lon, height_rx,
+              cbsd_indoor, reliability, freq_mhz)
+          for lat, lon in zip(lats, lons)])
+    return wf_itm._PropagResult(
+        db_loss=np.array([[res.db_loss for res in radial]
+                          for radial in results]),
+        incidence_angles=wf_itm._IncidenceAngles(*[
+            np.array([[getattr(res.incidence_angles, field) for res in radial]
+                      for radial in results])
+            for field in wf_itm._IncidenceAngles._fields]),
+        internals={})
+
+
 class FakeInterferenceCalculator(object):
   """Fake model to calculate the interference for testing.
 
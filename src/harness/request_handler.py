@@ -21,6 +21,7 @@ import copy
 import json
 import logging
 import os
+import threading
 import time
 
 import pycurl
@@ -84,41 +85,122 @@ class TlsConfig(object):
     return ret
 
 
+class ConnectionPool(object):
+  """Thread-safe pool of reusable curl handles.
+
+  A curl handle keeps its connections alive and caches its TLS sessions, so
+  that successive requests to the same host made with a handle of the pool
+  avoid a new TCP connection and TLS handshake. A connection is only reused
+  by libcurl for requests having the same TLS configuration.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._handles = []
+
+  def Acquire(self):
+    """Returns an idle curl handle of the pool, or a new one."""
+    with self._lock:
+      if self._handles:
+        return self._handles.pop()
+    return pycurl.Curl()
+
+  def Release(self, conn):
+    """Returns a curl handle to the pool after its request is complete."""
+    with self._lock:
+      self._handles.append(conn)
+
+  def Close(self):
+    """Closes all the idle handles of the pool."""
+    with self._lock:
+      handles, self._handles = self._handles, []
+    for conn in handles:
+      conn.close()
+
+
 def RequestPost(url, request, config):
   return _Request(url, request, config, True)
 
 
-def RequestGet(url, config):
-  return _Request(url, None, config, False)
+def RequestGet(url, config, connection_pool=None):
+  return _Request(url, None, config, False, connection_pool)
 
 
-def _Request(url, request, config, is_post_method):
-  """Sends HTTPS request.
+def RequestGetStream(url, config, write_function, connection_pool=None):
+  """Sends HTTPS GET request, streaming the response body.
+
+  Contrary to `RequestGet`, the response is not held in memory nor decoded:
+  its successive chunks are passed to `write_function` as they are received.
+  The request is only retried on failures before the first chunk is received.
 
   Args:
     url: Destination of the HTTPS request.
-    request: Content of the request. (Can be None)
     config: a |TlsConfig| object defining the TLS/HTTPS configuration.
-    is_post_method (bool): If True, use POST, else GET.
-  Returns:
-    A dictionary represents the JSON response received from server.
+    write_function: A function called with each received chunk (bytes).
+    connection_pool: Optional |ConnectionPool| providing the curl handle.
   Raises:
-    CurlError: with args[0] is an integer code representing the libcurl
-      SSL code response (value < 100). Refer to:
-      https://curl.haxx.se/libcurl/c/libcurl-errors.html
-    HTTPError: for any HTTP code not in the range [200, 299]. Refer to:
-      https://en.wikipedia.org/wiki/List_of_HTTP_status_codes)
+    CurlError, HTTPError: see `_Request`.
+    Any exception raised by `write_function`, which aborts the transfer.
   """
-  # manage case of request passed as byte
+  status = {'received': False, 'http_code': None, 'error': None}
+
+  def _Header(line):
+    # The status line of each response (possibly several on redirections).
+    if line.startswith(b'HTTP/'):
+      status['http_code'] = int(line.split()[1])
+
+  def _Write(chunk):
+    status['received'] = True
+    # Do not stream the body of an HTTP error.
+    if 200 <= status['http_code'] <= 299:
+      try:
+        write_function(chunk)
+      except Exception as e:
+        # An exception in the callback would be reported by curl as a write
+        # error: it is kept to be raised after the transfer is aborted.
+        status['error'] = e
+        return 0
+
+  conn = _CreateConnection(url, config, connection_pool)
   try:
-    request = request.decode('utf-8')
-  except (UnicodeDecodeError, AttributeError):
-    pass
+    conn.setopt(conn.HEADERFUNCTION, _Header)
+    conn.setopt(conn.WRITEFUNCTION, _Write)
+    logging.debug('GET Request to URL %s', url)
+    for attempt_count in range(MAX_REQUEST_ATTEMPT_COUNT):
+      try:
+        conn.perform()
+        break
+      except pycurl.error as e:
+        if status['error'] is not None:
+          raise status['error']
+        logging.warning(str(CurlError(e.args[1], e.args[0])))
+        if status['received'] or attempt_count == MAX_REQUEST_ATTEMPT_COUNT - 1:
+          logging.error('Streaming from Host Failed')
+          raise
+        time.sleep(REQUEST_ATTEMPT_DELAY_SECOND)
 
-  response = six.BytesIO()
-  conn = pycurl.Curl()
+    http_code = conn.getinfo(pycurl.HTTP_CODE)
+  finally:
+    _ReleaseConnection(conn, connection_pool)
+  if not (200 <= http_code <= 299):
+    raise HTTPError(http_code)
+
+
+def _CreateConnection(url, config, connection_pool=None):
+  """Returns a curl connection configured for a given URL and TLS config.
+
+  Args:
+    url: Destination of the HTTPS request.
+    config: a |TlsConfig| object defining the TLS/HTTPS configuration.
+    connection_pool: Optional |ConnectionPool|. If set, an idle handle of the
+      pool is reused (its options being reset), instead of a new handle.
+  """
+  if connection_pool is None:
+    conn = pycurl.Curl()
+  else:
+    conn = connection_pool.Acquire()
+    conn.reset()
   conn.setopt(conn.URL, url)
-  conn.setopt(conn.WRITEFUNCTION, response.write)
   header = [
       'Host: %s' % urlparse.urlparse(url).hostname,
       'content-type: application/json'
@@ -135,6 +217,44 @@ def _Request(url, request, config, is_post_method):
   conn.setopt(conn.HTTPHEADER, header)
   conn.setopt(conn.SSL_CIPHER_LIST, ':'.join(config.ciphers))
   conn.setopt(conn.TCP_KEEPALIVE, 1)
+  return conn
+
+
+def _ReleaseConnection(conn, connection_pool):
+  """Closes a curl connection, or releases it to its pool."""
+  if connection_pool is None:
+    conn.close()
+  else:
+    connection_pool.Release(conn)
+
+
+def _Request(url, request, config, is_post_method, connection_pool=None):
+  """Sends HTTPS request.
+
+  Args:
+    url: Destination of the HTTPS request.
+    request: Content of the request. (Can be None)
+    config: a |TlsConfig| object defining the TLS/HTTPS configuration.
+    is_post_method (bool): If True, use POST, else GET.
+    connection_pool: Optional |ConnectionPool| providing the curl handle.
+  Returns:
+    A dictionary represents the JSON response received from server.
+  Raises:
+    CurlError: with args[0] is an integer code representing the libcurl
+      SSL code response (value < 100). Refer to:
+      https://curl.haxx.se/libcurl/c/libcurl-errors.html
+    HTTPError: for any HTTP code not in the range [200, 299]. Refer to:
+      https://en.wikipedia.org/wiki/List_of_HTTP_status_codes)
+  """
+  # manage case of request passed as byte
+  try:
+    request = request.decode('utf-8')
+  except (UnicodeDecodeError, AttributeError):
+    pass
+
+  response = six.BytesIO()
+  conn = _CreateConnection(url, config, connection_pool)
+  conn.setopt(conn.WRITEFUNCTION, response.write)
   request = json.dumps(request) if request else ''
   if is_post_method:
     conn.setopt(conn.POST, True)
@@ -164,7 +284,7 @@ def _Request(url, request, config, is_post_method):
     raise error
 
   http_code = conn.getinfo(pycurl.HTTP_CODE)
-  conn.close()
+  _ReleaseConnection(conn, connection_pool)
   body = response.getvalue().decode('utf-8')
   logging.debug('Response:\n' + body)
 
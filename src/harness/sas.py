@@ -21,7 +21,8 @@ import os
 
 from six.moves import configparser
 
-from request_handler import TlsConfig, RequestPost, RequestGet
+from request_handler import TlsConfig, RequestPost, RequestGet, RequestGetStream
+from request_handler import ConnectionPool
 import sas_interface
 
 
@@ -83,6 +84,8 @@ class SasImpl(sas_interface.SasInterface):
     self._tls_config = TlsConfig()
     self._sas_admin_id = sas_admin_id
     self.maximum_batch_size = int(maximum_batch_size)
+    # Curl handles reused across the dump file downloads.
+    self._download_connections = ConnectionPool()
 
   def Registration(self, request, ssl_cert=None, ssl_key=None):
     return self._CbsdRequest('registration', request, ssl_cert, ssl_key)
@@ -130,7 +133,15 @@ class SasImpl(sas_interface.SasInterface):
                       self._tls_config.WithClientCertificate(
                           ssl_cert if ssl_cert else
                           GetDefaultSasSSLCertPath(), ssl_key
-                          if ssl_key else GetDefaultSasSSLKeyPath()))
+                          if ssl_key else GetDefaultSasSSLKeyPath()),
+                      self._download_connections)
+
+  def DownloadFileStream(self, url, write_function, ssl_cert=None, ssl_key=None):
+    RequestGetStream(url,
+                     self._tls_config.WithClientCertificate(
+                         ssl_cert or GetDefaultSasSSLCertPath(),
+                         ssl_key or GetDefaultSasSSLKeyPath()),
+                     write_function, self._download_connections)
 
   def UpdateSasRequestUrl(self, cipher):
     if 'ECDSA' in cipher:
@@ -18,6 +18,8 @@ from __future__ import division
 from __future__ import print_function
 
 import abc
+import json
+
 import six
 
 
@@ -197,6 +199,21 @@ class SasInterface(six.with_metaclass(abc.ABCMeta, object)):
     """
     pass
 
+  def DownloadFileStream(self, url, write_function, ssl_cert=None, ssl_key=None):
+    """SAS-SAS Get the raw content of a Full Activity Dump json file, as a stream.
+
+    The default implementation downloads the whole file with `DownloadFile`
+    and passes it in a single chunk.
+
+    Args:
+      url: The URL of the file.
+      write_function: A function called with each chunk (bytes) of the file.
+      ssl_cert: Path to SSL cert file, if None, will use default cert file.
+      ssl_key: Path to SSL key file, if None, will use default key file.
+    """
+    write_function(json.dumps(
+        self.DownloadFile(url, ssl_cert, ssl_key)).encode('utf-8'))
+
 
 class SasAdminInterface(six.with_metaclass(abc.ABCMeta, object)):
   """Minimal test control interface for the SAS under test."""
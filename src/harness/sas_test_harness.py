@@ -346,6 +346,13 @@ class SasHttpServer(HTTPServer):
     with open(dump_file_path) as dump_file:
       return json.load(dump_file)
 
+  def streamDumpFile(self, filename, write_function, chunk_size=1 << 16):
+    """Streams the raw content of the dump file with the given filename."""
+    dump_file_path = os.path.join(self.base_path, filename)
+    with open(dump_file_path, 'rb') as dump_file:
+      for chunk in iter(lambda: dump_file.read(chunk_size), b''):
+        write_function(chunk)
+
 class SasTestHarnessServerHandler(SimpleHTTPRequestHandler):
   """SasTestHarnessServerHandler class inherits from SimpleHTTPRequestHandler
   to serve a HTTP Response.
@@ -502,3 +509,6 @@ class SasTestHarnessInterface(sas_interface.SasInterface):
 
   def DownloadFile(self, url, ssl_cert=None, ssl_key=None):
     return self.server.readDumpFile(url.split('/')[-1])
+
+  def DownloadFileStream(self, url, write_function, ssl_cert=None, ssl_key=None):
+    self.server.streamDumpFile(url.split('/')[-1], write_function)
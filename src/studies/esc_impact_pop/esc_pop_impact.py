@@ -153,14 +153,14 @@ def ComputeSensorNeighborhood(latitude, longitude, radius_km, res_arcsec):
 
   Returns:
     A tuple (latitudes, longitudes, geometry) representing the neighborhood:
-      - latitudes & longitudes: the lists of gridded points.
+      - latitudes & longitudes: the arrays of gridded points.
       - geometry: a |shapely| Polygon (or MultiPolygon).
   """
   us_border = zones.GetUsBorder()
   sensor_nbor = geo_utils.Buffer(sgeo.Point(longitude, latitude), radius_km)
   sensor_nbor = sensor_nbor.intersection(us_border)
-  longitudes, latitudes = list(zip(*utils.GridPolygon(sensor_nbor, res_arcsec)))
-  return latitudes, longitudes, sensor_nbor
+  points = utils.GridPolygon(sensor_nbor, res_arcsec, as_array=True)
+  return points[:, 1], points[:, 0], sensor_nbor
 
 
 def CalcEscPathLoss(latitude_esc, longitude_esc, height_esc, latitudes_tx,